@@ -0,0 +1,75 @@
+import asyncio
+from calendar import timegm
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import views
+from .recommendations import similar_books
+
+# 列表、检索、详情的异步版本，在 ASGI 部署（settings_asgi.py）中替换对应的同步视图
+# Django 3.2 没有异步 ORM，查询和模板渲染仍是同步代码，由 _offload 放到线程池中执行：
+# sync_to_async 默认 thread_sensitive=True，所有请求的同步代码都排队在同一个线程里，
+# 这里改用 thread_sensitive=False，慢请求只占用线程池中的一个线程，事件循环继续接收其他请求
+
+
+def _offload(func):
+    """在线程池中执行同步函数；线程池中的线程收不到请求开始、结束信号，前后自行按 CONN_MAX_AGE 关闭过期连接"""
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+async def _is_authenticated(request):
+    # request.user 是惰性对象，首次访问时读取会话和用户
+    return await _offload(lambda: request.user.is_authenticated)()
+
+
+async def home_view(request):
+    if not await _is_authenticated(request):
+        return redirect('library:login')
+    
+    return await _offload(lambda: render(request, 'library/home.html', views.home_context(request)))()
+
+
+async def search_view(request):
+    if not await _is_authenticated(request):
+        return redirect('library:login')
+    
+    return await _offload(lambda: render(request, 'library/search.html', views.search_context(request)))()
+
+
+async def book_detail_view(request, pk):
+    """与同步版本相同的 ETag/Last-Modified 条件请求；需要渲染时图书和相似图书两条查询并发执行"""
+    if not await _is_authenticated(request):
+        return redirect('library:login')
+    
+    updated_at = await _offload(views._book_version)(request, pk)
+    if updated_at is None:
+        raise Http404('图书不存在')
+    etag = quote_etag(views._book_etag(request, pk))
+    last_modified = timegm(updated_at.utctimetuple())
+    
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        book, similar = await asyncio.gather(
+            _offload(views.get_detail_book)(pk),
+            _offload(similar_books)(pk),
+        )
+        context = {
+            'book': book,
+            'similar_books': similar,
+        }
+        response = await _offload(render)(request, 'library/book_detail.html', context)
+    response.headers.setdefault('ETag', etag)
+    response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    return response
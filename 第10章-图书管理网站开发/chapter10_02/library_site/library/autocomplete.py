@@ -0,0 +1,142 @@
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+# 类型常量：书名建议 / 作者建议
+TITLE = 'title'
+AUTHOR = 'author'
+
+
+def normalize(text):
+    """统一全角半角与大小写，用于前缀比较"""
+    return unicodedata.normalize('NFKC', text or '').casefold().strip()
+
+
+class PrefixIndex:
+    """
+    书名、作者前缀索引
+    所有条目按规范化后的文本排序保存在列表中，查询时二分定位到第一个不小于前缀的位置，
+    向后扫描到前缀不再匹配为止，耗时与图书总数基本无关
+    """
+
+    def __init__(self):
+        # 有序条目：(规范化文本, 图书ID, 类型, 显示文本)，作者条目的图书ID为0
+        self._entries = []
+        # 图书ID -> (书名, 作者)，用于修改、删除时找到旧条目
+        self._books = {}
+        # 作者 -> 图书数量，同一作者只保留一个条目
+        self._authors = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._books)
+
+    def load(self, rows):
+        """从 (id, 书名, 作者) 序列批量建立索引"""
+        entries = []
+        books = {}
+        authors = {}
+        for book_id, title, author in rows:
+            books[book_id] = (title, author)
+            entries.append((normalize(title), book_id, TITLE, title))
+            if author not in authors:
+                authors[author] = 0
+                entries.append((normalize(author), 0, AUTHOR, author))
+            authors[author] += 1
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._books = books
+            self._authors = authors
+
+    def _remove_entry(self, entry):
+        position = bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def _discard(self, book_id):
+        old = self._books.pop(book_id, None)
+        if old is None:
+            return
+        title, author = old
+        self._remove_entry((normalize(title), book_id, TITLE, title))
+        self._authors[author] -= 1
+        if not self._authors[author]:
+            del self._authors[author]
+            self._remove_entry((normalize(author), 0, AUTHOR, author))
+
+    def add(self, book_id, title, author):
+        """新增或更新一本图书"""
+        with self._lock:
+            self._discard(book_id)
+            self._books[book_id] = (title, author)
+            insort(self._entries, (normalize(title), book_id, TITLE, title))
+            if author not in self._authors:
+                self._authors[author] = 0
+                insort(self._entries, (normalize(author), 0, AUTHOR, author))
+            self._authors[author] += 1
+
+    def remove(self, book_id):
+        """删除一本图书"""
+        with self._lock:
+            self._discard(book_id)
+
+    def suggest(self, prefix, limit=10):
+        """
+        返回以 prefix 开头的书名和作者建议（去重），按文本顺序排列
+        :return: [{'type': 'title' | 'author', 'value': 显示文本, 'id': 图书ID 或 None}]
+        """
+        key = normalize(prefix)
+        if not key:
+            return []
+        suggestions = []
+        seen = set()
+        with self._lock:
+            position = bisect_left(self._entries, (key,))
+            while position < len(self._entries) and len(suggestions) < limit:
+                text, book_id, kind, display = self._entries[position]
+                if not text.startswith(key):
+                    break
+                position += 1
+                if (kind, display) in seen:
+                    continue
+                seen.add((kind, display))
+                suggestions.append({'type': kind, 'value': display, 'id': book_id or None})
+        return suggestions
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """返回进程内的前缀索引，首次调用时从数据库建立"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from .models import Book
+
+                index = PrefixIndex()
+                index.load(Book.objects.values_list('id', 'title', 'author').iterator(chunk_size=5000))
+                _index = index
+    return _index
+
+
+def book_saved(book):
+    """图书保存后更新索引（索引尚未建立时无需处理，建立时会读到最新数据）"""
+    if _index is not None:
+        _index.add(book.pk, book.title, book.author)
+
+
+def book_deleted(book_id):
+    """图书删除后更新索引"""
+    if _index is not None:
+        _index.remove(book_id)
+
+
+def reset_index():
+    """丢弃索引，下次查询时重新建立（批量导入数据后调用）"""
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,37 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import User
+
+# 已登录用户在缓存中保存的时间（秒）；用户保存、删除时由信号立即清除
+USER_CACHE_TIMEOUT = 300
+
+
+def user_cache_key(user_id):
+    return f'library:user:{user_id}'
+
+
+def forget_user(user_id):
+    """
+    用户信息（密码、权限标志等）变化后清除缓存，下一个请求重新查询
+    用户保存、删除时由信号自动调用；用 QuerySet.update() 批量修改用户（如批量停用）不会发送信号，须自行调用
+    """
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    登录校验与 ModelBackend 相同；按会话中的用户 ID 加载用户时先读缓存，
+    已登录用户的请求不必每次查询用户表（AuthenticationMiddleware 再在同一请求内缓存 request.user）
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = User._default_manager.get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,521 @@
+import asyncio
+import http.client
+import itertools
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.contrib.auth.hashers import make_password
+from django.core.asgi import get_asgi_application
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, WSGIServer
+from django.db import connection, transaction
+from django.test import Client
+
+from . import duplicates
+from .models import Book, Category, User
+from .signals import books_imported
+
+# 生成书名、作者、简介所用的常用汉字
+COMMON_CHARS = (
+    '的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定'
+    '行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其'
+    '些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建'
+    '月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接'
+    '知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处理府研'
+)
+
+# 压测使用的用户密码
+BENCHMARK_PASSWORD = 'benchmark-pass-123'
+
+# 压测场景：登录、首页翻页、全文检索、输入提示、认证开销、添加书籍（会使缓存失效，放在最后）
+# 认证开销场景请求图书 API 并带上 If-None-Match: *，响应为 304 且内容来自缓存，耗时主要是加载会话和用户
+SCENARIOS = ('login', 'home', 'search', 'autocomplete', 'auth', 'add_book')
+
+# 认证开销场景请求的地址
+AUTH_PATH = '/api/books/'
+
+# 慢客户端把请求分成多少段发送
+SLOW_CLIENT_CHUNKS = 10
+
+# wsgi 方式另外压测并发读写混合场景
+WSGI_SCENARIOS = SCENARIOS + ('mixed',)
+
+# 读写混合场景中每隔多少个请求添加一本书，其余请求翻阅首页
+MIXED_WRITE_EVERY = 5
+
+_NEXT_CURSOR = re.compile(r'after=([A-Za-z0-9_-]+)')
+
+
+class BookFactory:
+    """按固定随机种子生成合成图书数据，相同参数生成的数据完全一致"""
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.categories = list(Category.objects.order_by('id').values_list('id', flat=True))
+        self.authors = [self.text(2, 3) for _ in range(5000)]
+
+    def text(self, low, high):
+        return ''.join(self.random.choices(COMMON_CHARS, k=self.random.randint(low, high)))
+
+    def book(self):
+        return Book(
+            title=self.text(2, 8),
+            author=self.random.choice(self.authors),
+            category_id=self.random.choice(self.categories),
+            description=self.text(60, 200),
+        )
+
+    def form_data(self):
+        book = self.book()
+        return {
+            # 书名带随机后缀：在同一个数据库上重复压测时，新增的图书不会被判定为重复而拒绝
+            'title': f'{book.title} {uuid.uuid4().hex[:8]}',
+            'author': book.author,
+            'category': book.category_id,
+            'description': book.description,
+            'cover_image': '',
+        }
+
+
+def seed_books(target, factory, batch_size=5000, progress=None):
+    """补齐图书到 target 本（已有的不重复生成），返回新增数量"""
+    existing = Book.objects.count()
+    created = 0
+    while existing + created < target:
+        count = min(batch_size, target - existing - created)
+        with transaction.atomic():
+            books = [factory.book() for _ in range(count)]
+            # bulk_create 不会触发 pre_save，手动生成查重键
+            for book in books:
+                duplicates.book_key(book)
+            Book.objects.bulk_create(books)
+            # 与 import_books 相同，写入后（已持有写锁）取回主键最大的 count 本，通知全文索引等模块
+            books_imported.send(sender=Book, books=list(Book.objects.order_by('-pk')[:count])[::-1])
+        created += count
+        if progress:
+            progress(existing + created)
+    return created
+
+
+def seed_users(target):
+    """补齐压测用户到 target 个，所有用户共用一个预先计算的密码哈希"""
+    existing = User.objects.filter(username__startswith='bench').count()
+    password = make_password(BENCHMARK_PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'bench{index}', password=password)
+        for index in range(existing, target)
+    ])
+    return max(target - existing, 0)
+
+
+def search_terms(factory, count=200):
+    """从已有书名中随机截取二字词作为检索词"""
+    last = Book.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    ids = [factory.random.randint(1, last) for _ in range(count)] if last else []
+    titles = Book.objects.filter(pk__in=ids).values_list('title', flat=True)
+    terms = []
+    for title in titles:
+        if len(title) >= 2:
+            start = factory.random.randint(0, len(title) - 2)
+            terms.append(title[start:start + 2])
+    return terms or ['三体']
+
+
+def percentile(sorted_values, fraction):
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(latencies, errors, elapsed, queries=None):
+    """汇总一个场景的吞吐量与延迟（毫秒）"""
+    values = sorted(latency * 1000 for latency in latencies)
+    result = {
+        'requests': len(values),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(values) / len(values), 3) if values else 0.0,
+        'p50_ms': round(percentile(values, 0.50), 3),
+        'p95_ms': round(percentile(values, 0.95), 3),
+        'p99_ms': round(percentile(values, 0.99), 3),
+        'max_ms': round(values[-1], 3) if values else 0.0,
+    }
+    if queries is not None:
+        result['avg_queries'] = round(sum(queries) / len(queries), 2) if queries else 0.0
+    return result
+
+
+class QueryCounter:
+    """统计当前线程执行的 SQL 数量，开销远小于 CaptureQueriesContext"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Workload:
+    """各场景的请求参数，两种压测方式共用"""
+
+    def __init__(self, factory, terms, user_count):
+        self.factory = factory
+        self.terms = terms
+        self.user_count = max(user_count, 1)
+        self._lock = threading.Lock()
+        self._cursor = None
+
+    def username(self):
+        return f'bench{self.factory.random.randrange(self.user_count)}'
+
+    def home_path(self):
+        """沿着“下一页”链接依次翻页，翻到最后一页后回到第一页"""
+        with self._lock:
+            cursor = self._cursor
+        return '/home/' + (f'?sort=id&after={cursor}' if cursor else '')
+
+    def home_response(self, body):
+        match = _NEXT_CURSOR.search(body)
+        with self._lock:
+            self._cursor = match.group(1) if match else None
+
+    def search_path(self):
+        return '/search/?' + urlencode({'q': self.factory.random.choice(self.terms)})
+
+    def autocomplete_path(self):
+        return '/autocomplete/?' + urlencode({'q': self.factory.random.choice(self.terms)[:1]})
+
+
+def run_client(workload, requests, cold_cache=False):
+    """
+    通过 Django 测试客户端在进程内发起请求（不经过网络），同时统计每个请求的 SQL 数量
+    :return: 场景 -> 统计结果
+    """
+    from django.core.cache import cache
+
+    results = {}
+    client = Client()
+    client.login(username=workload.username(), password=BENCHMARK_PASSWORD)
+
+    def measure(name, send, check):
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            if cold_cache:
+                cache.clear()
+            counter = QueryCounter()
+            begin = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                response = send()
+            latencies.append(time.perf_counter() - begin)
+            queries.append(counter.count)
+            if not check(response):
+                errors += 1
+        results[name] = summarize(latencies, errors, time.perf_counter() - started, queries)
+
+    def login():
+        return Client().post('/', {'username': workload.username(), 'password': BENCHMARK_PASSWORD})
+
+    def home():
+        response = client.get(workload.home_path())
+        workload.home_response(response.content.decode('utf-8'))
+        return response
+
+    measure('login', login, lambda r: r.status_code == 302 and r.url.endswith('/home/'))
+    measure('home', home, lambda r: r.status_code == 200)
+    measure('search', lambda: client.get(workload.search_path()), lambda r: r.status_code == 200)
+    measure('autocomplete', lambda: client.get(workload.autocomplete_path()), lambda r: r.status_code == 200)
+    measure('auth', lambda: client.get(AUTH_PATH, HTTP_IF_NONE_MATCH='*'), lambda r: r.status_code == 304)
+    measure('add_book', lambda: client.post('/add_book/', workload.factory.form_data()),
+            lambda r: r.status_code == 302)
+    return results
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """不输出访问日志，避免日志影响压测结果"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    固定线程数的 WSGI 服务器，与 gunicorn gthread 等生产部署一致：
+    每个连接从读取请求到返回响应都占用一个线程，线程用完后新连接排队等待
+    """
+
+    request_queue_size = 1024
+
+    def __init__(self, *args, threads, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class BenchmarkServer:
+    """在后台线程中运行的本地 WSGI 服务器；threads 为 None 时每个连接一个新线程，否则使用固定线程数"""
+
+    def __init__(self, threads=None):
+        if threads is None:
+            self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+        else:
+            self.server = PooledWSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False, threads=threads)
+        self.server.set_app(WSGIHandler())
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class AsgiBenchmarkServer:
+    """在后台线程中运行的本地 uvicorn 服务器（单进程、单事件循环）"""
+
+    def __init__(self):
+        import uvicorn
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.bind(('127.0.0.1', 0))
+        self.port = self.socket.getsockname()[1]
+        config = uvicorn.Config(get_asgi_application(), lifespan='off', log_level='warning', access_log=False)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.server.serve(sockets=[self.socket])), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
+        self.socket.close()
+
+
+class HttpSession:
+    """保存 Cookie 的简单 HTTP 客户端，每个请求使用新连接（wsgiref 服务器不支持长连接）"""
+
+    def __init__(self, port):
+        self.port = port
+        self.cookies = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, path, data=None, headers=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        headers = dict(headers or {})
+        with self._lock:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        body = None
+        if data is not None:
+            with self._lock:
+                data = dict(data, csrfmiddlewaretoken=self.cookies.get('csrftoken', ''))
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            content = response.read().decode('utf-8', 'replace')
+            cookie = SimpleCookie()
+            for header in response.headers.get_all('Set-Cookie') or []:
+                cookie.load(header)
+            with self._lock:
+                self.cookies.update({key: morsel.value for key, morsel in cookie.items()})
+            return response.status, response.getheader('Location', ''), content
+        finally:
+            conn.close()
+
+    def login(self, username):
+        # 先访问登录页获取 CSRF Cookie
+        self.request('GET', '/')
+        return self.request('POST', '/', {'username': username, 'password': BENCHMARK_PASSWORD})
+
+
+def run_wsgi(workload, requests, concurrency):
+    """
+    启动本地 WSGI 服务器，用 concurrency 个线程并发发起真实 HTTP 请求
+    :return: 场景 -> 统计结果
+    """
+    results = {}
+    with BenchmarkServer() as server:
+        session = HttpSession(server.port)
+        session.login(workload.username())
+
+        def measure(name, send, expected_status):
+            def one(_):
+                begin = time.perf_counter()
+                try:
+                    status = send()
+                except OSError:
+                    status = None
+                return time.perf_counter() - begin, status == expected_status
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(one, range(requests)))
+            elapsed = time.perf_counter() - started
+            errors = sum(1 for _, ok in outcomes if not ok)
+            results[name] = summarize([latency for latency, _ in outcomes], errors, elapsed)
+
+        def login():
+            # CSRF Cookie 与会话无关，新会话复用已取得的 Cookie，只计时登录请求本身
+            login_session = HttpSession(server.port)
+            login_session.cookies['csrftoken'] = session.cookies.get('csrftoken', '')
+            status, location, _ = login_session.request(
+                'POST', '/', {'username': workload.username(), 'password': BENCHMARK_PASSWORD}
+            )
+            return status if location.endswith('/home/') else None
+
+        def home():
+            status, _, body = session.request('GET', workload.home_path())
+            workload.home_response(body)
+            return status
+
+        measure('login', login, 302)
+        measure('home', home, 200)
+        measure('search', lambda: session.request('GET', workload.search_path())[0], 200)
+        measure('autocomplete', lambda: session.request('GET', workload.autocomplete_path())[0], 200)
+        measure('auth', lambda: session.request('GET', AUTH_PATH, headers={'If-None-Match': '*'})[0], 304)
+        measure('add_book', lambda: session.request('POST', '/add_book/', workload.factory.form_data())[0], 302)
+
+        # 并发读写混合：添加书籍使首页缓存失效，翻页请求与写入同时访问数据库，体现 SQLite 日志模式对并发的影响
+        counter = itertools.count()
+
+        def mixed():
+            if next(counter) % MIXED_WRITE_EVERY == 0:
+                status = session.request('POST', '/add_book/', workload.factory.form_data())[0]
+                return 200 if status == 302 else status
+            return home()
+
+        measure('mixed', mixed, 200)
+    return results
+
+
+async def _send(port, request, trickle, chunks):
+    """发送请求并读取响应，返回状态码；trickle 秒内把请求分 chunks 段慢慢发出，模拟网络很慢的客户端"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        step = -(-len(request) // chunks)
+        for start in range(0, len(request), step):
+            if start:
+                await asyncio.sleep(trickle / (chunks - 1))
+            writer.write(request[start:start + step])
+            await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def _slow_clients_round(port, request, clients, trickle, duration, probes, timeout):
+    """
+    clients 个慢客户端在 duration 秒内不断发出慢请求（每个客户端同一时间只有一个请求），
+    期间每隔一段时间发出一个正常速度的请求，统计慢请求的完成速度和正常请求的延迟
+    """
+    async def one(trickle, chunks):
+        begin = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(_send(port, request, trickle, chunks), timeout)
+        except (OSError, ValueError, IndexError, asyncio.TimeoutError):
+            status = None
+        return time.perf_counter() - begin, status == 200
+
+    async def slow_client(deadline):
+        outcomes = []
+        while time.perf_counter() < deadline:
+            outcomes.append(await one(trickle, SLOW_CLIENT_CHUNKS))
+        return outcomes
+
+    async def probe_all():
+        tasks = []
+        for _ in range(probes):
+            await asyncio.sleep(duration / (probes + 1))
+            tasks.append(asyncio.ensure_future(one(0, 1)))
+        return await asyncio.gather(*tasks)
+
+    started = time.perf_counter()
+    slow, fast = await asyncio.gather(
+        asyncio.gather(*(slow_client(started + duration) for _ in range(clients))),
+        probe_all(),
+    )
+    elapsed = time.perf_counter() - started
+    slow = [outcome for outcomes in slow for outcome in outcomes]
+    completed = sum(1 for _, ok in slow if ok)
+    probe = summarize([latency for latency, _ in fast], sum(1 for _, ok in fast if not ok), elapsed)
+    return {
+        'clients': clients,
+        'slow_completed': completed,
+        'slow_errors': len(slow) - completed,
+        'slow_rps': round(completed / elapsed, 2),
+        'probe_p50_ms': probe['p50_ms'],
+        'probe_p95_ms': probe['p95_ms'],
+        'probe_errors': probe['errors'],
+    }
+
+
+def run_slow_clients(workload, mode, client_counts, trickle, duration, probes, threads, timeout, path='/home/'):
+    """
+    慢客户端压测：wsgi 方式为固定 threads 个线程的 WSGI 服务器，asgi 方式为单进程 uvicorn
+    :return: 每个并发数一条统计结果
+    """
+    server = BenchmarkServer(threads) if mode == 'wsgi' else AsgiBenchmarkServer()
+    results = []
+    with server:
+        session = HttpSession(server.port)
+        session.login(workload.username())
+        cookie = '; '.join(f'{key}={value}' for key, value in session.cookies.items())
+        request = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\nConnection: close\r\n\r\n'.encode('ascii')
+        # 预热缓存
+        session.request('GET', path)
+        for clients in client_counts:
+            results.append(asyncio.run(_slow_clients_round(server.port, request, clients, trickle, duration, probes, timeout)))
+    return results
+
+
+def compare(baseline, current):
+    """
+    对比两次压测结果，返回 (书籍数, 方式, 场景, 基线 p95, 当前 p95, 基线 rps, 当前 rps) 列表
+    只对比两边都存在的组合
+    """
+    def index(report):
+        return {(run['books'], run['mode']): run['scenarios'] for run in report.get('runs', [])}
+
+    old, new = index(baseline), index(current)
+    rows = []
+    for key in sorted(set(old) & set(new)):
+        for scenario in WSGI_SCENARIOS:
+            if scenario in old[key] and scenario in new[key]:
+                before, after = old[key][scenario], new[key][scenario]
+                rows.append((key[0], key[1], scenario, before['p95_ms'], after['p95_ms'], before['rps'], after['rps']))
+    return rows
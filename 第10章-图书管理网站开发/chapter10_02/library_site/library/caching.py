@@ -0,0 +1,73 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+# 图书目录版本号，任何图书新增、修改、删除都会递增，旧版本的列表缓存随之失效
+CATALOGUE_VERSION_KEY = 'library:catalogue_version'
+
+# 人气版本号，书架增删（shelf_count 变化）时递增，只有依赖 shelf_count 的缓存（人气排序、接口返回的书架人数）包含它
+POPULARITY_VERSION_KEY = 'library:popularity_version'
+
+# 首页分页数据的缓存时间（秒）
+PAGE_CACHE_TIMEOUT = 300
+
+# 图书卡片片段的缓存时间（秒），缓存键包含图书的更新时间
+CARD_CACHE_TIMEOUT = 3600
+
+
+def _initial_version():
+    # 以当前时间作为初始值，版本号被淘汰后重新生成也不会与旧缓存键重复
+    return int(time.time() * 1000)
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # 版本号已被淘汰，重新生成
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.incr(key)
+
+
+def get_catalogue_version():
+    """当前目录版本号"""
+    return _get_version(CATALOGUE_VERSION_KEY)
+
+
+def bump_catalogue_version():
+    """目录发生变化：递增版本号，使列表缓存全部失效"""
+    return _bump_version(CATALOGUE_VERSION_KEY)
+
+
+def get_popularity_version():
+    """当前人气版本号，作为缓存键的一部分传给 make_key"""
+    return _get_version(POPULARITY_VERSION_KEY)
+
+
+def bump_popularity_version():
+    """书架人数发生变化：只使依赖 shelf_count 的缓存失效"""
+    return _bump_version(POPULARITY_VERSION_KEY)
+
+
+def make_key(prefix, *parts):
+    """由版本号和请求参数生成缓存键，参数做摘要避免键过长或含非法字符"""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'library:{prefix}:{get_catalogue_version()}:{digest}'
+
+
+def get_or_set(key, compute, timeout=PAGE_CACHE_TIMEOUT):
+    """读取缓存，未命中时计算并写入"""
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
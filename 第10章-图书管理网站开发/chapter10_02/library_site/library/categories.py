@@ -0,0 +1,27 @@
+from collections import Counter
+
+from django.db.models import F
+
+from .caching import get_or_set, make_key
+from .models import Category
+
+
+def adjust_book_counts(deltas):
+    """按 分类 ID -> 增量 更新分类图书数量，在数据库中增减，并发修改不会丢失计数"""
+    for category_id, delta in deltas.items():
+        if category_id is None or not delta:
+            continue
+        Category.objects.filter(pk=category_id).update(book_count=F('book_count') + delta)
+
+
+def count_books(books):
+    """统计一批图书各分类的数量（批量导入后使用）"""
+    return Counter(book.category_id for book in books)
+
+
+def get_categories():
+    """
+    分类导航使用的分类列表（包含图书数量）
+    按目录版本缓存，图书变化后重新读取分类表，不需要对图书表做分组统计
+    """
+    return get_or_set(make_key('categories'), lambda: list(Category.objects.all()))
@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Book, Copy, Loan, Reservation
+
+# 并发借阅同一本书时用副本的版本号做乐观锁（SQLite 不支持 SELECT ... FOR UPDATE）：
+# 先读出若干可借副本的 (id, version)，再以状态和版本都未变化为条件更新，更新成功才算借到，失败则换下一个副本；
+# 借阅表上“同一副本只有一条未归还借阅”的部分唯一约束作为最后一道保障。
+# 事务中总是先 UPDATE 再读取：SQLite 事务先读后写时，共享锁升级为写锁可能因其他写事务直接失败，
+# 先写则一开始就取得写锁，其他写事务按 busy timeout 排队等待。
+
+# 借阅期限（天）
+LOAN_DAYS = 30
+
+# 每个用户同时借阅的上限
+MAX_ACTIVE_LOANS = 5
+
+# 每轮读取的可借副本数量，以及读取的轮数（副本都被抢走后重新读取）
+CHECKOUT_CANDIDATES = 5
+CHECKOUT_ROUNDS = 3
+
+
+class CirculationError(Exception):
+    """借阅操作无法完成，消息可以直接展示给用户"""
+
+
+def _claim(user, copy_id, book_id, from_status, version):
+    """
+    以乐观锁借出一个副本，返回借阅记录；副本已被他人抢先时返回 None
+    """
+    with transaction.atomic():
+        claimed = Copy.objects.filter(pk=copy_id, status=from_status, version=version).update(
+            status=Copy.ON_LOAN, version=F('version') + 1,
+        )
+        if not claimed:
+            return None
+        # 已持有写锁，同一用户的并发借阅在这里串行，以下检查不会被绕过
+        active = Loan.objects.filter(user=user, returned_at__isnull=True)
+        if active.filter(copy__book_id=book_id).exists():
+            raise CirculationError('你已借阅这本书')
+        if active.count() >= MAX_ACTIVE_LOANS:
+            raise CirculationError(f'最多同时借阅 {MAX_ACTIVE_LOANS} 本书，请先归还')
+        loan = Loan.objects.create(copy_id=copy_id, user=user, due_at=timezone.now() + timedelta(days=LOAN_DAYS))
+        Reservation.objects.filter(
+            user=user, book_id=book_id, status__in=Reservation.ACTIVE_STATUSES,
+        ).update(status=Reservation.FULFILLED)
+    return loan
+
+
+def borrow(user, book_id):
+    """
+    借阅一本书，返回借阅记录
+    有为该用户保留的副本时优先借出保留副本；没有可借副本或超出借阅上限时抛出 CirculationError，图书不存在时抛出 Book.DoesNotExist
+    """
+    held = Reservation.objects.filter(
+        user=user, book_id=book_id, status=Reservation.READY, copy__isnull=False,
+    ).values_list('copy_id', 'copy__version').first()
+    if held is not None:
+        loan = _claim(user, held[0], book_id, Copy.RESERVED, held[1])
+        if loan is not None:
+            return loan
+
+    for _ in range(CHECKOUT_ROUNDS):
+        candidates = list(
+            Copy.objects.filter(book_id=book_id, status=Copy.AVAILABLE).values_list('pk', 'version')[:CHECKOUT_CANDIDATES]
+        )
+        if not candidates:
+            break
+        for copy_id, version in candidates:
+            loan = _claim(user, copy_id, book_id, Copy.AVAILABLE, version)
+            if loan is not None:
+                return loan
+
+    if not Book.objects.filter(pk=book_id).exists():
+        raise Book.DoesNotExist(f'图书 {book_id} 不存在')
+    raise CirculationError('暂无可借副本，可以预约排队')
+
+
+def _release_copy(copy_id, book_id):
+    """副本回到馆内：有人排队时保留给最早预约的用户，否则恢复可借（调用方须已在事务中取得写锁）"""
+    waiting = Reservation.objects.filter(book_id=book_id, status=Reservation.WAITING).order_by('id').first()
+    if waiting is None:
+        Copy.objects.filter(pk=copy_id).update(status=Copy.AVAILABLE, version=F('version') + 1)
+        return None
+    Copy.objects.filter(pk=copy_id).update(status=Copy.RESERVED, version=F('version') + 1)
+    Reservation.objects.filter(pk=waiting.pk).update(status=Reservation.READY, copy_id=copy_id)
+    return waiting
+
+
+def return_loan(user, loan_id):
+    """归还借阅，返回被保留副本的预约（没有人排队时为 None）"""
+    with transaction.atomic():
+        returned = Loan.objects.filter(pk=loan_id, user=user, returned_at__isnull=True).update(
+            returned_at=timezone.now(),
+        )
+        if not returned:
+            raise CirculationError('借阅记录不存在或已归还')
+        copy_id, book_id = Loan.objects.values_list('copy_id', 'copy__book_id').get(pk=loan_id)
+        return _release_copy(copy_id, book_id)
+
+
+def reserve(user, book_id):
+    """预约排队，返回预约记录；没有馆藏、有可借副本、已借阅或已预约时抛出 CirculationError"""
+    if not Book.objects.filter(pk=book_id).exists():
+        raise Book.DoesNotExist(f'图书 {book_id} 不存在')
+    available, total = availability(book_id)
+    if not total:
+        raise CirculationError('这本书暂无馆藏副本')
+    if available:
+        raise CirculationError('当前有可借副本，请直接借阅')
+    if Loan.objects.filter(user=user, copy__book_id=book_id, returned_at__isnull=True).exists():
+        raise CirculationError('你已借阅这本书')
+    try:
+        with transaction.atomic():
+            return Reservation.objects.create(user=user, book_id=book_id)
+    except IntegrityError:
+        raise CirculationError('你已预约这本书')
+
+
+def cancel_reservation(user, reservation_id):
+    """取消预约；已为该预约保留的副本转给下一位排队的用户"""
+    with transaction.atomic():
+        cancelled = Reservation.objects.filter(
+            pk=reservation_id, user=user, status__in=Reservation.ACTIVE_STATUSES,
+        ).update(status=Reservation.CANCELLED)
+        if not cancelled:
+            raise CirculationError('预约不存在或已结束')
+        copy_id, book_id = Reservation.objects.values_list('copy_id', 'book_id').get(pk=reservation_id)
+        if copy_id is not None:
+            Reservation.objects.filter(pk=reservation_id).update(copy=None)
+            _release_copy(copy_id, book_id)
+
+
+def availability(book_id):
+    """某本书的副本数量：(可借, 总数)"""
+    counts = dict(
+        Copy.objects.filter(book_id=book_id).exclude(status=Copy.LOST)
+        .values('status').annotate(total=Count('id')).values_list('status', 'total')
+    )
+    return counts.get(Copy.AVAILABLE, 0), sum(counts.values())
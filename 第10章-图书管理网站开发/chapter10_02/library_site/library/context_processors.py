@@ -0,0 +1,8 @@
+from .caching import CARD_CACHE_TIMEOUT
+
+
+def catalogue(request):
+    """向模板提供图书卡片片段的缓存时间"""
+    return {
+        'card_cache_timeout': CARD_CACHE_TIMEOUT,
+    }
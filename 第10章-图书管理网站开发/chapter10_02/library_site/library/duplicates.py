@@ -0,0 +1,133 @@
+import unicodedata
+
+from django.db.models import Count, Q
+
+from .models import Book
+
+# 规范化后书名、作者的最大长度（与模型字段长度一致，兼容字符展开后过长的极端情况）
+MAX_TITLE_KEY = 200
+MAX_AUTHOR_KEY = 100
+
+# 书名与作者之间的分隔符（属于符号类字符，规范化后的书名、作者中不会出现）
+KEY_SEPARATOR = '|'
+
+# ISBN 唯一约束是部分索引（只包含非空 ISBN），查询中带上同样的条件 SQLite 才会使用该索引
+HAS_ISBN = ~Q(isbn='')
+
+# 批量查重时每条查询携带的键数量，避免超出 SQLite 参数个数上限
+LOOKUP_CHUNK_SIZE = 500
+
+
+def normalize_text(text):
+    """
+    规范化文本用于查重：NFKC 把全角字符折叠为半角，casefold 忽略大小写，
+    再去掉标点、符号、空白和控制字符，如“Python 编程：入门”与“python编程入门”结果相同
+    """
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return ''.join(ch for ch in text if unicodedata.category(ch)[0] not in 'PSZC')
+
+
+def normalize_key(title, author):
+    """
+    书名 + 作者的规范化查重键
+    书名全部由标点、符号组成时规范化结果为空，返回空字符串表示没有查重键（只按 ISBN 查重），
+    否则这些图书的键都相同，会被互相判定为重复
+    """
+    title_key = normalize_text(title)[:MAX_TITLE_KEY]
+    if not title_key:
+        return ''
+    return title_key + KEY_SEPARATOR + normalize_text(author)[:MAX_AUTHOR_KEY]
+
+
+def book_key(book):
+    """根据书名、作者刷新图书的查重键（bulk_create 不会触发 pre_save，批量写入前需手动调用）"""
+    book.normalized_key = normalize_key(book.title, book.author)
+    return book.normalized_key
+
+
+def normalize_isbn(value):
+    """
+    规范化 ISBN：去掉连字符和空格，ISBN-10 转换为 ISBN-13，空值返回空字符串
+    格式或校验位错误时抛出 ValueError
+    """
+    isbn = ''.join(ch for ch in unicodedata.normalize('NFKC', value or '') if ch.isalnum()).upper()
+    if not isbn:
+        return ''
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == 'X'):
+        digits = [10 if ch == 'X' else int(ch) for ch in isbn]
+        if sum((10 - i) * d for i, d in enumerate(digits)) % 11:
+            raise ValueError('ISBN-10 校验位错误')
+        isbn = '978' + isbn[:9]
+        return isbn + _isbn13_check_digit(isbn)
+    if len(isbn) == 13 and isbn.isdigit():
+        if isbn[12] != _isbn13_check_digit(isbn[:12]):
+            raise ValueError('ISBN-13 校验位错误')
+        return isbn
+    raise ValueError('ISBN 应为 10 位或 13 位')
+
+
+def _isbn13_check_digit(first12):
+    total = sum(int(ch) * (3 if i % 2 else 1) for i, ch in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def find_duplicate(title, author, isbn='', exclude_pk=None):
+    """
+    查找与给定书名/作者或 ISBN 重复的已有图书，没有时返回 None
+    查重键和 ISBN 都有索引，一条查询完成，不扫描图书表
+    """
+    key = normalize_key(title, author)
+    condition = Q()
+    if key:
+        condition |= Q(normalized_key=key)
+    if isbn:
+        condition |= Q(isbn=isbn) & HAS_ISBN
+    if not condition:
+        return None
+    books = Book.objects.filter(condition).only('id', 'title', 'author', 'isbn').order_by('id')
+    if exclude_pk is not None:
+        books = books.exclude(pk=exclude_pk)
+    return books.first()
+
+
+def existing_duplicates(keys, isbns=()):
+    """
+    批量查重：返回 ({查重键: 图书编号}, {ISBN: 图书编号})，只包含已存在的键
+    按索引分批查询，每批一条 SQL，同一键对应多本书时取编号最小的一本
+    """
+    keys = list(set(key for key in keys if key))
+    isbns = list(set(isbn for isbn in isbns if isbn))
+    by_key = {}
+    by_isbn = {}
+    for start in range(0, max(len(keys), len(isbns)), LOOKUP_CHUNK_SIZE):
+        condition = Q(normalized_key__in=keys[start:start + LOOKUP_CHUNK_SIZE])
+        if isbns[start:start + LOOKUP_CHUNK_SIZE]:
+            condition |= Q(isbn__in=isbns[start:start + LOOKUP_CHUNK_SIZE]) & HAS_ISBN
+        for pk, key, isbn in Book.objects.filter(condition).values_list('id', 'normalized_key', 'isbn'):
+            by_key[key] = min(pk, by_key.get(key, pk))
+            if isbn:
+                by_isbn[isbn] = min(pk, by_isbn.get(isbn, pk))
+    key_set = set(keys)
+    isbn_set = set(isbns)
+    return (
+        {key: pk for key, pk in by_key.items() if key in key_set},
+        {isbn: pk for isbn, pk in by_isbn.items() if isbn in isbn_set},
+    )
+
+
+def duplicate_groups(limit=None):
+    """
+    已有数据中书名/作者重复的图书，返回 [(查重键, [图书, ...]), ...]，每组按编号排序
+    按查重键索引分组统计，再一条查询取出这些组的图书；limit 限制返回的组数
+    """
+    keys = (
+        Book.objects.exclude(normalized_key='').values('normalized_key').annotate(total=Count('id')).filter(total__gt=1)
+        .order_by('normalized_key').values_list('normalized_key', flat=True)
+    )
+    keys = list(keys[:limit] if limit else keys)
+    groups = {key: [] for key in keys}
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        books = Book.objects.filter(normalized_key__in=keys[start:start + LOOKUP_CHUNK_SIZE])
+        for book in books.only('id', 'title', 'author', 'isbn', 'normalized_key').order_by('id'):
+            groups[book.normalized_key].append(book)
+    return list(groups.items())
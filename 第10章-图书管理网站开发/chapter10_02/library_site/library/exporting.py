@@ -0,0 +1,56 @@
+import csv
+import json
+
+from .models import Book, Category
+
+# 导出的字段，CSV 表头与 import_books 可识别的字段一致
+EXPORT_FIELDS = ('id', 'title', 'author', 'isbn', 'category', 'description', 'cover_image')
+
+# 每次从数据库游标读取的行数
+EXPORT_CHUNK_SIZE = 2000
+
+# 支持的导出格式：格式 -> (Content-Type, 扩展名)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+
+
+class Echo:
+    """csv.writer 需要一个带 write 方法的对象，这里直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """按主键顺序分块读取图书，只取导出字段的元组，内存占用与图书总数无关"""
+    # 分类导出为名称：分类很少，预先读出 ID -> 名称，不与分类表连接查询
+    category_names = dict(Category.objects.values_list('id', 'name'))
+    position = EXPORT_FIELDS.index('category')
+    for row in Book.objects.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        row = list(row)
+        row[position] = category_names.get(row[position], '')
+        yield row
+
+
+def csv_lines(rows):
+    """逐行生成 CSV 文本，首行带 BOM 便于 Excel 正确识别中文"""
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    """逐行生成 JSON Lines 文本"""
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n'
+
+
+def export_lines(file_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """按格式生成导出内容"""
+    rows = iter_rows(chunk_size)
+    if file_format == 'csv':
+        return csv_lines(rows)
+    return jsonl_lines(rows)
@@ -1,35 +1,72 @@
 from django import forms
-from .models import Book
-
-# 定义可能的分类选项
-CATEGORY_CHOICES = [
-    ('文学', '文学'),
-    ('科幻', '科幻'),
-    ('古典文学', '古典文学'),
-    ('历史', '历史'),
-    ('童话', '童话'),
-    ('推理', '推理'),
-    ('技术', '技术'),
-    ('艺术', '艺术'),
-    ('哲学', '哲学'),
-    ('其他', '其他'),
-]
+from . import duplicates
+from .models import Book, Category
+from .thumbnails import save_upload
 
 class BookForm(forms.ModelForm):
-    category = forms.ChoiceField(choices=CATEGORY_CHOICES, widget=forms.Select(attrs={'class': 'form-control'}), label='分类')
+    category = forms.ModelChoiceField(queryset=Category.objects.all(), empty_label=None, widget=forms.Select(attrs={'class': 'form-control'}), label='分类')
+    cover_upload = forms.ImageField(required=False, widget=forms.ClearableFileInput(attrs={'class': 'form-control'}), label='上传封面')
     
     class Meta:
         model = Book
-        fields = ['title', 'author', 'category', 'description', 'cover_image']
+        fields = ['title', 'author', 'isbn', 'category', 'description', 'cover_image']
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'author': forms.TextInput(attrs={'class': 'form-control'}),
+            'isbn': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 5}),
             'cover_image': forms.TextInput(attrs={'class': 'form-control'}),
         }
         labels = {
             'title': '书名',
             'author': '作者',
+            'isbn': 'ISBN',
             'description': '简介',
             'cover_image': '封面图片路径',
-        }
\ No newline at end of file
+        }
+    
+    def __init__(self, *args, check_duplicates=True, **kwargs):
+        # 批量导入时按批查重，不在每行的表单校验里查询数据库
+        self.check_duplicates = check_duplicates
+        super().__init__(*args, **kwargs)
+    
+    def clean_isbn(self):
+        try:
+            return duplicates.normalize_isbn(self.cleaned_data['isbn'])
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        title = cleaned_data.get('title')
+        author = cleaned_data.get('author')
+        if self.check_duplicates and title and author and 'isbn' not in self.errors:
+            # 按查重键和 ISBN 的索引查找，书名、作者只是大小写、全半角或标点不同也视为重复
+            duplicate = duplicates.find_duplicate(title, author, cleaned_data.get('isbn'), exclude_pk=self.instance.pk)
+            if duplicate is not None:
+                raise self.duplicate_error(duplicate)
+        return cleaned_data
+    
+    def duplicate_error(self, duplicate):
+        return forms.ValidationError(
+            f'图书已存在：《{duplicate.title}》（{duplicate.author}，编号 {duplicate.pk}）', code='duplicate',
+        )
+    
+    def add_duplicate_error(self):
+        """
+        校验通过后保存时违反 ISBN 唯一约束（查重之后其他请求先写入了相同 ISBN 的图书），
+        与校验时发现重复一样在表单上显示错误
+        """
+        data = self.cleaned_data
+        duplicate = duplicates.find_duplicate(data['title'], data['author'], data.get('isbn'), exclude_pk=self.instance.pk)
+        if duplicate is None:
+            self.add_error(None, forms.ValidationError('图书已存在', code='duplicate'))
+        else:
+            self.add_error(None, self.duplicate_error(duplicate))
+    
+    def save(self, commit=True):
+        # 上传了封面图片时优先使用上传的图片，保存图书时会生成缩略图
+        upload = self.cleaned_data.get('cover_upload')
+        if upload:
+            self.instance.cover_image = save_upload(upload)
+        return super().save(commit)
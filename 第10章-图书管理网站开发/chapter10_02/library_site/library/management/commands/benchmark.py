@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from library import benchmarks
+from library.models import Book
+
+# 生成数据时每隔多少本输出一次进度
+PROGRESS_EVERY = 100000
+
+
+class Command(BaseCommand):
+    help = '在独立的压测数据库中生成合成数据，测量登录、首页、检索、添加书籍等视图的吞吐量和延迟，输出 JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, nargs='+', default=[10000],
+                            help='图书数量，可指定多个（如 10000 100000 1000000），按从小到大依次补齐数据并压测')
+        parser.add_argument('--users', type=int, default=100, help='压测用户数量')
+        parser.add_argument('--requests', type=int, default=200, help='每个场景的请求数')
+        parser.add_argument('--mode', choices=['client', 'wsgi', 'both'], default='both',
+                            help='client：测试客户端进程内请求；wsgi：本地 WSGI 服务器真实 HTTP 请求')
+        parser.add_argument('--concurrency', type=int, default=4, help='wsgi 方式的并发线程数')
+        parser.add_argument('--cold-cache', action='store_true', help='client 方式每个请求前清空缓存，测量未命中缓存的性能')
+        parser.add_argument('--database', help='压测数据库文件，默认使用临时文件；配合 --keepdb 可复用已生成的数据')
+        parser.add_argument('--keepdb', action='store_true', help='压测结束后保留压测数据库')
+        parser.add_argument('--seed', type=int, default=0, help='合成数据的随机种子')
+        parser.add_argument('--output', help='结果 JSON 文件路径，默认输出到标准输出')
+        parser.add_argument('--compare', help='与之前保存的结果 JSON 对比 p95 延迟和吞吐量')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('压测命令目前只支持 SQLite 数据库')
+        sizes = sorted(set(options['books']))
+        if sizes[0] < 1 or options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('图书数量、请求数和并发数必须大于 0')
+
+        temp_dir = None if options['database'] else tempfile.mkdtemp(prefix='library-bench-')
+        database = options['database'] or os.path.join(temp_dir, 'bench.sqlite3')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = database
+        old_name = connection.creation.create_test_db(verbosity=0, keepdb=options['keepdb'], serialize=False)
+        try:
+            # 关闭 DEBUG，避免记录每条 SQL 影响结果；允许测试客户端和本地服务器的主机名
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver', '127.0.0.1', 'localhost']):
+                report = self._run(sizes, options, database)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            if temp_dir and not options['keepdb']:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stderr.write(f'结果已保存到 {options["output"]}')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self._print_comparison(options['compare'], report)
+
+    def _run(self, sizes, options, database):
+        factory = benchmarks.BookFactory(options['seed'])
+        modes = ['client', 'wsgi'] if options['mode'] == 'both' else [options['mode']]
+        report = {'meta': self._meta(options, database), 'runs': []}
+
+        benchmarks.seed_users(options['users'])
+        for size in sizes:
+            started = time.perf_counter()
+            created = benchmarks.seed_books(size, factory, progress=self._report_progress)
+            seed_seconds = time.perf_counter() - started
+            self.stderr.write(f'图书 {Book.objects.count()} 本（新增 {created} 本，耗时 {seed_seconds:.1f} 秒）')
+
+            terms = benchmarks.search_terms(factory)
+            for mode in modes:
+                self.stderr.write(f'压测 {mode}：{size} 本图书，每个场景 {options["requests"]} 个请求')
+                workload = benchmarks.Workload(factory, terms, options['users'])
+                if mode == 'client':
+                    scenarios = benchmarks.run_client(workload, options['requests'], options['cold_cache'])
+                else:
+                    scenarios = benchmarks.run_wsgi(workload, options['requests'], options['concurrency'])
+                report['runs'].append({
+                    'books': size,
+                    'mode': mode,
+                    'concurrency': options['concurrency'] if mode == 'wsgi' else 1,
+                    'seed_seconds': round(seed_seconds, 2),
+                    'scenarios': scenarios,
+                })
+                for name, result in scenarios.items():
+                    self.stderr.write(
+                        f'  {name:<12} {result["rps"]:>9.1f} req/s  p50 {result["p50_ms"]:>8.2f} ms  '
+                        f'p95 {result["p95_ms"]:>8.2f} ms  错误 {result["errors"]}'
+                    )
+        return report
+
+    def _report_progress(self, count):
+        if count % PROGRESS_EVERY == 0:
+            self.stderr.write(f'已生成 {count} 本图书')
+
+    def _meta(self, options, database):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_commit': commit,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'database': database,
+            'cache_backend': settings.CACHES['default']['BACKEND'],
+            'cold_cache': options['cold_cache'],
+            'users': options['users'],
+            'requests_per_scenario': options['requests'],
+            'seed': options['seed'],
+            'argv': sys.argv[1:],
+        }
+
+    def _print_comparison(self, path, report):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'无法读取对比结果: {e}')
+        rows = benchmarks.compare(baseline, report)
+        if not rows:
+            self.stderr.write('没有可对比的压测组合（图书数量和压测方式需一致）')
+            return
+        self.stderr.write(f'{"图书数":>8} {"方式":<6} {"场景":<12} {"p95 基线":>10} {"p95 当前":>10} {"rps 基线":>10} {"rps 当前":>10}')
+        for books, mode, scenario, old_p95, new_p95, old_rps, new_rps in rows:
+            self.stderr.write(
+                f'{books:>8} {mode:<6} {scenario:<12} {old_p95:>10.2f} {new_p95:>10.2f} {old_rps:>10.1f} {new_rps:>10.1f}'
+            )
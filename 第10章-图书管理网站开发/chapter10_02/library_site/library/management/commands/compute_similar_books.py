@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library import recommendations
+
+
+class Command(BaseCommand):
+    help = '批量计算每本书的相似图书（简介、作者、分类的 TF-IDF 余弦相似度），保存到数据库和模型文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=recommendations.SIMILAR_BOOKS, help='每本书保存的相似图书数量')
+
+    def handle(self, *args, **options):
+        if options['k'] < 1:
+            raise CommandError('相似图书数量必须大于 0')
+        started = time.perf_counter()
+        total, changed = recommendations.build(
+            options['k'], progress=lambda count: self.stderr.write(f'已计算 {count} 本图书'),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'已计算 {total} 本图书的相似图书，其中 {changed} 本有变化，耗时 {elapsed:.2f} 秒'
+        ))
@@ -0,0 +1,52 @@
+import time
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.exporting import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = '把图书目录导出为 CSV 或 JSON Lines 文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='输出文件路径，默认输出到标准输出')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), help='文件格式，默认按扩展名判断，标准输出默认为 csv')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='每次从数据库读取的行数')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or self._guess_format(path)
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size 必须大于 0')
+
+        started = time.perf_counter()
+        count = 0
+        if path == '-':
+            # 写入命令的输出流（call_command 可以通过 stdout 参数接收），每行已带换行符
+            write = partial(self.stdout.write, ending='')
+            f = None
+        else:
+            try:
+                f = open(path, 'w', encoding='utf-8', newline='')
+            except OSError as e:
+                raise CommandError(f'无法写入文件: {e}')
+            write = f.write
+        try:
+            for line in export_lines(file_format, options['chunk_size']):
+                write(line)
+                count += 1
+        finally:
+            if f is not None:
+                f.close()
+
+        if path != '-':
+            # CSV 第一行是表头
+            books = count - 1 if file_format == 'csv' else count
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f'已导出 {books} 本图书到 {path}，耗时 {elapsed:.2f} 秒'))
+
+    def _guess_format(self, path):
+        if path.endswith(('.jsonl', '.ndjson')):
+            return 'jsonl'
+        return 'csv'
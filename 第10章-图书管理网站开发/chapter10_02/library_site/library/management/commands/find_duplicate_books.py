@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library import duplicates
+
+
+class Command(BaseCommand):
+    help = '列出已有数据中书名/作者重复的图书（忽略大小写、全半角和标点）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='最多列出的重复组数，0 表示全部')
+
+    def handle(self, *args, **options):
+        if options['limit'] < 0:
+            raise CommandError('--limit 不能小于 0')
+        groups = duplicates.duplicate_groups(options['limit'])
+        for key, books in groups:
+            self.stdout.write(f'{key}：')
+            for book in books:
+                isbn = f'，ISBN {book.isbn}' if book.isbn else ''
+                self.stdout.write(f'  编号 {book.pk}《{book.title}》（{book.author}{isbn}）')
+        if groups:
+            self.stdout.write(self.style.WARNING(f'共 {len(groups)} 组重复图书'))
+        else:
+            self.stdout.write(self.style.SUCCESS('没有重复图书'))
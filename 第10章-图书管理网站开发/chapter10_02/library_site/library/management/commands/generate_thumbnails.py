@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from library import thumbnails
+from library.caching import bump_catalogue_version
+from library.models import Book
+
+
+class Command(BaseCommand):
+    help = '为已有图书的封面生成缩略图（相同封面只处理一次）'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        covers = Book.objects.exclude(cover_image='').values_list('cover_image', flat=True).distinct()
+        generated = 0
+        missing = 0
+        updated = 0
+        for cover_image in covers.iterator():
+            cover_hash = thumbnails.generate_thumbnails(cover_image)
+            if cover_hash:
+                generated += 1
+            else:
+                missing += 1
+            # 直接批量更新，不触发 pre_save 重复生成；同时更新 updated_at，使卡片缓存和详情页 ETag 失效
+            updated += Book.objects.filter(cover_image=cover_image).exclude(cover_hash=cover_hash).update(
+                cover_hash=cover_hash, updated_at=timezone.now()
+            )
+        if updated:
+            bump_catalogue_version()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'处理封面 {generated + missing} 个（无效或缺失 {missing} 个），更新图书 {updated} 本，耗时 {elapsed:.2f} 秒'
+        ))
@@ -0,0 +1,230 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from library import duplicates, thumbnails
+from library.forms import BookForm
+from library.models import Book, Category
+from library.signals import books_imported
+
+# 最多输出的错误行数，其余只计数
+MAX_REPORTED_ERRORS = 20
+
+# 输出导入进度的间隔（秒）
+PROGRESS_INTERVAL = 5
+
+# 最多记住的封面哈希数量，超过后清空，避免封面各不相同时占用过多内存
+MAX_CACHED_COVERS = 10000
+
+# 合并重复图书时补全的字段：已有图书该字段为空而导入数据非空时写入
+MERGE_FIELDS = ('isbn', 'description', 'cover_image')
+
+
+def read_csv(f):
+    """逐行读取 CSV（首行为表头），返回 (字段字典, 解析错误)"""
+    for row in csv.DictReader(f):
+        yield row, None
+
+
+def read_jsonl(f):
+    """逐行读取 JSON Lines，返回 (字段字典, 解析错误)"""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield None, f'JSON 格式错误: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield None, 'JSON 行必须是对象'
+            continue
+        yield row, None
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+class Command(BaseCommand):
+    help = '从 CSV 或 JSON Lines 文件批量导入图书（按 BookForm 规则校验）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='数据文件路径，- 表示标准输入')
+        parser.add_argument('--format', choices=sorted(READERS), help='文件格式，默认按扩展名判断')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每个事务写入的图书数量')
+        parser.add_argument('--strict', action='store_true', help='遇到无效行时停止导入（已提交的批次保留）')
+        parser.add_argument('--merge', action='store_true', help='重复图书合并到已有图书（补全空字段），默认跳过并报告')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or self._guess_format(path)
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size 必须大于 0')
+
+        f = sys.stdin if path == '-' else self._open(path)
+        try:
+            self._import(READERS[file_format](f), batch_size, options['strict'], options['merge'])
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+    def _guess_format(self, path):
+        if path.endswith('.csv'):
+            return 'csv'
+        if path.endswith(('.jsonl', '.ndjson')):
+            return 'jsonl'
+        raise CommandError('无法根据扩展名判断文件格式，请使用 --format 指定')
+
+    def _open(self, path):
+        try:
+            # utf-8-sig 兼容 Excel 导出的带 BOM 文件
+            return open(path, 'r', encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(f'无法打开文件: {e}')
+
+    def _import(self, rows, batch_size, strict, merge):
+        started = time.perf_counter()
+        imported = 0
+        invalid = 0
+        self.duplicates = 0
+        self.merged = 0
+        batch = []
+        last_report = started
+        # 封面地址 -> 内容哈希，相同封面只生成一次缩略图
+        cover_hashes = {}
+        # 数据文件中的分类是名称：预先读出全部分类，在内存中按名称查找
+        categories = {category.name: category for category in Category.objects.all()}
+
+        for line_number, (row, error) in enumerate(rows, start=1):
+            if error is None:
+                category = categories.get(row.get('category'))
+                # 查重在写入每批数据前按索引批量完成，不在表单校验中逐行查询
+                form = BookForm(data=row, check_duplicates=False)
+                # 去掉表单的分类字段，模型校验时不会逐行查询分类是否存在
+                del form.fields['category']
+                if form.is_valid() and category is not None:
+                    book = form.save(commit=False)
+                    book.category = category
+                    # bulk_create 不会触发 pre_save，在这里生成缩略图
+                    if book.cover_image not in cover_hashes:
+                        if len(cover_hashes) >= MAX_CACHED_COVERS:
+                            cover_hashes.clear()
+                        cover_hashes[book.cover_image] = thumbnails.generate_thumbnails(book.cover_image)
+                    book.cover_hash = cover_hashes[book.cover_image]
+                    duplicates.book_key(book)
+                    batch.append((line_number, book))
+                else:
+                    errors = dict(form.errors)
+                    if category is None:
+                        errors['category'] = [f'未知分类 {row.get("category")!r}']
+                    error = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in errors.items())
+
+            if error is not None:
+                invalid += 1
+                if invalid <= MAX_REPORTED_ERRORS:
+                    self.stderr.write(f'第 {line_number} 条数据无效，已跳过 - {error}')
+                if strict:
+                    raise CommandError(f'第 {line_number} 条数据无效，导入中止（已导入 {imported} 本）')
+
+            if len(batch) >= batch_size:
+                imported += self._write_batch(batch, merge)
+                batch = []
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    self.stdout.write(f'已导入 {imported} 本，{imported / (now - started):.0f} 本/秒')
+
+        if batch:
+            imported += self._write_batch(batch, merge)
+
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed else 0
+        duplicate_action = f'合并 {self.merged} 本' if merge else '已跳过'
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成：成功 {imported} 本，无效 {invalid} 条，重复 {self.duplicates} 条（{duplicate_action}），'
+            f'耗时 {elapsed:.2f} 秒，{rate:.0f} 本/秒'
+        ))
+
+    def _write_batch(self, batch, merge):
+        """一个事务写入一批图书，并通知全文索引等模块（bulk_create 不会发送 post_save 信号）"""
+        with transaction.atomic():
+            books, merges = self._split_duplicates(batch, merge)
+            Book.objects.bulk_create(books)
+            # SQLite 上 bulk_create 不回填主键，写入后再取回刚写入的图书：插入时已取得写锁，
+            # 提交前其他连接无法写入，主键最大的 len(books) 本就是本批图书（先读最大主键再写入，
+            # 两步之间其他连接提交的图书会被误当作本批图书重复索引、重复计数）
+            created = list(Book.objects.order_by('-pk')[:len(books)])[::-1] if books else []
+            books_imported.send(sender=Book, books=created)
+            if merges:
+                self._merge(merges)
+        return len(books)
+
+    def _split_duplicates(self, batch, merge):
+        """
+        按查重键和 ISBN 的索引一次查出本批中已存在的图书，返回 (待写入图书, {已有图书编号: [待合并数据]})
+        同一批中重复的数据只写入第一条，合并时后面的直接补全到第一条上
+        """
+        by_key, by_isbn = duplicates.existing_duplicates(
+            [book.normalized_key for _, book in batch], [book.isbn for _, book in batch],
+        )
+        books = []
+        merges = {}
+        pending_keys = {}
+        pending_isbns = {}
+        for line_number, book in batch:
+            # 没有查重键（书名只有标点、符号）时只按 ISBN 查重
+            existing = by_key.get(book.normalized_key) or by_isbn.get(book.isbn)
+            pending = pending_keys.get(book.normalized_key) or pending_isbns.get(book.isbn)
+            if existing is None and pending is None:
+                books.append(book)
+                if book.normalized_key:
+                    pending_keys[book.normalized_key] = book
+                if book.isbn:
+                    pending_isbns[book.isbn] = book
+                continue
+
+            self.duplicates += 1
+            if self.duplicates <= MAX_REPORTED_ERRORS:
+                target = f'已有图书（编号 {existing}）' if existing is not None else '文件中前面的数据'
+                self.stderr.write(f'第 {line_number} 条数据与{target}重复：《{book.title}》（{book.author}）')
+            if not merge:
+                continue
+            # ISBN 已属于其他图书时不合并 ISBN，避免违反唯一约束
+            if book.isbn in by_isbn or book.isbn in pending_isbns:
+                book.isbn = ''
+            if existing is not None:
+                merges.setdefault(existing, []).append(book)
+                if book.isbn:
+                    # 该 ISBN 将合并到已有图书，后面带相同 ISBN 的数据也视为与它重复
+                    by_isbn[book.isbn] = existing
+            else:
+                for field in MERGE_FIELDS:
+                    if not getattr(pending, field) and getattr(book, field):
+                        setattr(pending, field, getattr(book, field))
+                        if field == 'isbn':
+                            pending_isbns[book.isbn] = pending
+                        elif field == 'cover_image':
+                            pending.cover_hash = book.cover_hash
+        return books, merges
+
+    def _merge(self, merges):
+        """把重复数据补全到已有图书的空字段上，逐本保存以更新缩略图、全文索引和缓存版本"""
+        for pk, book in Book.objects.in_bulk(list(merges)).items():
+            changed = []
+            for duplicate in merges[pk]:
+                for field in MERGE_FIELDS:
+                    if not getattr(book, field) and getattr(duplicate, field):
+                        setattr(book, field, getattr(duplicate, field))
+                        changed.append(field)
+            if changed:
+                book.save(update_fields=changed + ['updated_at'])
+                self.merged += 1
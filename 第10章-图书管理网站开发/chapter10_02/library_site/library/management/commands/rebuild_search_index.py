@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library import search
+from library.models import Book
+
+
+class Command(BaseCommand):
+    help = '重建图书全文索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='每批索引的图书数量')
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write('当前数据库不支持全文索引，检索将使用 icontains 查询')
+            return
+        started = time.perf_counter()
+        count = search.rebuild_index(Book.objects.all(), batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'已索引 {count} 本图书，耗时 {elapsed:.2f} 秒'))
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from library import benchmarks
+from library.models import Book
+
+
+class Command(BaseCommand):
+    help = '慢客户端压测：对比固定线程数的 WSGI 服务器与单进程 ASGI（异步视图）能同时服务多少个慢客户端，输出 JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 100, 200],
+                            help='同时连接的慢客户端数量，可指定多个')
+        parser.add_argument('--trickle', type=float, default=2.0, help='每个慢客户端发送完请求所用的秒数')
+        parser.add_argument('--duration', type=float, default=10.0, help='每轮压测持续的秒数')
+        parser.add_argument('--probes', type=int, default=20, help='每轮压测期间均匀发出的正常请求数')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI 服务器的线程数（相当于 gunicorn --threads）')
+        parser.add_argument('--timeout', type=float, default=60.0, help='单个请求的超时秒数，超时计为错误')
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both')
+        parser.add_argument('--books', type=int, default=10000, help='图书数量')
+        parser.add_argument('--users', type=int, default=10, help='压测用户数量')
+        parser.add_argument('--output', help='结果 JSON 文件路径，默认输出到标准输出')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('压测命令目前只支持 SQLite 数据库')
+        if min(options['clients']) < 1 or options['threads'] < 1 or options['probes'] < 1:
+            raise CommandError('客户端数、线程数和正常请求数必须大于 0')
+        if options['trickle'] <= 0 or options['duration'] <= 0:
+            raise CommandError('慢请求耗时和压测时长必须大于 0')
+
+        temp_dir = tempfile.mkdtemp(prefix='library-slow-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(temp_dir, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver', '127.0.0.1', 'localhost']):
+                report = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stderr.write(f'结果已保存到 {options["output"]}')
+        else:
+            self.stdout.write(output)
+
+    def _run(self, options):
+        from library_site import settings_asgi
+
+        factory = benchmarks.BookFactory()
+        benchmarks.seed_users(options['users'])
+        benchmarks.seed_books(options['books'], factory)
+        self.stderr.write(f'图书 {Book.objects.count()} 本')
+        workload = benchmarks.Workload(factory, benchmarks.search_terms(factory), options['users'])
+
+        modes = ['wsgi', 'asgi'] if options['mode'] == 'both' else [options['mode']]
+        report = {
+            'trickle_seconds': options['trickle'],
+            'duration_seconds': options['duration'],
+            'wsgi_threads': options['threads'],
+            'runs': [],
+        }
+        for mode in modes:
+            # asgi 方式使用 settings_asgi 的路由（异步视图）和中间件
+            overrides = {'ROOT_URLCONF': settings_asgi.ROOT_URLCONF, 'MIDDLEWARE': settings_asgi.MIDDLEWARE} if mode == 'asgi' else {}
+            with override_settings(**overrides):
+                results = benchmarks.run_slow_clients(
+                    workload, mode, sorted(set(options['clients'])), options['trickle'], options['duration'],
+                    options['probes'], options['threads'], options['timeout'],
+                )
+            report['runs'].append({'mode': mode, 'results': results})
+            for result in results:
+                self.stderr.write(
+                    f'  {mode:<5} 慢客户端 {result["clients"]:>5}  慢请求 {result["slow_rps"]:>8.1f} req/s  '
+                    f'正常请求 p50 {result["probe_p50_ms"]:>9.1f} ms  p95 {result["probe_p95_ms"]:>9.1f} ms  '
+                    f'错误 {result["slow_errors"] + result["probe_errors"]}'
+                )
+        return report
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-19 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_create_initial_books'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='author',
+            field=models.CharField(db_index=True, max_length=100, verbose_name='作者'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='category',
+            field=models.CharField(db_index=True, max_length=50, verbose_name='分类'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='title',
+            field=models.CharField(db_index=True, max_length=200, verbose_name='书名'),
+        ),
+    ]
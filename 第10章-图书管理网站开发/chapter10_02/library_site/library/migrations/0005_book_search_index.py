@@ -0,0 +1,37 @@
+from django.db import migrations
+
+from library import search
+
+
+def create_search_index(apps, schema_editor):
+    # 全文索引依赖 SQLite FTS5，其他数据库使用 icontains 检索
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Book = apps.get_model('library', 'Book')
+    search.create_index(schema_editor)
+    # 此时分类还是文本字段，直接按当时的表结构写入索引，不依赖 search.rebuild_index 的当前实现
+    columns = ', '.join(search.FTS_COLUMNS)
+    placeholders = ', '.join(['%s'] * (len(search.FTS_COLUMNS) + 1))
+    rows = [
+        [book[0]] + [' '.join(search.tokenize(value)) for value in book[1:]]
+        for book in Book.objects.values_list('id', *search.FTS_COLUMNS).iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {search.FTS_TABLE} (rowid, {columns}) VALUES ({placeholders})', rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {search.FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_book_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-19 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='cover_hash',
+            field=models.CharField(blank=True, editable=False, max_length=16, verbose_name='封面哈希'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-19 00:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_book_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bookshelf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('added_at', models.DateTimeField(auto_now_add=True, verbose_name='加入时间')),
+            ],
+            options={
+                'verbose_name': '书架',
+                'verbose_name_plural': '书架',
+            },
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='shelf_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='书架人数'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['shelf_count', 'id'], name='library_book_shelf_count_idx'),
+        ),
+        migrations.AddField(
+            model_name='bookshelf',
+            name='book',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shelf_entries', to='library.book', verbose_name='图书'),
+        ),
+        migrations.AddField(
+            model_name='bookshelf',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shelf_entries', to=settings.AUTH_USER_MODEL, verbose_name='用户'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookshelf',
+            constraint=models.UniqueConstraint(fields=('user', 'book'), name='library_bookshelf_unique_user_book'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.2.25 on 2026-10-19 00:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_bookshelf'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Copy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('barcode', models.CharField(max_length=32, unique=True, verbose_name='条码')),
+                ('status', models.CharField(choices=[('available', '可借'), ('on_loan', '已借出'), ('reserved', '预约保留'), ('lost', '遗失')], default='available', max_length=16, verbose_name='状态')),
+                ('version', models.PositiveIntegerField(default=0, editable=False, verbose_name='版本')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='copies', to='library.book', verbose_name='图书')),
+            ],
+            options={
+                'verbose_name': '副本',
+                'verbose_name_plural': '副本',
+            },
+        ),
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('waiting', '排队中'), ('ready', '待取书'), ('fulfilled', '已借出'), ('cancelled', '已取消')], default='waiting', max_length=16, verbose_name='状态')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='预约时间')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='library.book', verbose_name='图书')),
+                ('copy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='library.copy', verbose_name='保留副本')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '预约',
+                'verbose_name_plural': '预约',
+            },
+        ),
+        migrations.CreateModel(
+            name='Loan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('borrowed_at', models.DateTimeField(auto_now_add=True, verbose_name='借出时间')),
+                ('due_at', models.DateTimeField(verbose_name='应还时间')),
+                ('returned_at', models.DateTimeField(blank=True, null=True, verbose_name='归还时间')),
+                ('copy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='library.copy', verbose_name='副本')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loans', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '借阅',
+                'verbose_name_plural': '借阅',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['book', 'status', 'id'], name='library_reservation_queue_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['waiting', 'ready'])), fields=('user', 'book'), name='library_reservation_one_active'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('returned_at__isnull', True)), fields=['user', 'due_at'], name='library_loan_user_active_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='loan',
+            constraint=models.UniqueConstraint(condition=models.Q(('returned_at__isnull', True)), fields=('copy',), name='library_loan_one_active_per_copy'),
+        ),
+        migrations.AddIndex(
+            model_name='copy',
+            index=models.Index(fields=['book', 'status'], name='library_copy_book_status_idx'),
+        ),
+    ]
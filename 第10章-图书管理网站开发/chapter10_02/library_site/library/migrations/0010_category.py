@@ -0,0 +1,75 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+# 原表单中固定的分类选项，按此顺序创建分类（迁移不引用应用代码，避免代码修改后迁移失效）
+INITIAL_CATEGORIES = ['文学', '科幻', '古典文学', '历史', '童话', '推理', '技术', '艺术', '哲学', '其他']
+
+
+def create_categories(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    Category = apps.get_model('library', 'Category')
+    names = list(INITIAL_CATEGORIES)
+    # 已有图书中不在固定选项里的分类也保留下来
+    for name in Book.objects.order_by('category').values_list('category', flat=True).distinct():
+        if name not in names:
+            names.append(name)
+    for name in names:
+        category = Category.objects.create(name=name)
+        category.book_count = Book.objects.filter(category=name).update(category_ref=category)
+        category.save(update_fields=['book_count'])
+
+
+def restore_category_names(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    Category = apps.get_model('library', 'Category')
+    for category in Category.objects.all():
+        Book.objects.filter(category_ref=category).update(category=category.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_circulation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='名称')),
+                ('book_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='图书数量')),
+            ],
+            options={
+                'verbose_name': '分类',
+                'verbose_name_plural': '分类',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='category_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='library.category'),
+        ),
+        migrations.RunPython(create_categories, restore_category_names),
+        # 先给文本字段加默认值，回滚时才能重新添加该非空字段
+        migrations.AlterField(
+            model_name='book',
+            name='category',
+            field=models.CharField(db_index=True, default='', max_length=50, verbose_name='分类'),
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='book',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='books', to='library.category', verbose_name='分类'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-19 00:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0010_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='similar_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='推荐更新时间'),
+        ),
+        migrations.CreateModel(
+            name='SimilarBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='排名')),
+                ('score', models.FloatField(verbose_name='相似度')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='library.book', verbose_name='图书')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='library.book', verbose_name='相似图书')),
+            ],
+            options={
+                'verbose_name': '相似图书',
+                'verbose_name_plural': '相似图书',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='similarbook',
+            constraint=models.UniqueConstraint(fields=('book', 'rank'), name='library_similarbook_unique_rank'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _normalize_text(text):
+    # 与 library.duplicates.normalize_text 相同（迁移不引用应用代码，避免代码修改后迁移失效）
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return ''.join(ch for ch in text if unicodedata.category(ch)[0] not in 'PSZC')
+
+
+def fill_normalized_keys(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    books = []
+    for book in Book.objects.only('id', 'title', 'author').iterator(chunk_size=2000):
+        book.normalized_key = _normalize_text(book.title)[:200] + '|' + _normalize_text(book.author)[:100]
+        books.append(book)
+    Book.objects.bulk_update(books, ['normalized_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0011_similar_books'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='isbn',
+            field=models.CharField(blank=True, default='', max_length=13, verbose_name='ISBN'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='normalized_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=301, verbose_name='查重键'),
+        ),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.UniqueConstraint(condition=models.Q(('isbn', ''), _negated=True), fields=('isbn',), name='library_book_unique_isbn'),
+        ),
+        # 已有图书补齐查重键；已存在的重复图书不在迁移中合并，可用 find_duplicate_books 命令列出
+        migrations.RunPython(fill_normalized_keys, migrations.RunPython.noop),
+    ]
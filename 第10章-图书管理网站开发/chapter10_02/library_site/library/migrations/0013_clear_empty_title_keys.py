@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def clear_empty_title_keys(apps, schema_editor):
+    # 书名规范化后为空的图书没有查重键（0012 为它们生成了以 '|' 开头的键，会被互相判定为重复）
+    Book = apps.get_model('library', 'Book')
+    Book.objects.filter(normalized_key__startswith='|').update(normalized_key='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0012_book_duplicate_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_empty_title_keys, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import AbstractUser
 
 # 创建自定义用户模型
@@ -13,17 +14,175 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+# 图书分类
+class Category(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name='名称')
+    # 该分类的图书数量（冗余字段，随图书增删改同步更新），分类导航无需统计图书表
+    book_count = models.PositiveIntegerField(default=0, verbose_name='图书数量', editable=False)
+    
+    class Meta:
+        verbose_name = '分类'
+        verbose_name_plural = '分类'
+        ordering = ['id']
+    
+    def __str__(self):
+        return self.name
+
 # Create your models here.
 class Book(models.Model):
-    title = models.CharField(max_length=200, verbose_name='书名')
-    author = models.CharField(max_length=100, verbose_name='作者')
-    category = models.CharField(max_length=50, verbose_name='分类')
+    title = models.CharField(max_length=200, verbose_name='书名', db_index=True)
+    author = models.CharField(max_length=100, verbose_name='作者', db_index=True)
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='books', verbose_name='分类')
     description = models.TextField(verbose_name='简介')
     cover_image = models.CharField(max_length=200, verbose_name='封面图片', blank=True)
+    # 封面内容哈希，非空表示已生成缩略图（文件名由该哈希决定）
+    cover_hash = models.CharField(max_length=16, verbose_name='封面哈希', blank=True, editable=False)
+    # 每次保存自动更新，作为详情页 ETag/Last-Modified 和卡片缓存的版本
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    # 加入书架的人数（冗余字段，随书架增删同步更新），按人气排序时无需统计书架表
+    shelf_count = models.PositiveIntegerField(default=0, verbose_name='书架人数', editable=False)
+    # 相似图书列表最近一次变化的时间，与 updated_at 一起作为详情页的 ETag/Last-Modified
+    similar_updated_at = models.DateTimeField(null=True, blank=True, verbose_name='推荐更新时间', editable=False)
+    # 规范化的“书名|作者”（忽略大小写、全半角和标点），保存时自动生成，新增图书时按索引查重
+    normalized_key = models.CharField(max_length=301, verbose_name='查重键', db_index=True, editable=False, default='')
+    # 规范化为 13 位的 ISBN，可选；非空时唯一
+    isbn = models.CharField(max_length=13, verbose_name='ISBN', blank=True, default='')
     
     class Meta:
         verbose_name = '图书'
         verbose_name_plural = '图书'
+        indexes = [
+            models.Index(fields=['shelf_count', 'id'], name='library_book_shelf_count_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['isbn'], condition=~Q(isbn=''), name='library_book_unique_isbn'),
+        ]
     
     def __str__(self):
         return self.title
+
+# 预先计算的相似图书（每本书保存相似度最高的若干本），详情页按 rank 顺序直接读取
+class SimilarBook(models.Model):
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='similar_entries', verbose_name='图书')
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+', verbose_name='相似图书')
+    rank = models.PositiveSmallIntegerField(verbose_name='排名')
+    score = models.FloatField(verbose_name='相似度')
+    
+    class Meta:
+        verbose_name = '相似图书'
+        verbose_name_plural = '相似图书'
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'rank'], name='library_similarbook_unique_rank'),
+        ]
+    
+    def __str__(self):
+        return f'{self.book} -> {self.similar}'
+
+# 个人书架：用户与图书的多对多关系
+class Bookshelf(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shelf_entries', verbose_name='用户')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='shelf_entries', verbose_name='图书')
+    added_at = models.DateTimeField(auto_now_add=True, verbose_name='加入时间')
+    
+    class Meta:
+        verbose_name = '书架'
+        verbose_name_plural = '书架'
+        # 唯一约束的索引同时用于“当前页哪些书已在书架上”的查询
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'book'], name='library_bookshelf_unique_user_book'),
+        ]
+    
+    def __str__(self):
+        return f'{self.user} - {self.book}'
+
+# 图书的实体副本，借阅以副本为单位
+class Copy(models.Model):
+    AVAILABLE = 'available'
+    ON_LOAN = 'on_loan'
+    RESERVED = 'reserved'
+    LOST = 'lost'
+    STATUS_CHOICES = [
+        (AVAILABLE, '可借'),
+        (ON_LOAN, '已借出'),
+        (RESERVED, '预约保留'),
+        (LOST, '遗失'),
+    ]
+    
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='copies', verbose_name='图书')
+    barcode = models.CharField(max_length=32, unique=True, verbose_name='条码')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=AVAILABLE, verbose_name='状态')
+    # 乐观锁版本号：借出、归还时带上读取到的版本做条件更新，版本不符说明已被他人抢先
+    version = models.PositiveIntegerField(default=0, verbose_name='版本', editable=False)
+    
+    class Meta:
+        verbose_name = '副本'
+        verbose_name_plural = '副本'
+        indexes = [
+            # 某本书的可借副本
+            models.Index(fields=['book', 'status'], name='library_copy_book_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.book} ({self.barcode})'
+
+# 借阅记录，returned_at 为空表示未归还
+class Loan(models.Model):
+    copy = models.ForeignKey(Copy, on_delete=models.CASCADE, related_name='loans', verbose_name='副本')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loans', verbose_name='用户')
+    borrowed_at = models.DateTimeField(auto_now_add=True, verbose_name='借出时间')
+    due_at = models.DateTimeField(verbose_name='应还时间')
+    returned_at = models.DateTimeField(null=True, blank=True, verbose_name='归还时间')
+    
+    class Meta:
+        verbose_name = '借阅'
+        verbose_name_plural = '借阅'
+        indexes = [
+            # 某个用户当前的借阅（部分索引，只包含未归还的记录）
+            models.Index(fields=['user', 'due_at'], name='library_loan_user_active_idx',
+                         condition=Q(returned_at__isnull=True)),
+        ]
+        constraints = [
+            # 数据库层面保证同一副本同时只有一条未归还的借阅
+            models.UniqueConstraint(fields=['copy'], condition=Q(returned_at__isnull=True),
+                                    name='library_loan_one_active_per_copy'),
+        ]
+    
+    def __str__(self):
+        return f'{self.user} - {self.copy}'
+
+# 预约：没有可借副本时排队，有副本归还时按预约先后保留给排在最前面的用户
+class Reservation(models.Model):
+    WAITING = 'waiting'
+    READY = 'ready'
+    FULFILLED = 'fulfilled'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (WAITING, '排队中'),
+        (READY, '待取书'),
+        (FULFILLED, '已借出'),
+        (CANCELLED, '已取消'),
+    ]
+    ACTIVE_STATUSES = (WAITING, READY)
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reservations', verbose_name='用户')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='reservations', verbose_name='图书')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=WAITING, verbose_name='状态')
+    # 状态为待取书时保留给该用户的副本
+    copy = models.ForeignKey(Copy, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='保留副本')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='预约时间')
+    
+    class Meta:
+        verbose_name = '预约'
+        verbose_name_plural = '预约'
+        indexes = [
+            # 某本书排队中的预约，按预约先后取第一条
+            models.Index(fields=['book', 'status', 'id'], name='library_reservation_queue_idx'),
+        ]
+        constraints = [
+            # 同一用户对同一本书只能有一条进行中的预约
+            models.UniqueConstraint(fields=['user', 'book'], condition=Q(status__in=['waiting', 'ready']),
+                                    name='library_reservation_one_active'),
+        ]
+    
+    def __str__(self):
+        return f'{self.user} - {self.book}'
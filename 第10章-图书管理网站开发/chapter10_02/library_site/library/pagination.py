@@ -0,0 +1,134 @@
+import base64
+import json
+
+from django.db import models
+from django.db.models import Q
+
+
+class KeysetPage:
+    """键集分页结果：当前页数据以及前后页游标"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(values):
+    """把排序键编码为URL安全的游标字符串"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def cursor_value_type(model, field):
+    """排序字段在游标中应有的类型：整数字段（含外键）为 int，文本字段为 str，其他字段不检查"""
+    model_field = model._meta.get_field(field)
+    if model_field.is_relation:
+        model_field = model_field.target_field
+    if isinstance(model_field, models.IntegerField):
+        return int
+    if isinstance(model_field, (models.CharField, models.TextField)):
+        return str
+    return None
+
+
+def decode_cursor(cursor, value_type=None):
+    """
+    解析游标 [排序键, id]，格式错误时返回 None
+    value_type 为排序键应有的类型，类型不符（如 null、列表或把文本传给数字字段）同样视为格式错误，
+    避免把任意 JSON 值传给 ORM
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != 2:
+        return None
+    value, pk = values
+    if not _is_int(pk):
+        return None
+    if value_type is int and not _is_int(value):
+        return None
+    if value_type is str and not isinstance(value, str):
+        return None
+    return values
+
+
+def _cursor_for(obj, field):
+    # 模型实例，或 .values() 返回的字典（须包含排序字段和 id）
+    if isinstance(obj, dict):
+        return encode_cursor([obj[field], obj['id']])
+    return encode_cursor([getattr(obj, field), obj.pk])
+
+
+def _ordering(field, descending=False):
+    prefix = '-' if descending else ''
+    fields = [field] if field == 'id' else [field, 'id']
+    return [prefix + name for name in fields]
+
+
+def _beyond(field, value, pk, descending):
+    """排在 (value, pk) 之后的记录条件，descending 表示按 (field, id) 从大到小"""
+    lookup = 'lt' if descending else 'gt'
+    if field == 'id':
+        return Q(**{f'id__{lookup}': pk})
+    return Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': pk})
+
+
+def keyset_paginate(queryset, field, page_size, after=None, before=None):
+    """
+    按 (field, id) 做键集分页，翻页开销与页码无关，依赖 field 上的索引
+    field 以 '-' 开头时按 (field, id) 从大到小排序
+    - after: 取该游标之后的一页
+    - before: 取该游标之前的一页
+    """
+    descending = field.startswith('-')
+    field = field.lstrip('-')
+    # 无效的游标按未提供处理，返回第一页
+    value_type = cursor_value_type(queryset.model, field)
+    after_values = decode_cursor(after, value_type)
+    before_values = decode_cursor(before, value_type)
+
+    if before_values is not None:
+        value, pk = before_values
+        condition = _beyond(field, value, pk, not descending)
+        rows = list(queryset.filter(condition).order_by(*_ordering(field, not descending))[:page_size + 1])
+        has_more = len(rows) > page_size
+        items = list(reversed(rows[:page_size]))
+        if not items:
+            return KeysetPage(items)
+        return KeysetPage(
+            items,
+            next_cursor=_cursor_for(items[-1], field),
+            prev_cursor=_cursor_for(items[0], field) if has_more else None,
+        )
+
+    if after_values is not None:
+        value, pk = after_values
+        queryset = queryset.filter(_beyond(field, value, pk, descending))
+
+    rows = list(queryset.order_by(*_ordering(field, descending))[:page_size + 1])
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+    if not items:
+        return KeysetPage(items)
+    return KeysetPage(
+        items,
+        next_cursor=_cursor_for(items[-1], field) if has_more else None,
+        prev_cursor=_cursor_for(items[0], field) if after_values is not None else None,
+    )
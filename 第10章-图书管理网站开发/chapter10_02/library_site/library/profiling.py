@@ -0,0 +1,212 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+logger = logging.getLogger('library.profiling')
+
+# 保留最近的慢请求数量
+RECENT_SLOW_REQUESTS = 50
+
+# 当前请求的统计对象，线程和协程之间互不影响
+_current = contextvars.ContextVar('library_request_profile', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """视图执行的 SQL 数量超过预算（严格模式下抛出，用于让测试失败）"""
+
+
+class RequestProfile:
+    """单个请求的统计数据"""
+
+    def __init__(self):
+        # 异步视图的并发查询会在多个线程中同时计数
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if profile is not None:
+            with profile.lock:
+                profile.queries += 1
+                profile.sql_seconds += time.perf_counter() - started
+
+
+def _install_query_counter(connection):
+    """
+    在数据库连接上常驻计数包装（只安装一次），按 contextvar 找到所属请求：
+    异步视图经 sync_to_async 把查询放到线程池中的其他线程执行，contextvar 随调用传递，
+    而 execute_wrapper 只作用于当前线程的连接，按请求临时安装时这些查询不会被计数
+    """
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install_query_counter(connection)
+
+
+_original_render = Template.render
+_patch_lock = threading.Lock()
+
+
+def _profiled_render(self, context):
+    """模板渲染计时，include 的子模板计入最外层模板，不重复计算"""
+    profile = _current.get()
+    if profile is None:
+        return _original_render(self, context)
+    profile.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        profile.template_depth -= 1
+        if profile.template_depth == 0:
+            profile.template_seconds += time.perf_counter() - started
+
+
+def _install_template_timer():
+    with _patch_lock:
+        if Template.render is not _profiled_render:
+            Template.render = _profiled_render
+
+
+class ProfileStats:
+    """按视图汇总的统计数据（进程内）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.views = {}
+            self.slow_requests = deque(maxlen=RECENT_SLOW_REQUESTS)
+
+    def record(self, view_name, profile, total_seconds, slow, path):
+        with self._lock:
+            item = self.views.setdefault(view_name, {
+                'view': view_name,
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'sql_ms': 0.0,
+                'template_ms': 0.0,
+                'total_ms': 0.0,
+                'max_total_ms': 0.0,
+            })
+            total_ms = total_seconds * 1000
+            item['requests'] += 1
+            item['queries'] += profile.queries
+            item['max_queries'] = max(item['max_queries'], profile.queries)
+            item['sql_ms'] += profile.sql_seconds * 1000
+            item['template_ms'] += profile.template_seconds * 1000
+            item['total_ms'] += total_ms
+            item['max_total_ms'] = max(item['max_total_ms'], total_ms)
+            if slow:
+                self.slow_requests.appendleft({
+                    'view': view_name,
+                    'path': path,
+                    'queries': profile.queries,
+                    'sql_ms': round(profile.sql_seconds * 1000, 2),
+                    'template_ms': round(profile.template_seconds * 1000, 2),
+                    'total_ms': round(total_ms, 2),
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                })
+
+    def summary(self):
+        """各视图的平均值与最大值，按累计耗时从高到低排序"""
+        with self._lock:
+            rows = []
+            for item in self.views.values():
+                count = item['requests']
+                rows.append({
+                    'view': item['view'],
+                    'requests': count,
+                    'avg_queries': round(item['queries'] / count, 1),
+                    'max_queries': item['max_queries'],
+                    'avg_sql_ms': round(item['sql_ms'] / count, 2),
+                    'avg_template_ms': round(item['template_ms'] / count, 2),
+                    'avg_total_ms': round(item['total_ms'] / count, 2),
+                    'max_total_ms': round(item['max_total_ms'], 2),
+                    'total_ms': item['total_ms'],
+                })
+            rows.sort(key=lambda row: row['total_ms'], reverse=True)
+            return rows, list(self.slow_requests)
+
+
+stats = ProfileStats()
+
+
+class QueryProfilingMiddleware:
+    """
+    请求性能统计中间件（设置 LIBRARY_PROFILING = True 时启用）
+    记录每个请求的 SQL 数量、SQL 耗时、模板渲染耗时和总耗时：
+    - 超过 LIBRARY_SLOW_REQUEST_MS 的请求写入日志
+    - SQL 数量超过 LIBRARY_QUERY_BUDGETS 中的预算时写入日志，严格模式下抛出 QueryBudgetExceeded
+    - 通过响应头 Server-Timing 返回本次请求的统计数据
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'LIBRARY_PROFILING', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        _install_template_timer()
+        # 之后在任何线程中新建的连接都安装计数包装
+        connection_created.connect(_on_connection_created, dispatch_uid='library_profiling_query_counter')
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        # 启用统计前已经打开的连接
+        for connection in connections.all():
+            _install_query_counter(connection)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        slow = total * 1000 >= getattr(settings, 'LIBRARY_SLOW_REQUEST_MS', 500)
+        stats.record(view_name, profile, total, slow, request.path)
+
+        response['Server-Timing'] = (
+            f'sql;dur={profile.sql_seconds * 1000:.2f};desc="{profile.queries} queries", '
+            f'tpl;dur={profile.template_seconds * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}'
+        )
+        if slow:
+            logger.warning(
+                '慢请求 %s %s：%.1f ms，SQL %d 条 %.1f ms，模板 %.1f ms',
+                request.method, request.path, total * 1000, profile.queries,
+                profile.sql_seconds * 1000, profile.template_seconds * 1000,
+            )
+        self._check_budget(view_name, profile.queries)
+        return response
+
+    def _check_budget(self, view_name, queries):
+        budget = getattr(settings, 'LIBRARY_QUERY_BUDGETS', {}).get(view_name)
+        if budget is None or queries <= budget:
+            return
+        message = f'{view_name} 执行了 {queries} 条 SQL，超过预算 {budget} 条'
+        if getattr(settings, 'LIBRARY_QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,310 @@
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from . import search
+from .models import Book, SimilarBook
+
+# 每本书保存的相似图书数量
+SIMILAR_BOOKS = 6
+
+# 特征前缀及权重：简介的中文二元组、作者、分类；作者、分类的权重更高，同作者、同分类的书更容易排在前面
+FEATURE_WEIGHTS = {
+    'd': 1.0,
+    'a': 4.0,
+    'c': 2.0,
+}
+
+# 只出现在一本书中的特征无法带来相似度，出现在超过一半图书中的特征区分度太低，都不参与计算
+MIN_DF = 2
+MAX_DF_RATIO = 0.5
+
+# 分块计算相似度时每块矩阵的最大元素数（float32，约 32MB）
+BLOCK_CELLS = 8_000_000
+
+# 新增一本书时最多更新多少本旧书的相似图书列表
+MAX_REVERSE_UPDATES = 50
+
+# 写入相似图书时每批的行数
+WRITE_BATCH_SIZE = 5000
+
+
+def book_features(description, author, category_id):
+    """图书的特征词列表：简介按全文检索相同的规则切分，作者、分类各作为一个特征"""
+    features = ['d:' + token for token in search.tokenize(description)]
+    if author:
+        features.append('a:' + author.strip().lower())
+    if category_id is not None:
+        features.append(f'c:{category_id}')
+    return features
+
+
+class Recommender:
+    """
+    基于 TF-IDF 的相似图书计算
+    每本书是一行经过 L2 归一化的稀疏向量，两本书的余弦相似度即向量点积
+    """
+
+    def __init__(self, terms, idf, weights, ids, matrix, kth):
+        # 特征词 -> 列号
+        self.terms = terms
+        self.idf = idf
+        # 每列的特征权重 * IDF
+        self.weights = weights
+        # 行号 -> 图书 ID
+        self.ids = ids
+        self.matrix = matrix
+        # 每本书第 SIMILAR_BOOKS 个相似图书的相似度（不足时为 0），新书超过它才会进入该书的列表
+        self.kth = kth
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fit(cls, books):
+        """从 (图书ID, 特征词列表) 序列计算 IDF 和全部图书的向量"""
+        ids, rows, columns, vocabulary = [], [], [], {}
+        for row, (book_id, features) in enumerate(books):
+            ids.append(book_id)
+            for feature in features:
+                columns.append(vocabulary.setdefault(feature, len(vocabulary)))
+                rows.append(row)
+        count = len(ids)
+        counts = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, columns)), shape=(count, len(vocabulary)),
+        )
+        counts.sum_duplicates()
+
+        document_frequency = np.bincount(counts.indices, minlength=len(vocabulary))
+        keep = np.flatnonzero(
+            (document_frequency >= MIN_DF) & (document_frequency <= max(MIN_DF, MAX_DF_RATIO * count))
+        )
+        all_terms = np.empty(len(vocabulary), dtype=object)
+        for term, column in vocabulary.items():
+            all_terms[column] = term
+        terms = {term: column for column, term in enumerate(all_terms[keep])}
+        idf = (np.log((1 + count) / (1 + document_frequency[keep])) + 1).astype(np.float32)
+        weights = idf * np.array([FEATURE_WEIGHTS[term[0]] for term in terms], dtype=np.float32)
+
+        matrix = _normalize(_tfidf(counts[:, keep], weights))
+        return cls(terms, idf, weights, np.array(ids, dtype=np.int64), matrix, np.zeros(count, dtype=np.float32))
+
+    def vectorize(self, features):
+        """按已有的特征词表把一本书转为归一化向量（词表中没有的特征忽略）"""
+        columns = defaultdict(int)
+        for feature in features:
+            column = self.terms.get(feature)
+            if column is not None:
+                columns[column] += 1
+        counts = sparse.csr_matrix(
+            (np.array(list(columns.values()), dtype=np.float32),
+             (np.zeros(len(columns), dtype=np.int64), np.array(list(columns), dtype=np.int64))),
+            shape=(1, len(self.terms)),
+        )
+        return _normalize(_tfidf(counts, self.weights))
+
+    def neighbours(self, k=SIMILAR_BOOKS):
+        """
+        分块计算每本书相似度最高的 k 本书，逐本返回 (行号, [(相似行号, 相似度), ...])
+        每块是 块大小 x 图书总数 的稠密矩阵，用 argpartition 取前 k 个，不对整行排序
+        """
+        count = self.matrix.shape[0]
+        k = min(k, count - 1)
+        if k <= 0:
+            return
+        transposed = self.matrix.T.tocsr()
+        block = max(1, BLOCK_CELLS // count)
+        for start in range(0, count, block):
+            end = min(start + block, count)
+            scores = (self.matrix[start:end] @ transposed).toarray()
+            # 排除自身
+            scores[np.arange(end - start), np.arange(start, end)] = 0
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for offset in range(end - start):
+                yield start + offset, [
+                    (int(column), float(score))
+                    for column, score in zip(top[offset], top_scores[offset]) if score > 0
+                ]
+
+    def save(self, path):
+        """保存到 .npz 文件（先写临时文件再替换，读取方不会读到写了一半的文件）"""
+        terms = np.empty(len(self.terms), dtype=object)
+        for term, column in self.terms.items():
+            terms[column] = term
+        temp = f'{path}.tmp.npz'
+        np.savez(
+            temp,
+            terms=terms.astype(str), idf=self.idf, weights=self.weights, ids=self.ids, kth=self.kth,
+            data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape),
+        )
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            terms = {str(term): column for column, term in enumerate(data['terms'])}
+            matrix = sparse.csr_matrix((data['data'], data['indices'], data['indptr']), shape=tuple(data['shape']))
+            return cls(terms, data['idf'], data['weights'], data['ids'], matrix, data['kth'])
+
+    def add(self, book_id, vector, kth):
+        """把新书的向量追加到矩阵末尾，之后新增的书也能与它比较"""
+        with self._lock:
+            self.ids = np.append(self.ids, book_id)
+            self.matrix = sparse.vstack([self.matrix, vector], format='csr')
+            self.kth = np.append(self.kth, np.float32(kth))
+
+
+def _tfidf(counts, weights):
+    """词频取 1 + log(tf)，再乘以各列的权重 * IDF"""
+    counts = counts.tocsr().astype(np.float32)
+    counts.data = 1 + np.log(counts.data)
+    return counts.multiply(weights.reshape(1, -1)).tocsr()
+
+
+def _normalize(matrix):
+    """按行 L2 归一化，全零行保持为零"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags((1 / norms).astype(np.float32)) @ matrix
+
+
+def _iter_features(queryset, chunk_size=5000):
+    rows = queryset.order_by('pk').values_list('id', 'description', 'author', 'category_id')
+    for book_id, description, author, category_id in rows.iterator(chunk_size=chunk_size):
+        yield book_id, book_features(description, author, category_id)
+
+
+def _write_lists(lists):
+    """用新的相似图书列表替换这些图书的旧列表，并更新它们的 similar_updated_at"""
+    book_ids = list(lists)
+    now = timezone.now()
+    with transaction.atomic():
+        for start in range(0, len(book_ids), WRITE_BATCH_SIZE):
+            chunk = book_ids[start:start + WRITE_BATCH_SIZE]
+            SimilarBook.objects.filter(book_id__in=chunk).delete()
+            Book.objects.filter(pk__in=chunk).update(similar_updated_at=now)
+        SimilarBook.objects.bulk_create(
+            (SimilarBook(book_id=book_id, similar_id=similar_id, rank=rank, score=score)
+             for book_id, items in lists.items()
+             for rank, (similar_id, score) in enumerate(items, start=1)),
+            batch_size=WRITE_BATCH_SIZE,
+        )
+
+
+def _current_lists(book_ids=None):
+    """读取已保存的相似图书列表：图书ID -> [(相似图书ID, 相似度), ...]"""
+    entries = SimilarBook.objects.order_by('book_id', 'rank')
+    if book_ids is not None:
+        entries = entries.filter(book_id__in=book_ids)
+    lists = defaultdict(list)
+    for book_id, similar_id, score in entries.values_list('book_id', 'similar_id', 'score').iterator(chunk_size=10000):
+        lists[book_id].append((similar_id, score))
+    return lists
+
+
+def build(k=SIMILAR_BOOKS, path=None, progress=None):
+    """
+    批量计算全部图书的相似图书并保存模型，返回 (图书数量, 列表发生变化的图书数量)
+    只改写列表有变化的图书，其余图书的 similar_updated_at 不变，详情页缓存继续有效
+    """
+    global _recommender
+    recommender = Recommender.fit(_iter_features(Book.objects.all()))
+    old_lists = _current_lists()
+    changed = {}
+    for row, items in recommender.neighbours(k):
+        book_id = int(recommender.ids[row])
+        new = [(int(recommender.ids[column]), score) for column, score in items]
+        if len(new) == k:
+            recommender.kth[row] = new[-1][1]
+        if [similar for similar, _ in new] != [similar for similar, _ in old_lists.pop(book_id, [])]:
+            changed[book_id] = new
+        if progress and (row + 1) % 10000 == 0:
+            progress(row + 1)
+    _write_lists(changed)
+    recommender.save(path or settings.LIBRARY_RECOMMENDER_PATH)
+    with _recommender_lock:
+        _recommender = recommender
+    return len(recommender.ids), len(changed)
+
+
+_recommender = None
+_recommender_mtime = None
+_recommender_lock = threading.Lock()
+
+
+def get_recommender():
+    """进程内的模型，首次使用或批量计算生成了新文件时从文件加载；尚未批量计算过时返回 None"""
+    global _recommender, _recommender_mtime
+    path = settings.LIBRARY_RECOMMENDER_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return _recommender
+    if _recommender is None or mtime != _recommender_mtime:
+        with _recommender_lock:
+            if _recommender is None or mtime != _recommender_mtime:
+                _recommender = Recommender.load(path)
+                _recommender_mtime = mtime
+    return _recommender
+
+
+def reset_recommender():
+    """丢弃进程内的模型（测试中使用）"""
+    global _recommender, _recommender_mtime
+    with _recommender_lock:
+        _recommender = None
+        _recommender_mtime = None
+
+
+def add_book(book, k=SIMILAR_BOOKS):
+    """
+    新增一本书后增量更新推荐：用已有词表计算它的向量，与全部图书做一次稀疏矩阵乘向量，
+    得到它的相似图书；相似度超过旧书当前第 k 名的，把新书插入这些旧书的列表
+    新书中的新词要等下次批量计算才会进入词表
+    """
+    recommender = get_recommender()
+    if recommender is None:
+        return
+    vector = recommender.vectorize(book_features(book.description, book.author, book.category_id))
+    if vector.nnz == 0 or not len(recommender.ids):
+        return
+    scores = np.asarray((recommender.matrix @ vector.T).todense()).ravel()
+    # 进程内矩阵可能还包含已删除的图书
+    scores[~np.isin(recommender.ids, list(Book.objects.filter(
+        pk__in=recommender.ids[scores > 0].tolist()).values_list('pk', flat=True)))] = 0
+
+    candidates = np.flatnonzero(scores > 0)
+    top = candidates[np.argsort(-scores[candidates])[:k]]
+    lists = {book.pk: [(int(recommender.ids[row]), float(scores[row])) for row in top]}
+
+    # 新书进入了哪些旧书的前 k 名
+    better = candidates[scores[candidates] > recommender.kth[candidates]]
+    better = better[np.argsort(-scores[better])[:MAX_REVERSE_UPDATES]]
+    current = _current_lists([int(recommender.ids[row]) for row in better])
+    for row in better:
+        book_id = int(recommender.ids[row])
+        items = sorted(current.get(book_id, []) + [(book.pk, float(scores[row]))], key=lambda item: -item[1])[:k]
+        lists[book_id] = items
+        if len(items) == k:
+            recommender.kth[row] = items[-1][1]
+
+    _write_lists(lists)
+    kth = lists[book.pk][-1][1] if len(lists[book.pk]) == k else 0
+    recommender.add(book.pk, vector, kth)
+
+
+def similar_books(book_id):
+    """详情页展示的相似图书，按排名读取，查询量与图书总数无关"""
+    entries = SimilarBook.objects.filter(book_id=book_id).select_related('similar').only(
+        'score', 'similar__id', 'similar__title', 'similar__author',
+    ).order_by('rank')
+    return [entry.similar for entry in entries]
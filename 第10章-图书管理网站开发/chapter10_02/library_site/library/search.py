@@ -0,0 +1,177 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+
+# SQLite FTS5 全文索引表，rowid 与 Book.id 一致
+FTS_TABLE = 'library_book_fts'
+
+# 参与检索的字段及 bm25 权重（书名 > 作者 > 分类 > 简介）
+FTS_COLUMNS = ('title', 'author', 'category', 'description')
+FTS_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+# 中日韩文字连续片段 / 其他文字与数字组成的单词
+_CJK_RUN = re.compile(r'[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+')
+_WORD = re.compile(r'[^\W_]+')
+
+
+def _normalize(text):
+    """全角转半角、统一小写"""
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def _split_runs(text):
+    """把文本切分为 (是否中日韩文字, 片段) 序列"""
+    position = 0
+    for match in _CJK_RUN.finditer(text):
+        if match.start() > position:
+            yield False, text[position:match.start()]
+        yield True, match.group()
+        position = match.end()
+    if position < len(text):
+        yield False, text[position:]
+
+
+def _cjk_tokens(run):
+    """
+    中文按二元组切分：「三体人」-> 三体 体人 人
+    末尾单字也作为词元，保证每个字都是某个词元的开头，单字检索可用前缀匹配
+    """
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)] + [run[-1]]
+
+
+def tokenize(text):
+    """把文本切分为词元列表，中文二元切分，其他文字按单词切分"""
+    tokens = []
+    for is_cjk, run in _split_runs(_normalize(text)):
+        if is_cjk:
+            tokens.extend(_cjk_tokens(run))
+        else:
+            tokens.extend(_WORD.findall(run))
+    return tokens
+
+
+def build_match_query(query):
+    """
+    把用户输入转为 FTS5 MATCH 表达式
+    空格分隔的每个词都必须命中；中文词按二元组组成短语，单字与英文词按前缀匹配
+    """
+    terms = []
+    for is_cjk, run in _split_runs(_normalize(query)):
+        if is_cjk:
+            if len(run) == 1:
+                terms.append(f'"{run}"*')
+            else:
+                bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+                terms.append('"' + ' '.join(bigrams) + '"')
+        else:
+            terms.extend(f'"{word}"*' for word in _WORD.findall(run))
+    return ' AND '.join(terms)
+
+
+def fts_available():
+    """当前数据库是否支持全文索引（仅 SQLite）"""
+    return connection.vendor == 'sqlite'
+
+
+def _column_text(book, column, category_names):
+    if column == 'category':
+        # 分类是外键：已加载分类对象时直接取名称，否则按分类 ID 查名称
+        if type(book).category.is_cached(book):
+            return book.category.name
+        return category_names.get(book.category_id, '')
+    return getattr(book, column)
+
+
+def _document(book, category_names):
+    return [' '.join(tokenize(_column_text(book, column, category_names))) for column in FTS_COLUMNS]
+
+
+def create_index(schema_editor):
+    """创建全文索引表"""
+    columns = ', '.join(FTS_COLUMNS)
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, tokenize='unicode61')"
+    )
+
+
+def index_books(books):
+    """写入或更新多本图书的索引"""
+    from .models import Book, Category
+
+    books = list(books)
+    if not books or not fts_available():
+        return
+    # 分类数量很少，整批图书共用一次查询得到的分类名称，避免逐本加载分类
+    category_names = {}
+    if any(not Book.category.is_cached(book) for book in books):
+        category_names = dict(Category.objects.values_list('id', 'name'))
+    rows = [[book.pk] + _document(book, category_names) for book in books]
+    placeholders = ', '.join(['%s'] * (len(FTS_COLUMNS) + 1))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[row[0]] for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES ({placeholders})", rows
+        )
+
+
+def index_book(book):
+    """写入或更新单本图书的索引"""
+    index_books([book])
+
+
+def remove_book(book_id):
+    """从索引中删除图书"""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [book_id])
+
+
+def rebuild_index(queryset, batch_size=2000):
+    """清空并重建索引，按批读取图书，内存占用与图书总数无关"""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    batch = []
+    count = 0
+    for book in queryset.only('id', *FTS_COLUMNS).iterator(chunk_size=batch_size):
+        batch.append(book)
+        if len(batch) >= batch_size:
+            index_books(batch)
+            count += len(batch)
+            batch = []
+    index_books(batch)
+    return count + len(batch)
+
+
+def search_book_ids(query, limit, offset=0):
+    """
+    全文检索，返回按相关度排序的图书 ID 列表
+    非 SQLite 数据库退化为 icontains 查询
+    """
+    from .models import Book
+
+    if not fts_available():
+        condition = Q()
+        for word in query.split():
+            condition &= (Q(title__icontains=word) | Q(author__icontains=word)
+                          | Q(category__name__icontains=word) | Q(description__icontains=word))
+        return list(Book.objects.filter(condition).order_by('id')
+                    .values_list('id', flat=True)[offset:offset + limit])
+
+    match = build_match_query(query)
+    if not match:
+        return []
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s',
+            [match, limit, offset]
+        )
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,46 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .caching import bump_popularity_version
+from .models import Book, Bookshelf
+
+
+def add_to_shelf(user, book_id):
+    """
+    把图书加入用户书架，返回是否新加入（已在书架上返回 False）
+    图书不存在时抛出 Book.DoesNotExist
+    书架人数通过 update() 修改，不触发 Book 的信号，这里自行使依赖书架人数的缓存失效（人气排序、接口的 shelf_count）
+    """
+    try:
+        with transaction.atomic():
+            # 在数据库中自增，并发加入时不会丢失计数
+            if not Book.objects.filter(pk=book_id).update(shelf_count=F('shelf_count') + 1):
+                raise Book.DoesNotExist(f'图书 {book_id} 不存在')
+            Bookshelf.objects.create(user=user, book_id=book_id)
+    except IntegrityError:
+        # 唯一约束冲突：已在书架上（包括并发重复提交）
+        return False
+    bump_popularity_version()
+    return True
+
+
+def remove_from_shelf(user, book_id):
+    """把图书移出用户书架，返回是否确实移除"""
+    with transaction.atomic():
+        deleted, _ = Bookshelf.objects.filter(user=user, book_id=book_id).delete()
+        if deleted:
+            Book.objects.filter(pk=book_id, shelf_count__gt=0).update(shelf_count=F('shelf_count') - 1)
+    if deleted:
+        bump_popularity_version()
+    return bool(deleted)
+
+
+def shelved_book_ids(user, book_ids):
+    """当前页的图书中哪些已在用户书架上，一条查询完成"""
+    book_ids = list(book_ids)
+    if not book_ids or not user.is_authenticated:
+        return set()
+    return set(
+        Bookshelf.objects.filter(user=user, book_id__in=book_ids).values_list('book_id', flat=True)
+    )
+
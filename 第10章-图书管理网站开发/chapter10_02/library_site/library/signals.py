@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import autocomplete, backends, categories, duplicates, search, thumbnails
+from .caching import bump_catalogue_version, bump_popularity_version
+from .models import Book, Category, User
+
+# 批量导入图书后发送（bulk_create 不会触发 post_save），参数 books 为新写入的图书列表
+books_imported = Signal()
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """新建 SQLite 连接时执行 settings.LIBRARY_SQLITE_PRAGMAS 中的 PRAGMA（WAL、忙等待超时等）"""
+    if connection.vendor != 'sqlite':
+        return
+    # 直接在底层连接上执行，不计入请求的 SQL 数量
+    for name, value in settings.LIBRARY_SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(pre_save, sender=Book)
+def update_cover_thumbnails(sender, instance, update_fields=None, **kwargs):
+    """图书保存前为封面生成缩略图，并记录封面内容哈希"""
+    if update_fields is not None and 'cover_image' not in update_fields:
+        return
+    instance.cover_hash = thumbnails.generate_thumbnails(instance.cover_image)
+
+
+@receiver(pre_save, sender=Book)
+def update_normalized_key(sender, instance, update_fields=None, **kwargs):
+    """图书保存前根据书名、作者刷新查重键"""
+    if update_fields is None or 'normalized_key' in update_fields:
+        duplicates.book_key(instance)
+    elif {'title', 'author'} & set(update_fields):
+        # 只保存部分字段时查重键不会随之写入，单独更新
+        Book.objects.filter(pk=instance.pk).update(normalized_key=duplicates.book_key(instance))
+
+
+@receiver(pre_save, sender=Book)
+def remember_category(sender, instance, update_fields=None, **kwargs):
+    """记录修改前的分类，保存后据此调整分类图书数量"""
+    if instance._state.adding or (update_fields is not None and 'category' not in update_fields):
+        instance._previous_category_id = instance.category_id
+    else:
+        instance._previous_category_id = Book.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Book)
+def update_category_counts(sender, instance, created, **kwargs):
+    """新增图书或修改分类后更新分类图书数量"""
+    if created:
+        categories.adjust_book_counts({instance.category_id: 1})
+    elif instance._previous_category_id != instance.category_id:
+        categories.adjust_book_counts({instance.category_id: 1, instance._previous_category_id: -1})
+
+
+@receiver(post_save, sender=Book)
+def update_search_index(sender, instance, **kwargs):
+    """图书新增或修改后同步全文索引、前缀索引，并使页面缓存失效"""
+    search.index_book(instance)
+    autocomplete.book_saved(instance)
+    bump_catalogue_version()
+
+
+@receiver(post_delete, sender=Book)
+def remove_search_index(sender, instance, **kwargs):
+    """图书删除后移除全文索引、前缀索引，更新分类图书数量，并使页面缓存失效"""
+    search.remove_book(instance.pk)
+    categories.adjust_book_counts({instance.category_id: -1})
+    autocomplete.book_deleted(instance.pk)
+    bump_catalogue_version()
+
+
+@receiver(post_save, sender=Book)
+def refresh_similar_lists(sender, instance, created, **kwargs):
+    """图书修改后，相似图书列表中包含它的详情页（显示书名、作者）随之更新 ETag"""
+    if not created:
+        Book.objects.filter(similar_entries__similar=instance).update(similar_updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Book)
+def drop_from_similar_lists(sender, instance, **kwargs):
+    """图书删除前（相似图书记录随后被级联删除），更新包含它的详情页的 ETag，避免继续返回 304 和失效的链接"""
+    Book.objects.filter(similar_entries__similar=instance).update(similar_updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_category_pages(sender, instance, **kwargs):
+    """分类改名后更新该分类图书的 updated_at（详情页 ETag、卡片缓存），并使页面缓存失效"""
+    Book.objects.filter(category_id=instance.pk).update(updated_at=timezone.now())
+    bump_catalogue_version()
+
+
+@receiver(pre_delete, sender=User)
+def release_shelf_counts(sender, instance, **kwargs):
+    """删除用户时其书架记录被级联删除，先把这些图书的书架人数减一，并使依赖书架人数的缓存失效"""
+    if Book.objects.filter(shelf_entries__user=instance, shelf_count__gt=0).update(shelf_count=F('shelf_count') - 1):
+        bump_popularity_version()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """用户保存（包括修改密码、登录时更新 last_login）或删除后清除认证后端缓存的用户"""
+    backends.forget_user(instance.pk)
+
+
+@receiver(books_imported, sender=Book)
+def update_indexes_after_import(sender, books, **kwargs):
+    """批量导入后写入全文索引、更新分类图书数量；前缀索引整体重建，避免逐条插入有序列表"""
+    search.index_books(books)
+    categories.adjust_book_counts(categories.count_books(books))
+    autocomplete.reset_index()
+    bump_catalogue_version()
@@ -0,0 +1,42 @@
+// 导航栏搜索框输入提示：输入时请求 autocomplete 接口，把建议填入 datalist
+(function () {
+    var input = document.querySelector('input[data-autocomplete-url]');
+    if (!input) {
+        return;
+    }
+    var list = document.getElementById(input.getAttribute('list'));
+    var url = input.getAttribute('data-autocomplete-url');
+    var timer = null;
+    var lastQuery = '';
+
+    function render(suggestions) {
+        list.innerHTML = '';
+        suggestions.forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = item.value;
+            option.label = item.type === 'author' ? '作者' : '书名';
+            list.appendChild(option);
+        });
+    }
+
+    input.addEventListener('input', function () {
+        var query = input.value.trim();
+        clearTimeout(timer);
+        if (!query) {
+            render([]);
+            return;
+        }
+        // 连续输入时只发送最后一次请求
+        timer = setTimeout(function () {
+            lastQuery = query;
+            fetch(url + '?q=' + encodeURIComponent(query), {credentials: 'same-origin'})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    if (data.query === lastQuery) {
+                        render(data.suggestions || []);
+                    }
+                })
+                .catch(function () {});
+        }, 100);
+    });
+})();
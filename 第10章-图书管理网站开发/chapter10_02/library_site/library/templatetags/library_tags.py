@@ -0,0 +1,49 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from library.thumbnails import THUMBNAIL_SIZES, thumbnail_url
+
+register = template.Library()
+
+# 各展示位置使用的缩略图：位置 -> (1x 规格, 2x 规格)
+PICTURE_SIZES = {
+    'card': ('card', 'retina'),
+    'detail': ('detail', None),
+}
+
+# 没有封面时使用的本地占位图
+PLACEHOLDER = 'library/images/cover-placeholder.svg'
+
+
+def _srcset(cover_hash, sizes, extension):
+    normal, double = sizes
+    srcset = f'{thumbnail_url(cover_hash, normal, extension)} 1x'
+    if double:
+        srcset += f', {thumbnail_url(cover_hash, double, extension)} 2x'
+    return srcset
+
+
+@register.simple_tag
+def cover_picture(book, placement='card', css_class=''):
+    """
+    输出封面的 <picture> 标签：支持 WebP 的浏览器加载 WebP，其余加载 JPEG，高分屏加载 2 倍图
+    尚未生成缩略图时显示本地占位图
+    """
+    sizes = PICTURE_SIZES[placement]
+    width, height = THUMBNAIL_SIZES[sizes[0]]
+    alt = f'{book.title} 封面'
+    if not book.cover_hash:
+        return format_html(
+            '<img src="{}" class="{}" alt="{}" width="{}" height="{}">',
+            static(PLACEHOLDER), css_class, alt, width, height,
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" class="{}" alt="{}" width="{}" height="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        _srcset(book.cover_hash, sizes, 'webp'),
+        thumbnail_url(book.cover_hash, sizes[0], 'jpg'),
+        _srcset(book.cover_hash, sizes, 'jpg'),
+        css_class, alt, width, height,
+    )
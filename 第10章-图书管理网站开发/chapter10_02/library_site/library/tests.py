@@ -1,3 +1,1281 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+from PIL import Image
+
+from . import autocomplete, benchmarks, caching, circulation, duplicates, recommendations, search, shelves, signals, thumbnails
+from .forms import BookForm
+from .models import Book, Bookshelf, Category, Copy, Loan, Reservation, SimilarBook, User
+from .pagination import decode_cursor, encode_cursor, keyset_paginate
+from .profiling import QueryBudgetExceeded, stats
+
+
+@override_settings(LIBRARY_PROFILING=True, LIBRARY_QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """各视图的 SQL 数量不得超过 settings.LIBRARY_QUERY_BUDGETS 中的预算"""
+
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+        autocomplete.reset_index()
+        self.client.login(username='admin', password='123456')
+
+    def test_login_within_budget(self):
+        self.client.logout()
+        response = self.client.post(reverse('library:login'), {'username': 'admin', 'password': '123456'})
+        self.assertRedirects(response, reverse('library:home'))
+
+    def test_views_within_budget(self):
+        urls = [
+            reverse('library:home'),
+            reverse('library:home') + '?sort=title',
+            reverse('library:home') + '?sort=popular',
+            reverse('library:shelf'),
+            reverse('library:search') + '?q=三体',
+            reverse('library:autocomplete') + '?q=三',
+            reverse('library:api_books') + '?fields=id,title,category,shelf_count&sort=popular',
+            reverse('library:add_book'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_book_detail_within_budget(self):
+        book = Book.objects.create(title='红楼梦', author='曹雪芹', category=Category.objects.get(name='古典文学'), description='中国古典四大名著之一')
+        self.assertEqual(self.client.get(reverse('library:book_detail', args=[book.pk])).status_code, 200)
+
+    def test_shelf_within_budget(self):
+        book = Book.objects.first()
+        response = self.client.post(reverse('library:shelf_add', args=[book.pk]))
+        self.assertRedirects(response, reverse('library:home'))
+        response = self.client.post(reverse('library:shelf_remove', args=[book.pk]))
+        self.assertRedirects(response, reverse('library:home'))
+
+    def test_circulation_within_budget(self):
+        book = Book.objects.first()
+        Copy.objects.create(book=book, barcode='B-1')
+        self.assertEqual(self.client.get(reverse('library:book_copies', args=[book.pk])).status_code, 200)
+        self.assertRedirects(self.client.post(reverse('library:borrow', args=[book.pk])), reverse('library:loans'))
+        self.assertEqual(self.client.get(reverse('library:loans')).status_code, 200)
+        loan = Loan.objects.get()
+        self.assertRedirects(self.client.post(reverse('library:return_loan', args=[loan.pk])), reverse('library:loans'))
+
+    def test_add_book_within_budget(self):
+        response = self.client.post(reverse('library:add_book'), {
+            'title': '三国演义',
+            'author': '罗贯中',
+            'category': Category.objects.get(name='古典文学').pk,
+            'description': '中国古典四大名著之一',
+        })
+        self.assertRedirects(response, reverse('library:home'))
+
+    @override_settings(LIBRARY_QUERY_BUDGETS={'library:home': 1})
+    def test_budget_exceeded_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('library:home'))
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('library:home'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+
+@override_settings(LIBRARY_PROFILING=True)
+class ProfilingPageTests(TestCase):
+
+    def setUp(self):
+        stats.reset()
+
+    def test_staff_can_view_stats(self):
+        self.client.login(username='admin', password='123456')
+        self.client.get(reverse('library:home'))
+        response = self.client.get(reverse('library:profiling'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'library:home')
+
+    def test_non_staff_forbidden(self):
+        User.objects.create_user(username='reader', password='reader-pass-123')
+        self.client.login(username='reader', password='reader-pass-123')
+        self.assertEqual(self.client.get(reverse('library:profiling')).status_code, 403)
+
+
+class PaginationTests(TestCase):
+    """键集分页：各排序方式前后翻页完整且不重复，格式或类型错误的游标按未提供处理"""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.get(name='文学')
+        # 排序键相同的图书按 id 区分先后
+        for i in range(7):
+            Book.objects.create(title='同名书', author='同一作者', category=category, description='简介', shelf_count=i % 2)
+        self.client.login(username='admin', password='123456')
+
+    def walk(self, field, page_size=4):
+        """从第一页向后翻到最后一页，再从最后一页向前翻回第一页"""
+        queryset = Book.objects.all()
+        pages = [keyset_paginate(queryset, field, page_size)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate(queryset, field, page_size, after=pages[-1].next_cursor))
+        backward = [pages[-1]]
+        while backward[-1].has_previous:
+            backward.append(keyset_paginate(queryset, field, page_size, before=backward[-1].prev_cursor))
+        forward_ids = [book.pk for page in pages for book in page.items]
+        backward_ids = [book.pk for page in reversed(backward) for book in page.items]
+        return forward_ids, backward_ids
+
+    def test_walk_forward_and_backward(self):
+        for field in ('id', 'title', '-shelf_count', 'category_id'):
+            with self.subTest(field=field):
+                expected = list(Book.objects.order_by(field, '-id' if field.startswith('-') else 'id').values_list('id', flat=True))
+                forward_ids, backward_ids = self.walk(field)
+                self.assertEqual(forward_ids, expected)
+                self.assertEqual(backward_ids, expected)
+
+    def test_decode_cursor_checks_types(self):
+        self.assertEqual(decode_cursor(encode_cursor(['三体', 5]), str), ['三体', 5])
+        self.assertEqual(decode_cursor(encode_cursor([3, 5]), int), [3, 5])
+        for values, value_type in ((['x', 'y'], int), ([None, None], int), (['a', 1], int), ([[1], {}], str),
+                                   ([1, 1], str), ([1, True], int), ([1.5, 1], int), ([1, 2, 3], int)):
+            with self.subTest(values=values):
+                self.assertIsNone(decode_cursor(encode_cursor(values), value_type))
+        self.assertIsNone(decode_cursor('!!not-base64!!'))
+
+    def test_home_ignores_invalid_cursors(self):
+        first_page = self.client.get(reverse('library:home') + '?sort=popular')
+        first_ids = [book.pk for book in first_page.context['books']]
+        for sort, values in (('popular', ['x', 'y']), ('popular', [None, None]), ('category', ['a', 1]),
+                             ('title', [[1], {}]), ('id', ['1', '2'])):
+            with self.subTest(sort=sort, values=values):
+                for direction in ('after', 'before'):
+                    response = self.client.get(reverse('library:home') + f'?sort={sort}&{direction}={encode_cursor(values)}')
+                    self.assertEqual(response.status_code, 200)
+                    if sort == 'popular':
+                        self.assertEqual([book.pk for book in response.context['books']], first_ids)
+
+
+class SearchTests(TestCase):
+    """全文检索：中文二元切分、相关度排序，索引随图书增删改同步"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.get(name='科幻')
+        self.client.login(username='admin', password='123456')
+
+    def search_ids(self, query):
+        return search.search_book_ids(query, 50)
+
+    def test_tokenize(self):
+        self.assertEqual(search.tokenize('三体人'), ['三体', '体人', '人'])
+        self.assertEqual(search.tokenize('Ｐｙｔｈｏｎ编程 3'), ['python', '编程', '程', '3'])
+        self.assertEqual(search.build_match_query('三体 刘'), '"三体" AND "刘"*')
+        self.assertEqual(search.build_match_query('Django 入门'), '"django"* AND "入门"')
+        self.assertEqual(search.build_match_query('，。'), '')
+
+    def test_title_ranks_above_description(self):
+        in_description = Book.objects.create(title='宇宙漫游', author='甲', category=self.category, description='关于星际航行的故事')
+        in_title = Book.objects.create(title='星际航行', author='乙', category=self.category, description='一本书')
+        ids = self.search_ids('星际航行')
+        self.assertEqual(ids[:2], [in_title.pk, in_description.pk])
+        # 单字按前缀匹配，英文不区分大小写
+        self.assertIn(in_title.pk, self.search_ids('星'))
+        book = Book.objects.create(title='Learning Python', author='Mark Lutz', category=self.category, description='入门')
+        self.assertEqual(self.search_ids('learn PYTHON'), [book.pk])
+
+    def test_index_follows_save_and_delete(self):
+        book = Book.objects.create(title='银河帝国', author='阿西莫夫', category=self.category, description='基地系列')
+        self.assertEqual(self.search_ids('银河帝国'), [book.pk])
+        book.title = '基地'
+        book.save()
+        self.assertEqual(self.search_ids('银河帝国'), [])
+        self.assertIn(book.pk, self.search_ids('阿西莫夫'))
+        # 分类名称同样可以检索
+        self.assertIn(book.pk, self.search_ids('科幻'))
+        book_id = book.pk
+        book.delete()
+        self.assertNotIn(book_id, self.search_ids('阿西莫夫'))
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(self.search_ids('余华'), [])
+        call_command('rebuild_search_index', '--batch-size', '3', stdout=io.StringIO())
+        self.assertEqual(self.search_ids('余华'), list(Book.objects.filter(author='余华').values_list('id', flat=True)))
+
+    def test_search_view(self):
+        response = self.client.get(reverse('library:search') + '?q=余华')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book.author for book in response.context['books']], ['余华'])
+        self.assertFalse(response.context['has_next'])
+        response = self.client.get(reverse('library:search') + '?q=')
+        self.assertEqual(response.context['books'], [])
+
+
+class AutocompleteTests(TestCase):
+    """输入提示：前缀索引的增删改，以及接口随图书保存同步"""
+
+    def setUp(self):
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+        self.category = Category.objects.get(name='技术')
+
+    def test_prefix_index(self):
+        index = autocomplete.PrefixIndex()
+        index.load([(1, 'Python 编程', '张三'), (2, 'Python 进阶', '张三'), (3, '算法', '李四')])
+        self.assertEqual(len(index), 3)
+        # 全角、大小写不影响匹配；同一作者只出现一次
+        self.assertEqual([item['value'] for item in index.suggest('ｐｙ')], ['Python 编程', 'Python 进阶'])
+        self.assertEqual(index.suggest('张'), [{'type': 'author', 'value': '张三', 'id': None}])
+        self.assertEqual(len(index.suggest('py', limit=1)), 1)
+        self.assertEqual(index.suggest('  '), [])
+
+        index.add(2, '数据结构', '张三')
+        self.assertEqual([item['id'] for item in index.suggest('python')], [1])
+        self.assertEqual(index.suggest('数据')[0]['id'], 2)
+        index.remove(1)
+        index.remove(2)
+        # 作者的最后一本书删除后作者建议随之消失
+        self.assertEqual(index.suggest('张'), [])
+        self.assertEqual(len(index), 1)
+
+    def test_view_follows_saved_books(self):
+        self.assertEqual(self.client.get(reverse('library:autocomplete') + '?q=三').status_code, 401)
+        self.client.login(username='admin', password='123456')
+        response = self.client.get(reverse('library:autocomplete') + '?q=三')
+        self.assertIn({'type': 'title', 'value': '三体', 'id': Book.objects.get(title='三体').pk}, response.json()['suggestions'])
+
+        book = Book.objects.create(title='三十六计', author='佚名', category=self.category, description='简介')
+        titles = [item['value'] for item in self.client.get(reverse('library:autocomplete') + '?q=三十').json()['suggestions']]
+        self.assertEqual(titles, ['三十六计'])
+        book.delete()
+        self.assertEqual(self.client.get(reverse('library:autocomplete') + '?q=三十').json()['suggestions'], [])
+        response = self.client.get(reverse('library:autocomplete') + '?q=三&limit=1')
+        self.assertEqual(len(response.json()['suggestions']), 1)
+
+
+class CachingTests(TestCase):
+    """首页分页数据与图书卡片片段缓存：命中时不查询图书表，图书变化后随目录版本失效"""
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='admin', password='123456')
+
+    def book_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [query for query in queries.captured_queries if 'FROM "library_book"' in query['sql']]
+
+    def test_home_page_cached(self):
+        url = reverse('library:home')
+        _, queries = self.book_queries(url)
+        self.assertTrue(queries)
+        response, queries = self.book_queries(url)
+        self.assertEqual(queries, [])
+        self.assertTrue(response.context['books'])
+
+    def test_changes_invalidate_cache(self):
+        url = reverse('library:home')
+        self.client.get(url)
+        book = Book.objects.order_by('id').first()
+        version = caching.get_catalogue_version()
+        book.title = '新书名'
+        book.description = '新的简介'
+        book.save()
+        self.assertGreater(caching.get_catalogue_version(), version)
+        # 分页缓存和卡片片段缓存都随之更新
+        response, queries = self.book_queries(url)
+        self.assertTrue(queries)
+        self.assertContains(response, '新书名')
+        self.assertContains(response, '新的简介')
+
+        version = caching.get_catalogue_version()
+        book.delete()
+        self.assertGreater(caching.get_catalogue_version(), version)
+        self.assertNotContains(self.client.get(url), '新书名')
+
+    def test_shelf_changes_invalidate_cache(self):
+        home_url = reverse('library:home') + '?sort=popular'
+        api_url = reverse('library:api_books') + '?fields=id,shelf_count&sort=popular'
+        book = Book.objects.order_by('id').first()
+        Book.objects.update(shelf_count=0)
+        caching.bump_catalogue_version()
+
+        def top():
+            first_id = self.client.get(home_url).context['books'][0].pk
+            result = self.client.get(api_url).json()['results'][0]
+            return first_id, result['id'], result['shelf_count']
+
+        self.assertNotEqual(top()[0], book.pk)
+        default_url = reverse('library:home')
+        default_api_url = reverse('library:api_books') + '?fields=id,title'
+        self.book_queries(default_url)
+        self.book_queries(default_api_url)
+        admin = User.objects.get(username='admin')
+        version = caching.get_catalogue_version()
+        shelves.add_to_shelf(admin, book.pk)
+        self.assertEqual(top(), (book.pk, book.pk, 1))
+        # 不依赖书架人数的页面缓存不受影响
+        self.assertEqual(caching.get_catalogue_version(), version)
+        self.assertEqual(self.book_queries(default_url)[1], [])
+        self.assertEqual(self.book_queries(default_api_url)[1], [])
+        self.assertFalse(shelves.add_to_shelf(admin, book.pk))
+        shelves.remove_from_shelf(admin, book.pk)
+        self.assertEqual(top()[2], 0)
+
+    def test_version_survives_eviction(self):
+        key = caching.make_key('home', 'id')
+        self.assertEqual(caching.make_key('home', 'id'), key)
+        cache.delete(caching.CATALOGUE_VERSION_KEY)
+        caching.bump_catalogue_version()
+        self.assertNotEqual(caching.make_key('home', 'id'), key)
+        self.assertNotEqual(caching.make_key('home', 'title'), caching.make_key('home', 'id'))
+
+
+class ImportBooksTests(TestCase):
+    """批量导入：CSV / JSON Lines 解析、无效行报告、分批写入后同步索引"""
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+
+    def write_file(self, suffix, content, encoding='utf-8'):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, encoding=encoding, newline='', delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def run_import(self, path, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_books', path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv_with_bom(self):
+        path = self.write_file('.csv', 'title,author,category,description\n导入一,作者甲,文学,简介\n导入二,作者甲,科幻,简介\n', 'utf-8-sig')
+        output, errors = self.run_import(path, '--batch-size', '1')
+        self.assertIn('成功 2 本', output)
+        self.assertEqual(errors, '')
+        self.assertEqual(Book.objects.get(title='导入二').category.name, '科幻')
+
+    def test_invalid_rows_reported(self):
+        path = self.write_file('.jsonl', '\n'.join([
+            json.dumps({'title': '有效', 'author': '作者乙', 'category': '文学', 'description': '简介'}, ensure_ascii=False),
+            '{not json',
+            '[1, 2]',
+            json.dumps({'title': '', 'author': '作者乙', 'category': '文学', 'description': '简介'}, ensure_ascii=False),
+            '',
+        ]))
+        output, errors = self.run_import(path)
+        self.assertIn('成功 1 本，无效 3 条', output)
+        for line_number in (2, 3, 4):
+            self.assertIn(f'第 {line_number} 条数据无效', errors)
+
+    def test_strict_keeps_committed_batches(self):
+        rows = [{'title': f'严格{i}', 'author': '作者丙', 'category': '文学', 'description': '简介'} for i in range(3)]
+        rows.append({'title': '严格3', 'author': '作者丙', 'category': '不存在', 'description': '简介'})
+        path = self.write_file('.jsonl', ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+        with self.assertRaisesMessage(CommandError, '第 4 条数据无效'):
+            self.run_import(path, '--strict', '--batch-size', '2')
+        # 已提交的第一批保留，未满一批的数据不写入
+        self.assertEqual(Book.objects.filter(author='作者丙').count(), 2)
+
+    def test_concurrent_insert_not_indexed_again(self):
+        rows = [{'title': f'并发{i}', 'author': '作者丁', 'category': '文学', 'description': '简介'} for i in range(3)]
+        path = self.write_file('.jsonl', ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+        literature = Category.objects.get(name='文学')
+        bulk_create = Book.objects.bulk_create
+
+        def concurrent_bulk_create(books, *args, **kwargs):
+            # 查重之后、写入之前，另一个连接新增了一本图书（post_save 已更新分类计数）
+            Book.objects.create(title='同时新增', author='作者戊', category=literature, description='简介')
+            return bulk_create(books, *args, **kwargs)
+
+        imported = []
+
+        def receiver(sender, books, **kwargs):
+            imported.extend(book.title for book in books)
+
+        signals.books_imported.connect(receiver, sender=Book)
+        self.addCleanup(signals.books_imported.disconnect, receiver, sender=Book)
+        with mock.patch.object(Book.objects, 'bulk_create', concurrent_bulk_create):
+            self.run_import(path)
+        self.assertEqual(imported, ['并发0', '并发1', '并发2'])
+        literature.refresh_from_db()
+        self.assertEqual(literature.book_count, Book.objects.filter(category=literature).count())
+
+    def test_bad_arguments(self):
+        path = self.write_file('.txt', '')
+        with self.assertRaisesMessage(CommandError, '--format'):
+            self.run_import(path)
+        with self.assertRaisesMessage(CommandError, '--batch-size'):
+            self.run_import(path, '--format', 'csv', '--batch-size', '0')
+
+    def test_indexes_updated_after_import(self):
+        autocomplete.get_index()
+        version = caching.get_catalogue_version()
+        path = self.write_file('.jsonl', json.dumps(
+            {'title': '导入的星图', 'author': '作者丁', 'category': '科幻', 'description': '简介'}, ensure_ascii=False) + '\n')
+        self.run_import(path)
+        book = Book.objects.get(title='导入的星图')
+        self.assertEqual(search.search_book_ids('星图', 10), [book.pk])
+        self.assertEqual(autocomplete.get_index().suggest('导入的')[0]['id'], book.pk)
+        self.assertGreater(caching.get_catalogue_version(), version)
+
+
+class ExportBooksTests(TestCase):
+    """目录导出：命令输出、管理员下载，以及导出文件可以原样导入"""
+
+    def setUp(self):
+        cache.clear()
+        Book.objects.create(title='Ｄｊａｎｇｏ, "实战"', author='作者戊', isbn='9780306406157',
+                            category=Category.objects.get(name='技术'), description='第一行\n第二行')
+
+    def export(self, *args):
+        stdout = io.StringIO()
+        call_command('export_books', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def catalogue(self):
+        return sorted(Book.objects.values_list('title', 'author', 'isbn', 'category__name', 'description', 'cover_image'))
+
+    def test_export_to_stdout(self):
+        lines = self.export('--format', 'jsonl').splitlines()
+        self.assertEqual(len(lines), Book.objects.count())
+        self.assertEqual(json.loads(lines[0])['id'], Book.objects.order_by('id').first().pk)
+        csv_output = self.export('--chunk-size', '2')
+        self.assertTrue(csv_output.startswith('﻿id,title,author,isbn,category,description,cover_image'))
+
+    def test_round_trip(self):
+        for file_format in ('csv', 'jsonl'):
+            with self.subTest(file_format=file_format):
+                directory = tempfile.mkdtemp()
+                self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+                path = os.path.join(directory, f'books.{file_format}')
+                output = self.export(path)
+                self.assertIn(f'已导出 {Book.objects.count()} 本图书', output)
+                expected = self.catalogue()
+                Book.objects.all().delete()
+                call_command('import_books', path, stdout=io.StringIO(), stderr=io.StringIO())
+                self.assertEqual(self.catalogue(), expected)
+
+    def test_download_requires_staff(self):
+        User.objects.create_user(username='reader', password='reader-pass-123')
+        self.client.login(username='reader', password='reader-pass-123')
+        self.assertEqual(self.client.get(reverse('library:export_books')).status_code, 403)
+        self.client.login(username='admin', password='123456')
+        response = self.client.get(reverse('library:export_books') + '?format=jsonl')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        body = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(len(body.splitlines()), Book.objects.count())
+
+
+class ThumbnailTests(TestCase):
+    """封面缩略图：按内容哈希生成各规格文件，MEDIA_ROOT 之外的地址视为没有本地文件"""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.media_root = os.path.join(temp_dir.name, 'media')
+        os.makedirs(os.path.join(self.media_root, 'covers'))
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        Image.new('RGB', (120, 160), 'red').save(os.path.join(self.media_root, 'covers', 'cover.png'))
+        Image.new('RGB', (120, 160), 'blue').save(os.path.join(temp_dir.name, 'secret.png'))
+
+    def test_generate_thumbnails(self):
+        cover_hash = thumbnails.generate_thumbnails('/media/covers/cover.png')
+        self.assertEqual(len(cover_hash), thumbnails.HASH_LENGTH)
+        for size, dimensions in thumbnails.THUMBNAIL_SIZES.items():
+            for extension in thumbnails.THUMBNAIL_FORMATS:
+                path = os.path.join(self.media_root, thumbnails.thumbnail_name(cover_hash, size, extension))
+                with Image.open(path) as image:
+                    self.assertEqual(image.size, dimensions)
+        book = Book.objects.create(title='封面测试', author='作者己',
+                                   category=Category.objects.get(name='技术'), cover_image='/media/covers/cover.png')
+        self.assertEqual(book.cover_hash, cover_hash)
+
+    def test_missing_or_invalid_cover(self):
+        with open(os.path.join(self.media_root, 'covers', 'broken.png'), 'wb') as f:
+            f.write(b'not an image')
+        self.assertEqual(thumbnails.generate_thumbnails(''), '')
+        self.assertEqual(thumbnails.generate_thumbnails('/media/covers/missing.png'), '')
+        self.assertEqual(thumbnails.generate_thumbnails('/media/covers/broken.png'), '')
+
+    def test_path_outside_media_root(self):
+        self.assertEqual(thumbnails.resolve_cover_path('/media/covers/cover.png'),
+                         os.path.join(self.media_root, 'covers', 'cover.png'))
+        for cover_image in ('/media/../secret.png', '/media/covers/../../secret.png', '/static/../../secret.png'):
+            with self.subTest(cover_image=cover_image):
+                self.assertIsNone(thumbnails.resolve_cover_path(cover_image))
+                self.assertEqual(thumbnails.generate_thumbnails(cover_image), '')
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, thumbnails.THUMBNAIL_DIR)))
+
+
+class BookDetailTests(TestCase):
+    """详情页的条件请求：未修改返回 304，保存后 ETag 变化"""
+
+    def setUp(self):
+        self.book = Book.objects.create(title='红楼梦', author='曹雪芹', category=Category.objects.get(name='古典文学'), description='中国古典四大名著之一')
+        self.url = reverse('library:book_detail', args=[self.book.pk])
+        self.client.login(username='admin', password='123456')
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, '红楼梦')
+        self.assertIn('private', response['Cache-Control'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_after_save(self):
+        etag = self.client.get(self.url)['ETag']
+        self.book.description = '清代长篇小说'
+        self.book.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, '清代长篇小说')
+
+    def test_missing_book(self):
+        self.assertEqual(self.client.get(reverse('library:book_detail', args=[self.book.pk + 1000])).status_code, 404)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertRedirects(self.client.get(self.url), reverse('library:login'))
+
+
+class BookshelfTests(TestCase):
+    """书架增删同步 shelf_count，首页一条查询标记已加入书架的图书"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='admin')
+        self.books = list(Book.objects.order_by('id'))
+        self.client.login(username='admin', password='123456')
+
+    def test_add_and_remove_update_count(self):
+        book = self.books[0]
+        url = reverse('library:shelf_add', args=[book.pk])
+        response = self.client.post(url, {'next': reverse('library:home') + '?sort=title'})
+        self.assertRedirects(response, reverse('library:home') + '?sort=title')
+        # 重复加入不会重复计数
+        self.client.post(url)
+        book.refresh_from_db()
+        self.assertEqual(book.shelf_count, 1)
+        self.assertEqual(Bookshelf.objects.filter(user=self.user, book=book).count(), 1)
+
+        self.client.post(reverse('library:shelf_remove', args=[book.pk]))
+        self.client.post(reverse('library:shelf_remove', args=[book.pk]))
+        book.refresh_from_db()
+        self.assertEqual(book.shelf_count, 0)
+
+    def test_missing_book(self):
+        self.assertEqual(self.client.post(reverse('library:shelf_add', args=[99999])).status_code, 404)
+
+    def test_unsafe_next_ignored(self):
+        response = self.client.post(reverse('library:shelf_add', args=[self.books[0].pk]), {'next': 'https://example.com/'})
+        self.assertRedirects(response, reverse('library:home'))
+
+    def test_home_marks_shelved_books_in_one_query(self):
+        for book in self.books[:3]:
+            shelves.add_to_shelf(self.user, book.pk)
+        self.client.get(reverse('library:home'))
+        # 分页数据、会话和用户都已缓存：只有书架状态一条查询，与本页图书数量无关
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('library:home'))
+        self.assertEqual(response.context['shelved'], {book.pk for book in self.books[:3]})
+        self.assertContains(response, '移出书架', count=3)
+
+    def test_deleting_user_releases_counts(self):
+        reader = User.objects.create_user(username='reader', password='reader-pass-123')
+        shelves.add_to_shelf(reader, self.books[0].pk)
+        shelves.add_to_shelf(self.user, self.books[0].pk)
+        reader.delete()
+        self.books[0].refresh_from_db()
+        self.assertEqual(self.books[0].shelf_count, 1)
+
+    def test_popular_sort_pages(self):
+        # 人气相同的图书较多，验证翻页时按 (shelf_count, id) 倒序不重复、不遗漏
+        category = Category.objects.first()
+        Book.objects.bulk_create(
+            Book(title=f'图书{i}', author='作者', category=category, description='简介', shelf_count=i % 3)
+            for i in range(20)
+        )
+        expected = [book.title for book in Book.objects.order_by('-shelf_count', '-id')]
+        pages, url = [], reverse('library:home') + '?sort=popular'
+        while url:
+            response = self.client.get(url)
+            page = response.context['page']
+            pages.append([book.title for book in page.items])
+            url = reverse('library:home') + f'?sort=popular&after={page.next_cursor}' if page.has_next else None
+        self.assertEqual(sum(pages, []), expected)
+        self.assertGreater(len(pages), 2)
+
+        # 从最后一页往回翻
+        response = self.client.get(reverse('library:home') + f'?sort=popular&before={page.prev_cursor}')
+        self.assertEqual([book.title for book in response.context['books']], pages[-2])
+
+
+class CategoryTests(TestCase):
+    """分类图书数量随图书增删改和批量导入同步，首页按分类筛选"""
+
+    def setUp(self):
+        cache.clear()
+        self.literature = Category.objects.get(name='文学')
+        self.scifi = Category.objects.get(name='科幻')
+
+    def assertCountsMatch(self):
+        for category in Category.objects.all():
+            self.assertEqual(category.book_count, category.books.count(), category.name)
+
+    def test_migrated_counts(self):
+        self.assertCountsMatch()
+
+    def test_counts_follow_save_and_delete(self):
+        book = Book.objects.create(title='围城', author='钱钟书', category=self.literature, description='简介')
+        book.category = self.scifi
+        book.save()
+        book.title = '围城（新版）'
+        book.save(update_fields=['title'])
+        self.assertCountsMatch()
+        book.delete()
+        self.assertCountsMatch()
+
+    def test_import_updates_counts(self):
+        rows = [{'title': f'图书{i}', 'author': '作者', 'category': '科幻', 'description': '简介'} for i in range(5)]
+        rows.append({'title': '无效', 'author': '作者', 'category': '不存在的分类', 'description': '简介'})
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8', delete=False) as f:
+            f.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        self.addCleanup(os.remove, f.name)
+        call_command('import_books', f.name, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(Book.objects.filter(title__startswith='图书').count(), 5)
+        self.assertCountsMatch()
+
+    def test_home_filters_by_category(self):
+        self.client.login(username='admin', password='123456')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('library:home') + f'?category={self.literature.pk}&sort=title')
+        self.assertEqual(response.context['category'], self.literature)
+        self.assertTrue(response.context['books'])
+        self.assertTrue(all(book.category_id == self.literature.pk for book in response.context['books']))
+        self.assertContains(response, f'<span class="badge bg-secondary rounded-pill">{self.literature.book_count}</span>', html=True)
+        # 分类导航读取冗余的图书数量，不做分组统计
+        self.assertFalse([query for query in queries.captured_queries if 'COUNT(' in query['sql']])
+
+
+class DuplicateTests(TestCase):
+    """新增和批量导入图书时按规范化的书名/作者和 ISBN 查重"""
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='admin', password='123456')
+        self.literature = Category.objects.get(name='文学')
+        self.book = Book.objects.get(title='活着')
+
+    def import_rows(self, rows, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8', delete=False) as f:
+            f.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        self.addCleanup(os.remove, f.name)
+        stderr = io.StringIO()
+        call_command('import_books', f.name, *args, stdout=io.StringIO(), stderr=stderr)
+        return stderr.getvalue()
+
+    def test_normalize_key(self):
+        self.assertEqual(
+            duplicates.normalize_key('Ｐｙｔｈｏｎ 编程：入门', 'Mark Lutz'),
+            duplicates.normalize_key('python编程入门', 'MARK·LUTZ'),
+        )
+        self.assertNotEqual(duplicates.normalize_key('三体', '刘慈欣'), duplicates.normalize_key('三体2', '刘慈欣'))
+        self.assertEqual(self.book.normalized_key, duplicates.normalize_key('活着', '余华'))
+
+    def test_normalize_isbn(self):
+        self.assertEqual(duplicates.normalize_isbn('0-306-40615-2'), '9780306406157')
+        self.assertEqual(duplicates.normalize_isbn(' 978-0-306-40615-7 '), '9780306406157')
+        self.assertEqual(duplicates.normalize_isbn(''), '')
+        for value in ('0-306-40615-3', '9780306406158', '12345'):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                duplicates.normalize_isbn(value)
+
+    def test_add_book_rejects_duplicate(self):
+        count = Book.objects.count()
+        response = self.client.post(reverse('library:add_book'), {
+            'title': '活 着！', 'author': '余华', 'category': self.literature.pk, 'description': '简介', 'cover_image': '',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'编号 {self.book.pk}', str(response.context['form'].non_field_errors()))
+        self.assertEqual(Book.objects.count(), count)
+
+    def test_add_book_rejects_duplicate_isbn(self):
+        Book.objects.filter(pk=self.book.pk).update(isbn='9780306406157')
+        form = BookForm(data={
+            'title': '另一本书', 'author': '作者', 'isbn': '0-306-40615-2', 'category': self.literature.pk, 'description': '简介',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['__all__'][0].code, 'duplicate')
+
+    def test_symbol_only_titles_have_no_key(self):
+        self.assertEqual(duplicates.normalize_key('！！！', '？'), '')
+        Book.objects.create(title='……', author='佚名', category=self.literature, description='简介')
+        form = BookForm(data={'title': '？？', 'author': '——', 'category': self.literature.pk, 'description': '简介'})
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertNotIn('', [key for key, _ in duplicates.duplicate_groups()])
+        # 不报告重复
+        self.assertEqual(self.import_rows([
+            {'title': '!!', 'author': '@@', 'category': '文学', 'description': '简介'},
+            {'title': '##', 'author': '$$', 'category': '文学', 'description': '简介'},
+        ]), '')
+        self.assertEqual(Book.objects.filter(normalized_key='').count(), 4)
+
+    def test_concurrent_duplicate_isbn(self):
+        Book.objects.filter(pk=self.book.pk).update(isbn='9780306406157')
+        count = Book.objects.count()
+        # 查重时还没有重复（另一个请求尚未提交），保存时违反 ISBN 唯一约束
+        with mock.patch.object(duplicates, 'find_duplicate', side_effect=[None, self.book]):
+            response = self.client.post(reverse('library:add_book'), {
+                'title': '另一本书', 'author': '作者', 'isbn': '0-306-40615-2', 'category': self.literature.pk,
+                'description': '简介', 'cover_image': '',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'编号 {self.book.pk}', str(response.context['form'].non_field_errors()))
+        self.assertEqual(Book.objects.count(), count)
+
+    def test_lookup_uses_indexes(self):
+        with CaptureQueriesContext(connection) as queries:
+            duplicates.find_duplicate('活着', '余华', '9780306406157')
+            duplicates.existing_duplicates(['活着|余华', '三体|刘慈欣'], ['9780306406157'])
+        for query in queries.captured_queries:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertNotIn('SCAN library_book', plan)
+            self.assertIn('library_book_unique_isbn', plan)
+
+    def test_partial_save_refreshes_key(self):
+        self.book.title = '活着（典藏版）'
+        self.book.save(update_fields=['title'])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.normalized_key, duplicates.normalize_key('活着（典藏版）', '余华'))
+
+    def test_import_skips_duplicates(self):
+        rows = [
+            {'title': 'ＨＯＨＯ', 'author': '作者甲', 'category': '文学', 'description': '简介'},
+            {'title': 'hoho', 'author': '作者甲', 'category': '文学', 'description': '简介'},
+            {'title': '活着', 'author': '余 华', 'category': '文学', 'description': '简介'},
+        ]
+        errors = self.import_rows(rows)
+        self.assertEqual(Book.objects.filter(author='作者甲').count(), 1)
+        self.assertEqual(Book.objects.filter(author__in=['余华', '余 华']).count(), 1)
+        self.assertIn('第 2 条数据与文件中前面的数据重复', errors)
+        self.assertIn(f'第 3 条数据与已有图书（编号 {self.book.pk}）重复', errors)
+
+    def test_import_merges_duplicates(self):
+        rows = [
+            {'title': '活着', 'author': '余华', 'isbn': '0-306-40615-2', 'category': '文学', 'description': '简介'},
+            {'title': '新书', 'author': '作者乙', 'category': '文学', 'description': '简介'},
+            {'title': '新书', 'author': '作者乙', 'isbn': '9787020002207', 'category': '文学', 'description': '简介'},
+        ]
+        self.import_rows(rows, '--merge')
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.isbn, '9780306406157')
+        self.assertEqual(Book.objects.get(title='新书').isbn, '9787020002207')
+        self.assertEqual(Book.objects.filter(author='余华').count(), 1)
+
+    def test_find_duplicate_books(self):
+        Book.objects.bulk_create([
+            Book(title='活　着', author='余华', category=self.literature, description='简介',
+                 normalized_key=duplicates.normalize_key('活　着', '余华')),
+        ])
+        out = io.StringIO()
+        call_command('find_duplicate_books', stdout=out)
+        self.assertIn('活着|余华', out.getvalue())
+        self.assertIn(f'编号 {self.book.pk}《活着》', out.getvalue())
+
+
+class BookApiTests(TestCase):
+    """图书 API：游标翻页、字段选择、筛选和条件请求"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.get(name='科幻')
+        Book.objects.bulk_create(
+            Book(title=f'科幻小说{i:02d}', author='刘慈欣' if i % 2 else '王晋康', category=self.category, description='简介')
+            for i in range(25)
+        )
+        self.url = reverse('library:api_books')
+        self.client.login(username='admin', password='123456')
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_pagination(self):
+        seen = []
+        data = self.get(limit=10)
+        while True:
+            seen.extend(book['id'] for book in data['results'])
+            if not data['next_cursor']:
+                break
+            data = self.get(limit=10, after=data['next_cursor'])
+        self.assertEqual(seen, list(Book.objects.order_by('id').values_list('id', flat=True)))
+        previous = self.get(limit=10, before=data['prev_cursor'])
+        self.assertEqual(len(previous['results']), 10)
+        self.assertLess(previous['results'][-1]['id'], data['results'][0]['id'])
+
+    def test_fields_and_filters(self):
+        data = self.get(fields='title,category', category=self.category.pk, author='刘慈欣', sort='title', limit=100)
+        self.assertEqual(len(data['results']), Book.objects.filter(category=self.category, author='刘慈欣').count())
+        self.assertEqual(set(data['results'][0]), {'title', 'category'})
+        self.assertEqual(data['results'][0]['category'], '科幻')
+        titles = [book['title'] for book in data['results']]
+        self.assertEqual(titles, sorted(titles))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'fields': 'title,password'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'sort': 'random'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'category': 'abc'}).status_code, 400)
+        # 格式错误、值为 null 或类型与排序字段不符的游标
+        title_cursor = self.get(sort='title', limit=1)['next_cursor']
+        for params in ({'after': 'not-a-cursor'}, {'before': encode_cursor([None, 1])},
+                       {'after': encode_cursor(['abc', 1])}, {'sort': 'popular', 'after': title_cursor}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('游标', response.json()['error'])
+        self.assertEqual(self.client.get(self.url, {'sort': 'title', 'after': title_cursor}).status_code, 200)
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            # 响应内容、会话和用户都来自缓存
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        book = Book.objects.order_by('id').first()
+        book.title = '新书名'
+        book.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['title'], '新书名')
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class RecommendationTests(TestCase):
+    """相似图书：批量计算写入排名，详情页展示并更新 ETag，新增图书增量更新"""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path_override = override_settings(LIBRARY_RECOMMENDER_PATH=os.path.join(temp_dir.name, 'recommender.npz'))
+        path_override.enable()
+        self.addCleanup(path_override.disable)
+        recommendations.reset_recommender()
+        self.addCleanup(recommendations.reset_recommender)
+
+        wuxia = Category.objects.get_or_create(name='武侠小说')[0]
+        self.books = [
+            Book.objects.create(title=title, author='金庸', category=wuxia, description=description)
+            for title, description in [
+                ('射雕英雄传', '郭靖与黄蓉的江湖故事，讲述侠之大者为国为民'),
+                ('神雕侠侣', '杨过与小龙女的江湖故事，古墓派武功传承'),
+                ('倚天屠龙记', '张无忌的江湖故事，屠龙刀与倚天剑的秘密'),
+            ]
+        ]
+        self.client.login(username='admin', password='123456')
+
+    def similar_ids(self, book):
+        return [similar.pk for similar in recommendations.similar_books(book.pk)]
+
+    def test_build(self):
+        total, changed = recommendations.build()
+        self.assertEqual(total, Book.objects.count())
+        self.assertGreater(changed, 0)
+        first, second, third = self.books
+        self.assertEqual(set(self.similar_ids(first)[:2]), {second.pk, third.pk})
+        ranks = list(SimilarBook.objects.filter(book=first).values_list('rank', flat=True))
+        self.assertEqual(ranks, list(range(1, len(ranks) + 1)))
+        self.assertNotIn(first.pk, self.similar_ids(first))
+        # 结果没有变化时不改写列表
+        self.assertEqual(recommendations.build(), (total, 0))
+
+    def test_detail_page(self):
+        url = reverse('library:book_detail', args=[self.books[0].pk])
+        etag = self.client.get(url)['ETag']
+        recommendations.build()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '相似图书')
+        self.assertContains(response, '神雕侠侣')
+
+    def test_detail_etag_follows_displayed_data(self):
+        recommendations.build()
+        first, second, _ = self.books
+        url = reverse('library:book_detail', args=[first.pk])
+
+        def changed(etag):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            return response
+
+        etag = self.client.get(url)['ETag']
+        category = Category.objects.get(pk=first.category_id)
+        category.name = '新派武侠'
+        category.save()
+        response = changed(etag)
+        self.assertContains(response, '新派武侠')
+
+        second.title = '神雕侠侣（修订版）'
+        second.save()
+        response = changed(response['ETag'])
+        self.assertContains(response, '神雕侠侣（修订版）')
+
+        second_url = reverse('library:book_detail', args=[second.pk])
+        second.delete()
+        response = changed(response['ETag'])
+        self.assertNotContains(response, second_url)
+
+    def test_add_book_incremental(self):
+        recommendations.build()
+        first = self.books[0]
+        before = Book.objects.get(pk=first.pk).similar_updated_at
+        response = self.client.post(reverse('library:add_book'), {
+            'title': '笑傲江湖', 'author': '金庸', 'category': first.category_id,
+            'description': '令狐冲的江湖故事，华山派与日月神教',
+        })
+        self.assertRedirects(response, reverse('library:home'))
+        book = Book.objects.get(title='笑傲江湖')
+        self.assertEqual(set(self.similar_ids(book)[:3]), {b.pk for b in self.books})
+        self.assertIn(book.pk, self.similar_ids(first))
+        self.assertGreater(Book.objects.get(pk=first.pk).similar_updated_at, before)
+
+    def test_add_book_without_model(self):
+        book = Book.objects.create(title='鹿鼎记', author='金庸', category=self.books[0].category, description='韦小宝')
+        recommendations.add_book(book)
+        self.assertEqual(self.similar_ids(book), [])
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('compute_similar_books', '--k', '2', stdout=out)
+        self.assertIn('已计算', out.getvalue())
+        self.assertEqual(SimilarBook.objects.filter(book=self.books[0]).count(), 2)
+
+
+class CirculationTests(TestCase):
+    """借阅、归还、预约的基本流程"""
+
+    def setUp(self):
+        self.book = Book.objects.first()
+        self.copy = Copy.objects.create(book=self.book, barcode='B-1')
+        self.alice = User.objects.create_user(username='alice', password='alice-pass-123')
+        self.bob = User.objects.create_user(username='bob', password='bob-pass-123')
+
+    def test_borrow_and_return(self):
+        loan = circulation.borrow(self.alice, self.book.pk)
+        self.assertEqual(loan.copy_id, self.copy.pk)
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.status, Copy.ON_LOAN)
+        with self.assertRaisesMessage(circulation.CirculationError, '暂无可借副本'):
+            circulation.borrow(self.bob, self.book.pk)
+
+        circulation.return_loan(self.alice, loan.pk)
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.status, Copy.AVAILABLE)
+        with self.assertRaises(circulation.CirculationError):
+            circulation.return_loan(self.alice, loan.pk)
+
+    def test_same_book_borrowed_once(self):
+        Copy.objects.create(book=self.book, barcode='B-2')
+        circulation.borrow(self.alice, self.book.pk)
+        with self.assertRaisesMessage(circulation.CirculationError, '你已借阅这本书'):
+            circulation.borrow(self.alice, self.book.pk)
+
+    def test_loan_limit(self):
+        books = Book.objects.exclude(pk=self.book.pk)[:circulation.MAX_ACTIVE_LOANS]
+        for index, book in enumerate(books):
+            Copy.objects.create(book=book, barcode=f'L-{index}')
+            circulation.borrow(self.alice, book.pk)
+        with self.assertRaisesMessage(circulation.CirculationError, '最多同时借阅'):
+            circulation.borrow(self.alice, self.book.pk)
+        # 上限检查失败后副本仍可借
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.status, Copy.AVAILABLE)
+
+    def test_returned_copy_held_for_first_reservation(self):
+        loan = circulation.borrow(self.alice, self.book.pk)
+        with self.assertRaisesMessage(circulation.CirculationError, '当前有可借副本'):
+            circulation.reserve(self.bob, Copy.objects.create(book=Book.objects.last(), barcode='B-9').book_id)
+        reservation = circulation.reserve(self.bob, self.book.pk)
+        with self.assertRaises(circulation.CirculationError):
+            circulation.reserve(self.bob, self.book.pk)
+
+        circulation.return_loan(self.alice, loan.pk)
+        reservation.refresh_from_db()
+        self.assertEqual((reservation.status, reservation.copy_id), (Reservation.READY, self.copy.pk))
+        # 保留的副本不能被其他人借走
+        with self.assertRaises(circulation.CirculationError):
+            circulation.borrow(self.alice, self.book.pk)
+
+        circulation.borrow(self.bob, self.book.pk)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.FULFILLED)
+
+    def test_cancel_ready_reservation_passes_copy_on(self):
+        loan = circulation.borrow(self.alice, self.book.pk)
+        first = circulation.reserve(self.bob, self.book.pk)
+        carol = User.objects.create_user(username='carol', password='carol-pass-123')
+        second = circulation.reserve(carol, self.book.pk)
+        circulation.return_loan(self.alice, loan.pk)
+        circulation.cancel_reservation(self.bob, first.pk)
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.copy_id), (Reservation.READY, self.copy.pk))
+        circulation.cancel_reservation(carol, second.pk)
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.status, Copy.AVAILABLE)
+
+    def test_reserve_without_copies(self):
+        with self.assertRaisesMessage(circulation.CirculationError, '暂无馆藏副本'):
+            circulation.reserve(self.alice, Book.objects.exclude(pk=self.book.pk).first().pk)
+
+    def test_add_copies_after_delete(self):
+        book = Book.objects.exclude(pk=self.book.pk).first()
+        call_command('add_copies', '3', '--book', str(book.pk), stdout=io.StringIO())
+        Copy.objects.get(barcode=f'{book.pk:07d}-002').delete()
+        call_command('add_copies', '2', '--book', str(book.pk), stdout=io.StringIO())
+        barcodes = sorted(Copy.objects.filter(book=book).values_list('barcode', flat=True))
+        self.assertEqual(barcodes, [f'{book.pk:07d}-{seq:03d}' for seq in (1, 3, 4, 5)])
+
+
+class CirculationConcurrencyTests(TransactionTestCase):
+    """多线程同时借阅、归还同一本热门图书，任何时刻一个副本都不会同时借给两个人"""
+
+    COPIES = 3
+    USERS = 24
+
+    def setUp(self):
+        # TransactionTestCase 每个测试后清空数据表，迁移写入的分类不一定存在
+        category, _ = Category.objects.get_or_create(name='文学')
+        self.book = Book.objects.create(title='热门图书', author='作者', category=category, description='简介')
+        Copy.objects.bulk_create(Copy(book=self.book, barcode=f'HOT-{i}') for i in range(self.COPIES))
+        # 不需要登录，跳过密码哈希
+        User.objects.bulk_create(User(username=f'reader{i}') for i in range(self.USERS))
+        self.users = list(User.objects.filter(username__startswith='reader'))
+
+    def _run_threads(self, target):
+        barrier = threading.Barrier(self.USERS)
+        errors = []
+
+        def run(user):
+            try:
+                barrier.wait()
+                target(user)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def _assert_consistent(self):
+        active = Loan.objects.filter(returned_at__isnull=True)
+        self.assertEqual(active.count(), active.values('copy').distinct().count())
+        self.assertEqual(active.count(), Copy.objects.filter(status=Copy.ON_LOAN).count())
+        for copy in Copy.objects.all():
+            self.assertEqual(copy.version, copy.loans.count() * 2 - (copy.status == Copy.ON_LOAN))
+
+    def test_parallel_checkout(self):
+        borrowed = []
+
+        def borrow(user):
+            try:
+                borrowed.append(circulation.borrow(user, self.book.pk).copy_id)
+            except circulation.CirculationError:
+                pass
+
+        self._run_threads(borrow)
+        self.assertEqual(sorted(borrowed), sorted(Copy.objects.values_list('pk', flat=True)))
+        self._assert_consistent()
+
+    def test_parallel_borrow_and_return(self):
+        def churn(user):
+            rng = random.Random(user.pk)
+            for _ in range(5):
+                try:
+                    loan = circulation.borrow(user, self.book.pk)
+                except circulation.CirculationError:
+                    continue
+                if rng.random() < 0.8:
+                    circulation.return_loan(user, loan.pk)
+
+        self._run_threads(churn)
+        self._assert_consistent()
+
+
+class SqlitePragmaTests(TestCase):
+    """新建连接时按 LIBRARY_SQLITE_PRAGMAS 设置 PRAGMA，且不计入请求的 SQL 数量"""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        original = self.pragma('busy_timeout')
+        self.addCleanup(connection.connection.execute, f'PRAGMA busy_timeout = {original}')
+        with override_settings(LIBRARY_SQLITE_PRAGMAS={'busy_timeout': 1234}):
+            with self.assertNumQueries(0):
+                signals.configure_sqlite(sender=connection.__class__, connection=connection)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+
+class CachedAuthTests(TestCase):
+    """已登录用户的请求从缓存读取会话和用户，用户变化后缓存立即失效"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='reader-pass-123')
+        self.client.login(username='reader', password='reader-pass-123')
+        self.url = reverse('library:api_books')
+        self.etag = self.client.get(self.url)['ETag']
+
+    def test_no_queries_when_cached(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag).status_code, 304)
+
+    def test_password_change_logs_out(self):
+        self.user.set_password('another-pass-456')
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deactivated_user_logged_out(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class StaticFilesTests(TestCase):
+    """生产配置的静态文件：collectstatic 生成带哈希的文件名和压缩文件，WhiteNoise 返回长期缓存头"""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        from library_site import settings_production
+        storage_override = override_settings(
+            STATIC_ROOT=temp_dir.name,
+            STATICFILES_STORAGE=settings_production.STATICFILES_STORAGE,
+            MIDDLEWARE=settings_production.MIDDLEWARE,
+        )
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.client.login(username='admin', password='123456')
+
+    def stylesheet_url(self):
+        body = self.client.get(reverse('library:home')).content.decode('utf-8')
+        urls = [url for url in body.split('"') if url.startswith('/static/library/css/library.')]
+        self.assertEqual(len(urls), 1)
+        return urls[0]
+
+    def test_hashed_url_cached_forever(self):
+        url = self.stylesheet_url()
+        self.assertNotEqual(url, '/static/library/css/library.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_unhashed_url_short_cache(self):
+        self.stylesheet_url()
+        response = self.client.get('/static/library/css/library.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_development_settings_unchanged(self):
+        from library_site import settings as development_settings
+        from library_site import settings_production
+        self.assertEqual(settings_production.DATABASES['default']['CONN_MAX_AGE'], 600)
+        self.assertEqual(development_settings.DATABASES['default'].get('CONN_MAX_AGE', 0), 0)
+        self.assertNotIn('whitenoise.middleware.WhiteNoiseMiddleware', development_settings.MIDDLEWARE)
+        # 用户缓存和目录版本号须在工作进程之间共用
+        self.assertNotIn('locmem', settings_production.CACHES['default']['BACKEND'])
+
+
+@override_settings(ROOT_URLCONF='library_site.urls_asgi')
+class AsyncViewTests(TransactionTestCase):
+    """ASGI 路由下的异步列表、检索、详情视图（查询在线程池中的其他连接执行，因此使用 TransactionTestCase）"""
+
+    def setUp(self):
+        cache.clear()
+        category, _ = Category.objects.get_or_create(name='古典文学')
+        self.book = Book.objects.create(title='红楼梦', author='曹雪芹', category=category, description='中国古典四大名著之一')
+        self.user = User.objects.create(username='reader')
+        self.async_client.force_login(self.user)
+
+    async def test_home_and_search(self):
+        response = await self.async_client.get(reverse('library:home'))
+        self.assertContains(response, '红楼梦')
+        # Django 3.2 的 AsyncClient 会忽略 data 参数，查询参数直接写在地址中
+        response = await self.async_client.get(reverse('library:search') + '?' + urlencode({'q': '曹雪芹'}))
+        self.assertContains(response, '红楼梦')
+
+    async def test_book_detail_conditional(self):
+        url = reverse('library:book_detail', args=[self.book.pk])
+        response = await self.async_client.get(url)
+        self.assertContains(response, '中国古典四大名著之一')
+        self.assertIn('private', response['Cache-Control'])
+        # Django 3.2 的 AsyncClient 需要以 ASGI 格式传入请求头
+        response = await self.async_client.get(url, **{'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get(reverse('library:book_detail', args=[self.book.pk + 1000]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_requires_login(self):
+        response = await AsyncClient().get(reverse('library:home'))
+        self.assertRedirects(response, reverse('library:login'), fetch_redirect_response=False)
+
+    @override_settings(LIBRARY_PROFILING=True, LIBRARY_QUERY_BUDGETS={'library:book_detail': 1}, LIBRARY_QUERY_BUDGET_STRICT=True)
+    async def test_profiling_counts_offloaded_queries(self):
+        stats.reset()
+        # 查询在线程池中的其他线程执行，同样计入请求的 SQL 数量和预算
+        with self.assertRaises(QueryBudgetExceeded):
+            await self.async_client.get(reverse('library:book_detail', args=[self.book.pk]))
+        views = {row['view']: row for row in stats.summary()[0]}
+        self.assertGreater(views['library:book_detail']['max_queries'], 1)
+
+
+class BenchmarkSmokeTests(TestCase):
+    """压测场景本身可以正常运行（数据量和请求数都很小）"""
+
+    def test_client_benchmark_runs_without_errors(self):
+        factory = benchmarks.BookFactory(seed=1)
+        benchmarks.seed_books(50, factory)
+        benchmarks.seed_users(2)
+        workload = benchmarks.Workload(factory, benchmarks.search_terms(factory), user_count=2)
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            results = benchmarks.run_client(workload, requests=2)
+        self.assertEqual(set(results), set(benchmarks.SCENARIOS))
+        for name, result in results.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertEqual(result['requests'], 2)
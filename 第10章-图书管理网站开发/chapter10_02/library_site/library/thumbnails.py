@@ -0,0 +1,118 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# 缩略图规格：名称 -> (宽, 高)，retina 为卡片尺寸的两倍，用于高分屏
+THUMBNAIL_SIZES = {
+    'card': (400, 300),
+    'retina': (800, 600),
+    'detail': (600, 800),
+}
+
+# 输出格式：扩展名 -> (Pillow 格式, 保存参数)
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# 缩略图保存在 MEDIA_ROOT 下的子目录
+THUMBNAIL_DIR = 'thumbs'
+
+# 上传的封面原图保存在 MEDIA_ROOT 下的子目录
+UPLOAD_DIR = 'covers'
+
+# 文件名中使用的内容哈希长度
+HASH_LENGTH = 16
+
+
+def thumbnail_name(cover_hash, size, extension):
+    """缩略图相对 MEDIA_ROOT 的路径，文件名包含原图内容哈希，内容不变则地址不变"""
+    return f'{THUMBNAIL_DIR}/{cover_hash}-{size}.{extension}'
+
+
+def thumbnail_url(cover_hash, size, extension):
+    return settings.MEDIA_URL + thumbnail_name(cover_hash, size, extension)
+
+
+def resolve_cover_path(cover_image):
+    """
+    把 cover_image 中保存的地址转换为本地文件路径，找不到时返回 None
+    地址经过 ../ 等跳出 MEDIA_ROOT 或静态文件目录时同样视为没有本地文件
+    """
+    if not cover_image:
+        return None
+    try:
+        if cover_image.startswith(settings.MEDIA_URL):
+            path = safe_join(settings.MEDIA_ROOT, cover_image[len(settings.MEDIA_URL):])
+        elif cover_image.startswith(settings.STATIC_URL):
+            path = finders.find(cover_image[len(settings.STATIC_URL):])
+        else:
+            path = finders.find(cover_image.lstrip('/'))
+    except SuspiciousFileOperation:
+        return None
+    if path and os.path.isfile(path):
+        return path
+    return None
+
+
+def file_hash(path):
+    """计算文件内容哈希"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def _save_renditions(image, cover_hash):
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, THUMBNAIL_DIR), exist_ok=True)
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    for size, dimensions in THUMBNAIL_SIZES.items():
+        # 按目标比例居中裁剪后缩放，所有卡片尺寸一致
+        thumbnail = ImageOps.fit(image, dimensions, Image.LANCZOS)
+        for extension, (image_format, options) in THUMBNAIL_FORMATS.items():
+            target = os.path.join(settings.MEDIA_ROOT, thumbnail_name(cover_hash, size, extension))
+            temp = target + '.tmp'
+            thumbnail.save(temp, image_format, **options)
+            os.replace(temp, target)
+
+
+def generate_thumbnails(cover_image):
+    """
+    为封面生成全部规格的缩略图，返回内容哈希
+    同一内容的缩略图已存在时直接复用；封面缺失或不是有效图片时返回空字符串
+    """
+    path = resolve_cover_path(cover_image)
+    if path is None:
+        return ''
+    cover_hash = file_hash(path)
+    last = thumbnail_name(cover_hash, list(THUMBNAIL_SIZES)[-1], list(THUMBNAIL_FORMATS)[-1])
+    if os.path.exists(os.path.join(settings.MEDIA_ROOT, last)):
+        return cover_hash
+    try:
+        with Image.open(path) as image:
+            _save_renditions(image, cover_hash)
+    except (UnidentifiedImageError, OSError):
+        return ''
+    return cover_hash
+
+
+def save_upload(uploaded_file):
+    """保存上传的封面原图（文件名为内容哈希），返回可写入 cover_image 的地址"""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    extension = os.path.splitext(uploaded_file.name)[1].lower() or '.jpg'
+    name = f'{UPLOAD_DIR}/{digest.hexdigest()[:HASH_LENGTH]}{extension}'
+    target = os.path.join(settings.MEDIA_ROOT, name)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            for chunk in uploaded_file.chunks():
+                f.write(chunk)
+    return settings.MEDIA_URL + name
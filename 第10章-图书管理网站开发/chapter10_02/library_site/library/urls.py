@@ -5,6 +5,21 @@ app_name = 'library'
 urlpatterns = [
     path('', views.login_view, name='login'),
     path('home/', views.home_view, name='home'),
+    path('book/<int:pk>/', views.book_detail_view, name='book_detail'),
+    path('book/<int:pk>/copies/', views.book_copies_view, name='book_copies'),
+    path('book/<int:pk>/borrow/', views.borrow_view, name='borrow'),
+    path('book/<int:pk>/reserve/', views.reserve_view, name='reserve'),
+    path('loans/', views.loans_view, name='loans'),
+    path('loans/<int:pk>/return/', views.return_loan_view, name='return_loan'),
+    path('reservations/<int:pk>/cancel/', views.cancel_reservation_view, name='cancel_reservation'),
+    path('search/', views.search_view, name='search'),
+    path('shelf/', views.shelf_view, name='shelf'),
+    path('shelf/<int:pk>/add/', views.shelf_add_view, name='shelf_add'),
+    path('shelf/<int:pk>/remove/', views.shelf_remove_view, name='shelf_remove'),
+    path('autocomplete/', views.autocomplete_view, name='autocomplete'),
+    path('api/books/', views.api_books_view, name='api_books'),
+    path('export/', views.export_books_view, name='export_books'),
+    path('profiling/', views.profiling_view, name='profiling'),
     path('logout/', views.logout_view, name='logout'),
     path('add_book/', views.add_book_view, name='add_book'),
 ]
\ No newline at end of file
@@ -0,0 +1,16 @@
+from django.urls import path
+
+from . import async_views
+from .urls import app_name, urlpatterns as sync_urlpatterns  # noqa: F401
+
+# ASGI 部署使用的路由：列表、检索、详情换为异步视图，其余沿用同步视图
+ASYNC_VIEWS = {
+    'home': async_views.home_view,
+    'search': async_views.search_view,
+    'book_detail': async_views.book_detail_view,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name) if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
@@ -1,8 +1,75 @@
-from django.shortcuts import render, redirect
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.shortcuts import get_object_or_404, render, redirect
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
-from .models import Book
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Substr
+from .models import Book, Bookshelf, Loan, Reservation
 from .forms import BookForm
+from .pagination import cursor_value_type, decode_cursor, keyset_paginate
+from .search import search_book_ids
+from .autocomplete import get_index
+from .categories import get_categories
+from .caching import get_or_set, get_popularity_version, make_key
+from .exporting import EXPORT_FORMATS, export_lines
+from .profiling import stats as profile_stats
+from .recommendations import add_book as recommend_new_book, similar_books
+from .shelves import add_to_shelf, remove_from_shelf, shelved_book_ids
+from . import circulation
+
+# 首页每页展示的图书数量
+BOOKS_PER_PAGE = 12
+
+# 首页卡片简介截取的字符数（在数据库中截取，不加载完整简介）
+SUMMARY_LENGTH = 100
+
+# 图书卡片需要查询的列（分类名称随图书一起连接查询）
+CARD_FIELDS = ('id', 'title', 'author', 'category', 'category__name', 'cover_image', 'cover_hash', 'updated_at', 'shelf_count')
+
+# 首页排序选项：参数值 -> (排序字段, 显示名称)
+SORT_OPTIONS = {
+    'id': ('id', '默认'),
+    'title': ('title', '书名'),
+    'author': ('author', '作者'),
+    # 按分类 ID 排序（即分类的创建顺序），使用外键索引
+    'category': ('category_id', '分类'),
+    'popular': ('-shelf_count', '人气'),
+}
+
+# 检索结果每页展示的图书数量
+SEARCH_RESULTS_PER_PAGE = 20
+
+# 输入提示最多返回的建议数量
+AUTOCOMPLETE_LIMIT = 10
+
+# 图书 API 每页默认及最多返回的图书数量
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+# 图书 API 可选的字段：返回字段名 -> .values() 中的列（分类名称随图书一起连接查询）
+API_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'author': 'author',
+    'isbn': 'isbn',
+    'category': 'category__name',
+    'category_id': 'category_id',
+    'description': 'description',
+    'shelf_count': 'shelf_count',
+    'updated_at': 'updated_at',
+}
+
+# 未指定 fields 参数时返回的字段
+API_DEFAULT_FIELDS = ('id', 'title', 'author', 'category')
 
 # 硬编码的图书数据
 BOOKS_DATA = [
@@ -56,6 +123,12 @@ BOOKS_DATA = [
     },
 ]
 
+def _card_books():
+    """图书卡片的查询：只取卡片需要的列，简介只取前 SUMMARY_LENGTH 个字符"""
+    return Book.objects.select_related('category').only(*CARD_FIELDS).annotate(
+        summary=Substr('description', 1, SUMMARY_LENGTH + 1)
+    )
+
 def login_view(request):
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -76,13 +149,394 @@ def home_view(request):
     if not request.user.is_authenticated:
         return redirect('library:login')
     
+    return render(request, 'library/home.html', home_context(request))
+
+def home_context(request):
+    """首页的模板上下文（同步视图和异步视图共用）"""
     username = request.user.username
-    books = Book.objects.all()
+    sort = request.GET.get('sort', 'id')
+    if sort not in SORT_OPTIONS:
+        sort = 'id'
+    
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    
+    # 分类导航（含各分类图书数量）来自缓存的分类表，不统计图书表
+    categories = get_categories()
+    category = None
+    category_id = request.GET.get('category', '')
+    if category_id.isdigit():
+        category = next((item for item in categories if item.id == int(category_id)), None)
+    
+    def load_page():
+        books = _card_books()
+        if category is not None:
+            books = books.filter(category_id=category.id)
+        return keyset_paginate(books, SORT_OPTIONS[sort][0], BOOKS_PER_PAGE, after=after, before=before)
+    
+    # 分页数据按目录版本缓存，图书变化时版本号递增，旧缓存自然失效；人气排序还依赖书架人数的版本
+    popularity = get_popularity_version() if sort == 'popular' else None
+    page = get_or_set(make_key('home', sort, category and category.id, after, before, popularity), load_page)
     context = {
         'username': username,
-        'books': books
+        'books': page.items,
+        # 书架状态因用户而异，不放入缓存，整页一条查询
+        'shelved': shelved_book_ids(request.user, (book.id for book in page.items)),
+        'page': page,
+        'sort': sort,
+        'categories': categories,
+        'category': category,
+        'summary_length': SUMMARY_LENGTH,
+        'sort_options': [(key, label) for key, (_, label) in SORT_OPTIONS.items()],
+    }
+    return context
+
+def _book_version(request, pk):
+    """详情页的版本（图书和相似图书列表中较晚的更新时间），同一请求内只查询一次"""
+    versions = request.__dict__.setdefault('_book_versions', {})
+    if pk not in versions:
+        row = Book.objects.filter(pk=pk).values_list('updated_at', 'similar_updated_at').first()
+        versions[pk] = row and max(filter(None, row))
+    return versions[pk]
+
+def _book_etag(request, pk):
+    # 页面包含当前用户信息，ETag 同时区分图书版本和用户
+    updated_at = _book_version(request, pk)
+    if updated_at is None:
+        return None
+    return f'book-{pk}-{int(updated_at.timestamp() * 1000000)}-u{request.user.pk}'
+
+def _book_last_modified(request, pk):
+    return _book_version(request, pk)
+
+def get_detail_book(pk):
+    return get_object_or_404(Book.objects.select_related('category'), pk=pk)
+
+@condition(etag_func=_book_etag, last_modified_func=_book_last_modified)
+def _book_detail(request, pk):
+    book = get_detail_book(pk)
+    context = {
+        'book': book,
+        'similar_books': similar_books(book.pk),
+    }
+    return render(request, 'library/book_detail.html', context)
+
+# 浏览器每次都带上 ETag 验证，图书未修改时直接返回 304，不查询图书也不渲染模板
+@cache_control(private=True, max_age=0, must_revalidate=True)
+def book_detail_view(request, pk):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    return _book_detail(request, pk)
+
+def search_view(request):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    return render(request, 'library/search.html', search_context(request))
+
+def search_context(request):
+    """检索结果页的模板上下文（同步视图和异步视图共用）"""
+    query = request.GET.get('q', '').strip()
+    try:
+        page_number = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page_number = 1
+    
+    books = []
+    has_next = False
+    if query:
+        # 先在全文索引中按相关度取出一页 ID（多取一条判断是否有下一页），再按 ID 查询图书
+        offset = (page_number - 1) * SEARCH_RESULTS_PER_PAGE
+        book_ids = search_book_ids(query, SEARCH_RESULTS_PER_PAGE + 1, offset)
+        has_next = len(book_ids) > SEARCH_RESULTS_PER_PAGE
+        book_ids = book_ids[:SEARCH_RESULTS_PER_PAGE]
+        found = _card_books().in_bulk(book_ids)
+        books = [found[book_id] for book_id in book_ids if book_id in found]
+    
+    context = {
+        'query': query,
+        'books': books,
+        'shelved': shelved_book_ids(request.user, (book.id for book in books)),
+        'page_number': page_number,
+        'has_previous': page_number > 1,
+        'has_next': has_next,
+        'summary_length': SUMMARY_LENGTH,
+    }
+    return context
+
+def shelf_view(request):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    # 按加入时间从新到旧分页，图书随书架记录一起查询
+    entries = Bookshelf.objects.filter(user=request.user).select_related('book__category').only(
+        'id', *(f'book__{field}' for field in CARD_FIELDS)
+    ).annotate(summary=Substr('book__description', 1, SUMMARY_LENGTH + 1))
+    page = keyset_paginate(entries, '-id', BOOKS_PER_PAGE,
+                           after=request.GET.get('after'), before=request.GET.get('before'))
+    books = []
+    for entry in page.items:
+        entry.book.summary = entry.summary
+        books.append(entry.book)
+    
+    context = {
+        'books': books,
+        'shelved': {book.id for book in books},
+        'page': page,
+        'summary_length': SUMMARY_LENGTH,
     }
-    return render(request, 'library/home.html', context)
+    return render(request, 'library/shelf.html', context)
+
+def _redirect_back(request):
+    """返回提交前的页面"""
+    next_url = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()},
+                                       require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect('library:home')
+
+@require_POST
+def shelf_add_view(request, pk):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    try:
+        added = add_to_shelf(request.user, pk)
+    except Book.DoesNotExist:
+        raise Http404('图书不存在')
+    if added:
+        messages.success(request, '已加入书架。')
+    return _redirect_back(request)
+
+@require_POST
+def shelf_remove_view(request, pk):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    if remove_from_shelf(request.user, pk):
+        messages.success(request, '已移出书架。')
+    return _redirect_back(request)
+
+def book_copies_view(request, pk):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    # 借阅状态实时变化且因用户而异，不做缓存；详情页只放链接，不影响详情页的 ETag
+    book = get_object_or_404(Book.objects.only('id', 'title', 'author'), pk=pk)
+    available, total = circulation.availability(pk)
+    context = {
+        'book': book,
+        'available': available,
+        'total': total,
+        'loan': Loan.objects.filter(user=request.user, copy__book_id=pk, returned_at__isnull=True).first(),
+        'reservation': Reservation.objects.filter(
+            user=request.user, book_id=pk, status__in=Reservation.ACTIVE_STATUSES,
+        ).first(),
+        'waiting': Reservation.objects.filter(book_id=pk, status=Reservation.WAITING).count(),
+    }
+    return render(request, 'library/book_copies.html', context)
+
+@require_POST
+def borrow_view(request, pk):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    try:
+        loan = circulation.borrow(request.user, pk)
+    except Book.DoesNotExist:
+        raise Http404('图书不存在')
+    except circulation.CirculationError as e:
+        messages.error(request, str(e))
+        return redirect('library:book_copies', pk=pk)
+    messages.success(request, f'借阅成功，请于 {timezone.localtime(loan.due_at):%Y-%m-%d} 前归还。')
+    return redirect('library:loans')
+
+@require_POST
+def reserve_view(request, pk):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    try:
+        circulation.reserve(request.user, pk)
+    except Book.DoesNotExist:
+        raise Http404('图书不存在')
+    except circulation.CirculationError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, '预约成功，有副本归还时将为你保留。')
+    return redirect('library:book_copies', pk=pk)
+
+def loans_view(request):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    context = {
+        'loans': Loan.objects.filter(user=request.user, returned_at__isnull=True)
+                     .select_related('copy__book').order_by('due_at'),
+        'reservations': Reservation.objects.filter(user=request.user, status__in=Reservation.ACTIVE_STATUSES)
+                            .select_related('book').order_by('id'),
+        'now': timezone.now(),
+    }
+    return render(request, 'library/loans.html', context)
+
+@require_POST
+def return_loan_view(request, pk):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    try:
+        circulation.return_loan(request.user, pk)
+    except circulation.CirculationError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, '归还成功。')
+    return redirect('library:loans')
+
+@require_POST
+def cancel_reservation_view(request, pk):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    
+    try:
+        circulation.cancel_reservation(request.user, pk)
+    except circulation.CirculationError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, '预约已取消。')
+    return redirect('library:loans')
+
+def autocomplete_view(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': '请先登录'}, status=401)
+    
+    query = request.GET.get('q', '')
+    try:
+        limit = min(max(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    
+    suggestions = get_index().suggest(query, limit)
+    return JsonResponse({'query': query, 'suggestions': suggestions})
+
+def _api_books_payload(request, params):
+    """
+    图书 API 的响应内容和 ETag，同一请求内只计算一次
+    按目录版本缓存，命中缓存时不查询图书表；ETag 为响应内容的摘要
+    """
+    if '_api_books_payload' not in request.__dict__:
+        def load_page():
+            columns = {API_FIELDS[name] for name in params['fields']}
+            # 游标需要排序字段和 id
+            columns.update(['id', sort_field.lstrip('-')])
+            books = Book.objects.values(*columns)
+            if params['category'] is not None:
+                books = books.filter(category_id=params['category'])
+            if params['author']:
+                books = books.filter(author=params['author'])
+            page = keyset_paginate(books, sort_field, params['limit'], after=params['after'], before=params['before'])
+            body = json.dumps({
+                'results': [{name: row[API_FIELDS[name]] for name in params['fields']} for row in page.items],
+                'next_cursor': page.next_cursor,
+                'prev_cursor': page.prev_cursor,
+            }, cls=DjangoJSONEncoder, ensure_ascii=False)
+            return body, hashlib.md5(body.encode('utf-8')).hexdigest()
+        
+        sort_field = SORT_OPTIONS[params['sort']][0]
+        # 返回或按书架人数排序时，缓存键还包含人气版本号，书架增删不影响其他请求的缓存
+        depends_on_shelves = 'shelf_count' in params['fields'] or params['sort'] == 'popular'
+        popularity = get_popularity_version() if depends_on_shelves else None
+        key = make_key('api_books', *(params[name] for name in sorted(params)), popularity)
+        request._api_books_payload = get_or_set(key, load_page)
+    return request._api_books_payload
+
+def _api_books_etag(request, params):
+    return _api_books_payload(request, params)[1]
+
+@condition(etag_func=_api_books_etag)
+def _api_books(request, params):
+    body, _ = _api_books_payload(request, params)
+    return HttpResponse(body, content_type='application/json')
+
+@cache_control(private=True, max_age=0, must_revalidate=True)
+def api_books_view(request):
+    """
+    只读图书列表 API：按 sort 排序的游标分页（after/before），
+    fields 指定返回字段（逗号分隔），可按 category（分类ID）、author（作者全名）筛选
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': '请先登录'}, status=401)
+    
+    fields = tuple(name for name in request.GET.get('fields', '').split(',') if name) or API_DEFAULT_FIELDS
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown:
+        return JsonResponse({'error': f'不支持的字段: {", ".join(unknown)}'}, status=400)
+    sort = request.GET.get('sort', 'id')
+    if sort not in SORT_OPTIONS:
+        return JsonResponse({'error': f'不支持的排序: {sort}'}, status=400)
+    category = request.GET.get('category', '')
+    if category and not category.isdigit():
+        return JsonResponse({'error': '分类参数应为分类ID'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = API_PAGE_SIZE
+    # 游标须是当前排序字段生成的，格式或类型不符时返回错误，而不是静默回到第一页
+    value_type = cursor_value_type(Book, SORT_OPTIONS[sort][0].lstrip('-'))
+    for name in ('after', 'before'):
+        cursor = request.GET.get(name)
+        if cursor and decode_cursor(cursor, value_type) is None:
+            return JsonResponse({'error': f'无效的游标: {name}'}, status=400)
+    
+    params = {
+        'fields': tuple(dict.fromkeys(fields)),
+        'sort': sort,
+        'category': int(category) if category else None,
+        'author': request.GET.get('author', '').strip(),
+        'limit': limit,
+        'after': request.GET.get('after'),
+        'before': request.GET.get('before'),
+    }
+    return _api_books(request, params)
+
+def export_books_view(request):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    if not request.user.is_staff:
+        return HttpResponseForbidden('只有管理员可以导出图书目录')
+    
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        file_format = 'csv'
+    content_type, extension = EXPORT_FORMATS[file_format]
+    
+    # 边读数据库边输出，不在内存中拼接完整文件
+    response = StreamingHttpResponse(export_lines(file_format), content_type=content_type)
+    filename = f'books-{timezone.localdate():%Y%m%d}.{extension}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def profiling_view(request):
+    if not request.user.is_authenticated:
+        return redirect('library:login')
+    if not request.user.is_staff:
+        return HttpResponseForbidden('只有管理员可以查看性能统计')
+    
+    if request.method == 'POST':
+        profile_stats.reset()
+        messages.success(request, '性能统计已清空。')
+        return redirect('library:profiling')
+    
+    views, slow_requests = profile_stats.summary()
+    for row in views:
+        row['budget'] = settings.LIBRARY_QUERY_BUDGETS.get(row['view'])
+    context = {
+        'enabled': settings.LIBRARY_PROFILING,
+        'views': views,
+        'slow_requests': slow_requests,
+        'slow_request_ms': settings.LIBRARY_SLOW_REQUEST_MS,
+    }
+    return render(request, 'library/profiling.html', context)
 
 def logout_view(request):
     logout(request)
@@ -93,13 +547,19 @@ def add_book_view(request):
         return redirect('library:login')
     
     if request.method == 'POST':
-        form = BookForm(request.POST)
+        form = BookForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
-            messages.success(request, '书籍添加成功！')
-            return redirect('library:home')
-        else:
-            messages.error(request, '请检查输入的信息。')
+            try:
+                with transaction.atomic():
+                    book = form.save()
+            except IntegrityError:
+                # 查重是先查询后写入，并发提交相同 ISBN 时由唯一约束拦下
+                form.add_duplicate_error()
+            else:
+                recommend_new_book(book)
+                messages.success(request, '书籍添加成功！')
+                return redirect('library:home')
+        messages.error(request, '请检查输入的信息。')
     else:
         form = BookForm()
     
@@ -11,6 +11,7 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_site.settings')
+# ASGI 部署默认使用异步视图的配置（见 settings_asgi.py）
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_site.settings_asgi')
 
 application = get_asgi_application()
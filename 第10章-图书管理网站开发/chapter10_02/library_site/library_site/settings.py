@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 请求性能统计，LIBRARY_PROFILING 为 False 时不启用
+    'library.profiling.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +66,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'library.context_processors.catalogue',
             ],
         },
     },
@@ -78,10 +82,88 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # 测试使用文件数据库：内存数据库在多线程并发写入时直接报表级锁错误，借阅并发测试需要与正式环境一致的锁行为
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# 新建 SQLite 连接时执行的 PRAGMA（名称 -> 值），开发环境使用 SQLite 默认值，生产配置见 settings_production.py
+LIBRARY_SQLITE_PRAGMAS = {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# 进程内缓存；多进程部署时应改用文件、Memcached 等共享缓存，失效才能在进程间生效
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'library',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
 
+# 会话先读缓存、未命中再读数据库，写入时同时写缓存和数据库；已登录用户的请求通常不查询会话表
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# 按会话加载用户时先读缓存，用户保存、删除时清除（见 library.backends）
+AUTHENTICATION_BACKENDS = ['library.backends.CachedModelBackend']
+
+
+# 请求性能统计（设置环境变量 LIBRARY_PROFILING=1 启用）
+# 管理员可在 /profiling/ 查看各视图的 SQL 数量与耗时
+
+LIBRARY_PROFILING = os.environ.get('LIBRARY_PROFILING') == '1'
+
+# 超过该耗时（毫秒）的请求写入日志
+LIBRARY_SLOW_REQUEST_MS = 500
+
+# 各视图允许执行的 SQL 数量（含会话和用户查询），超出时写入日志
+LIBRARY_QUERY_BUDGETS = {
+    'library:login': 10,
+    'library:home': 5,
+    'library:book_detail': 5,
+    'library:search': 5,
+    'library:shelf': 4,
+    'library:shelf_add': 6,
+    'library:shelf_remove': 6,
+    'library:book_copies': 7,
+    'library:borrow': 11,
+    'library:reserve': 8,
+    'library:loans': 4,
+    'library:return_loan': 8,
+    'library:cancel_reservation': 8,
+    'library:autocomplete': 3,
+    'library:api_books': 3,
+    # 保存放在 atomic 中，嵌套在外层事务里时多出 SAVEPOINT/RELEASE 两条
+    'library:add_book': 10,
+}
+
+# 为 True 时超出预算直接抛出异常（测试中使用）
+LIBRARY_QUERY_BUDGET_STRICT = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'library.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -120,6 +202,17 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# collectstatic 收集静态文件的目录（生产环境由 WhiteNoise 从这里提供）
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# 上传的封面和生成的缩略图
+MEDIA_URL = '/media/'
+
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# 相似图书推荐的模型文件（compute_similar_books 命令生成）
+LIBRARY_RECOMMENDER_PATH = BASE_DIR / 'recommender.npz'
+
 # Custom user model
 AUTH_USER_MODEL = 'library.User'
 
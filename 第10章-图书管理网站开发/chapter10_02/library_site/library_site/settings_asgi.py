@@ -0,0 +1,14 @@
+"""
+ASGI 部署配置：在生产配置的基础上，列表、检索、详情使用异步视图（library/async_views.py）
+
+使用方法：
+    DJANGO_SETTINGS_MODULE=library_site.settings_asgi uvicorn library_site.asgi:application
+"""
+
+from .settings_production import *  # noqa: F401,F403
+
+ROOT_URLCONF = 'library_site.urls_asgi'
+
+# WhiteNoise 中间件只支持同步调用，在 ASGI 下会让整个请求退回单线程的同步执行，因此不使用；
+# collectstatic 生成的带哈希文件由前端 Web 服务器从 STATIC_ROOT 提供，并设置长期缓存
+MIDDLEWARE = [name for name in MIDDLEWARE if name != 'whitenoise.middleware.WhiteNoiseMiddleware']
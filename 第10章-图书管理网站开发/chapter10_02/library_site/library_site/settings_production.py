@@ -0,0 +1,71 @@
+"""
+生产环境配置：在开发配置的基础上关闭调试，启用持久连接和 SQLite 调优
+
+使用方法：
+    DJANGO_SETTINGS_MODULE=library_site.settings_production python manage.py runserver
+或：
+    python manage.py benchmark --mode wsgi --settings=library_site.settings_production
+"""
+
+import copy
+import os
+
+from .settings import *  # noqa: F401,F403
+
+# 关闭调试：不再在内存中记录每条 SQL（connection.queries），出错时不显示调试页面
+DEBUG = False
+
+# 部署时必须通过环境变量设置密钥和域名
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+# 持久连接：同一线程的请求复用数据库连接（秒），连接创建时的 PRAGMA 只执行一次
+# 先复制一份，避免修改到开发配置模块中的同一个字典
+DATABASES = copy.deepcopy(DATABASES)
+DATABASES['default']['CONN_MAX_AGE'] = 600
+
+# 多个工作进程共用缓存：开发配置的 LocMemCache 只在本进程有效，修改密码、停用账号后清除用户缓存、
+# 图书变化后递增目录版本号都只影响当前进程，其他进程会继续使用旧的用户（最多 5 分钟）和旧的页面缓存
+# 设置 LIBRARY_MEMCACHED（如 127.0.0.1:11211，需安装 pymemcache）时使用 Memcached，
+# 否则使用文件缓存（同一台机器上的工作进程共用 LIBRARY_CACHE_DIR 目录）
+if os.environ.get('LIBRARY_MEMCACHED'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.environ['LIBRARY_MEMCACHED'].split(','),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('LIBRARY_CACHE_DIR', str(BASE_DIR / 'cache')),
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+
+# 静态文件由 WhiteNoise 直接提供（放在 SecurityMiddleware 之后、其他中间件之前）
+MIDDLEWARE = MIDDLEWARE.copy()
+MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+
+# collectstatic 生成带内容哈希的文件名（如 library.3f2a1b.css）和 .gz 压缩文件（安装 Brotli 时另生成 .br），
+# 模板中的 {% static %} 输出带哈希的地址；内容不变地址不变，WhiteNoise 对带哈希的文件返回一年的 immutable 缓存头
+STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# 新建 SQLite 连接时执行的 PRAGMA（由 library.signals.configure_sqlite 执行）
+LIBRARY_SQLITE_PRAGMAS = {
+    # WAL 模式下读不阻塞写、写不阻塞读，并发读写时不再频繁出现 database is locked
+    'journal_mode': 'WAL',
+    # WAL 模式下 NORMAL 只在检查点时同步磁盘，断电可能丢失最近的事务但不会损坏数据库
+    'synchronous': 'NORMAL',
+    # 写锁被占用时最多等待的毫秒数
+    'busy_timeout': 5000,
+    # 每个连接的页缓存（负数表示 KiB，即 64MB）
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+    # 用内存映射读取数据库文件（256MB）
+    'mmap_size': 268435456,
+}
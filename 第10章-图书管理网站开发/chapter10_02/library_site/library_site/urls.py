@@ -13,6 +13,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
@@ -20,3 +22,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('library.urls')),
 ]
+
+# 开发环境下由 Django 提供上传文件和缩略图，生产环境应由 Web 服务器提供
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
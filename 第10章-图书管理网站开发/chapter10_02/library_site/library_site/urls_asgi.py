@@ -0,0 +1,12 @@
+"""ASGI 部署（settings_asgi.py）使用的根路由，图书应用换用 library.urls_async"""
+from django.conf import settings
+from django.conf.urls.static import static
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('', include('library.urls_async')),
+]
+
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -6,8 +6,10 @@
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from data_storage import DataStorage
+from data_storage import create_storage
 from crawler import ContentCrawler
+from trending import TrendingEngine
+from pipeline import CrawlPipeline
 import threading
 import time
 
@@ -15,8 +17,28 @@ app = Flask(__name__)
 CORS(app)  # 允许跨域请求
 
 # 初始化存储和爬虫
-storage = DataStorage()
-crawler = ContentCrawler()
+storage = create_storage()
+crawler = ContentCrawler(storage)
+
+# 趋势引擎：从已有数据恢复，之后每轮采集（含重复内容）增量更新
+trending = TrendingEngine()
+crawler.add_observer(trending.observe)
+
+
+def warm_up_trending():
+    """后台从已有数据恢复趋势榜单，不阻塞服务启动"""
+    try:
+        trending.observe_many(storage.read_all())
+    except Exception as e:
+        print(f"恢复趋势数据失败: {e}")
+
+
+threading.Thread(target=warm_up_trending, daemon=True).start()
+# 去重用的已有内容哈希同样在后台加载，首次采集如果先于加载完成会等待加载结束
+threading.Thread(target=crawler.ensure_hashes_loaded, daemon=True).start()
+
+# 最近一次采集流水线，用于查询采集进度
+last_pipeline = None
 
 
 @app.route('/api/data', methods=['GET'])
@@ -151,25 +173,16 @@ def crawl_data():
     - platform: 指定平台（可选）
     """
     try:
+        global last_pipeline
         data = request.get_json() or {}
         platform = data.get('platform')
         
-        # 在后台线程执行爬取任务
-        def crawl_task():
-            if platform == '微博':
-                results = crawler.crawl_weibo_hot()
-            elif platform == '知乎':
-                results = crawler.crawl_zhihu_hot()
-            elif platform == '抖音':
-                results = crawler.crawl_douyin_hot()
-            else:
-                results = crawler.crawl_all_platforms()
-            
-            # 保存采集结果
-            if results:
-                storage.create_batch(results)
+        # 在后台线程执行采集流水线，内容产出后即写入存储
+        pipeline = CrawlPipeline(crawler, storage)
+        platforms = [platform] if platform in pipeline.handlers else None
+        last_pipeline = pipeline
         
-        thread = threading.Thread(target=crawl_task)
+        thread = threading.Thread(target=pipeline.run, args=(platforms,))
         thread.start()
         
         return jsonify({
@@ -183,6 +196,20 @@ def crawl_data():
         }), 500
 
 
+@app.route('/api/crawl/status', methods=['GET'])
+def crawl_status():
+    """获取最近一次采集流水线的进度及各阶段吞吐量"""
+    if last_pipeline is None:
+        return jsonify({
+            'success': True,
+            'data': None
+        })
+    return jsonify({
+        'success': True,
+        'data': last_pipeline.stats()
+    })
+
+
 @app.route('/api/statistics', methods=['GET'])
 def get_statistics():
     """获取数据统计信息"""
@@ -217,6 +244,31 @@ def get_platforms():
         }), 500
 
 
+@app.route('/api/trending', methods=['GET'])
+def get_trending():
+    """
+    获取趋势榜单（按时间衰减热度排序）
+    支持查询参数：
+    - platform: 平台筛选（可选）
+    - limit: 返回条数，默认20
+    """
+    try:
+        platform = request.args.get('platform')
+        limit = request.args.get('limit', 20, type=int)
+        data = trending.get_trending(limit=limit, platform=platform)
+        
+        return jsonify({
+            'success': True,
+            'data': data,
+            'count': len(data)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
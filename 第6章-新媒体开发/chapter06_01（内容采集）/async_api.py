@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+新媒体营销与热榜系统 - 异步API接口模块（ASGI）
+接口与api.py保持一致，基于Quart运行在ASGI服务器上：
+- 数据采集使用httpx异步客户端，不占用工作线程
+- 存储读写与JSON序列化放到线程池执行，不阻塞事件循环
+
+启动方式：
+    hypercorn async_api:app --bind 0.0.0.0:5000
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from quart import Quart, Response, request
+from quart.utils import run_sync
+from quart_cors import cors
+
+from data_storage import create_storage
+from async_crawler import AsyncContentCrawler
+from trending import TrendingEngine
+
+app = Quart(__name__)
+app = cors(app, allow_origin='*')  # 允许跨域请求
+
+# 初始化存储和爬虫
+storage = create_storage()
+crawler = AsyncContentCrawler(storage)
+
+# 趋势引擎：从已有数据恢复，之后每轮采集（含重复内容）增量更新
+trending = TrendingEngine()
+crawler.add_observer(trending.observe)
+
+
+def warm_up_trending():
+    """后台从已有数据恢复趋势榜单，不阻塞服务启动"""
+    try:
+        trending.observe_many(storage.read_all())
+    except Exception as e:
+        print(f"恢复趋势数据失败: {e}")
+
+
+threading.Thread(target=warm_up_trending, daemon=True).start()
+# 去重用的已有内容哈希同样在后台加载，首次采集如果先于加载完成会等待加载结束
+threading.Thread(target=crawler.ensure_hashes_loaded, daemon=True).start()
+
+# JSON存储不是线程安全的，写操作串行执行（锁在服务启动后创建，绑定到服务器的事件循环）
+storage_lock = None
+
+# 最近一次采集的进度，用于查询采集状态
+last_crawl = None
+
+
+@app.before_serving
+async def create_storage_lock():
+    global storage_lock
+    storage_lock = asyncio.Lock()
+
+
+class CrawlProgress:
+    """一次异步采集的进度：各平台完成后立即保存，并记录采集和保存的数量"""
+
+    def __init__(self, platforms):
+        self.platforms = {
+            platform: {'platform': platform, 'collected': 0, 'stored': 0, 'finished': False}
+            for platform in platforms
+        }
+        self.stored = 0
+        self.started_at = time.time()
+        self.finished_at = None
+
+    def platform_done(self, platform: str, collected: int, stored: int):
+        self.platforms[platform].update(collected=collected, stored=stored, finished=True)
+        self.stored += stored
+
+    def stats(self):
+        """采集整体及各平台统计信息"""
+        end = self.finished_at or time.time()
+        return {
+            'running': self.finished_at is None,
+            'stored': self.stored,
+            'elapsed_seconds': round(end - self.started_at, 3),
+            'platforms': list(self.platforms.values()),
+        }
+
+
+def _dumps(payload) -> str:
+    return json.dumps(payload, ensure_ascii=False)
+
+
+async def json_response(payload, status: int = 200) -> Response:
+    """在线程池中序列化响应体，避免大数据量序列化阻塞事件循环"""
+    body = await run_sync(_dumps)(payload)
+    return Response(body, status=status, mimetype='application/json')
+
+
+async def error_response(e: Exception) -> Response:
+    return await json_response({
+        'success': False,
+        'error': str(e)
+    }, 500)
+
+
+@app.route('/api/data', methods=['GET'])
+async def get_data():
+    """
+    获取所有数据
+    支持查询参数：
+    - platform: 平台筛选
+    - keyword: 关键词搜索
+    """
+    try:
+        platform = request.args.get('platform')
+        keyword = request.args.get('keyword')
+
+        if platform:
+            data = await run_sync(storage.read_by_platform)(platform)
+        elif keyword:
+            data = await run_sync(storage.search_by_keyword)(keyword)
+        else:
+            data = await run_sync(storage.read_all)()
+
+        return await json_response({
+            'success': True,
+            'data': data,
+            'count': len(data)
+        })
+    except Exception as e:
+        return await error_response(e)
+
+
+@app.route('/api/data/<item_id>', methods=['GET'])
+async def get_data_by_id(item_id):
+    """根据ID获取单条数据"""
+    try:
+        data = await run_sync(storage.read_by_id)(item_id)
+        if data:
+            return await json_response({
+                'success': True,
+                'data': data
+            })
+        else:
+            return await json_response({
+                'success': False,
+                'error': '数据不存在'
+            }, 404)
+    except Exception as e:
+        return await error_response(e)
+
+
+@app.route('/api/data', methods=['POST'])
+async def create_data():
+    """添加新数据"""
+    try:
+        data = await request.get_json()
+        async with storage_lock:
+            success = await run_sync(storage.create)(data)
+
+        if success:
+            return await json_response({
+                'success': True,
+                'message': '数据添加成功'
+            })
+        else:
+            return await json_response({
+                'success': False,
+                'error': '数据添加失败'
+            }, 500)
+    except Exception as e:
+        return await error_response(e)
+
+
+@app.route('/api/data/<item_id>', methods=['PUT'])
+async def update_data(item_id):
+    """更新数据"""
+    try:
+        data = await request.get_json()
+        async with storage_lock:
+            success = await run_sync(storage.update)(item_id, data)
+
+        if success:
+            return await json_response({
+                'success': True,
+                'message': '数据更新成功'
+            })
+        else:
+            return await json_response({
+                'success': False,
+                'error': '数据不存在或更新失败'
+            }, 404)
+    except Exception as e:
+        return await error_response(e)
+
+
+@app.route('/api/data/<item_id>', methods=['DELETE'])
+async def delete_data(item_id):
+    """删除数据"""
+    try:
+        async with storage_lock:
+            success = await run_sync(storage.delete)(item_id)
+
+        if success:
+            return await json_response({
+                'success': True,
+                'message': '数据删除成功'
+            })
+        else:
+            return await json_response({
+                'success': False,
+                'error': '数据不存在或删除失败'
+            }, 404)
+    except Exception as e:
+        return await error_response(e)
+
+
+@app.route('/api/crawl', methods=['POST'])
+async def crawl_data():
+    """
+    触发数据采集
+    支持参数：
+    - platform: 指定平台（可选）
+    """
+    try:
+        global last_crawl
+        data = await request.get_json(silent=True) or {}
+        platform = data.get('platform')
+
+        handlers = crawler.get_async_platform_handlers()
+        platforms = [platform] if platform in handlers else list(handlers)
+        progress = CrawlProgress(platforms)
+        last_crawl = progress
+
+        # 采集任务作为后台协程运行，请求立即返回；每个平台采集完成后即写入存储
+        async def crawl_task():
+            try:
+                async for name, results in crawler.crawl_platforms_async(platforms):
+                    stored = 0
+                    if results:
+                        async with storage_lock:
+                            stored = await run_sync(storage.create_batch)(results)
+                    progress.platform_done(name, len(results), stored)
+                print(f"采集完成，共存储 {progress.stored} 条新内容（已去重）")
+            finally:
+                progress.finished_at = time.time()
+
+        app.add_background_task(crawl_task)
+
+        return await json_response({
+            'success': True,
+            'message': '数据采集任务已启动'
+        })
+    except Exception as e:
+        return await error_response(e)
+
+
+@app.route('/api/crawl/status', methods=['GET'])
+async def crawl_status():
+    """获取最近一次采集的进度及各平台的采集、保存数量"""
+    return await json_response({
+        'success': True,
+        'data': last_crawl.stats() if last_crawl is not None else None
+    })
+
+
+@app.route('/api/statistics', methods=['GET'])
+async def get_statistics():
+    """获取数据统计信息"""
+    try:
+        stats = await run_sync(storage.get_statistics)()
+        return await json_response({
+            'success': True,
+            'data': stats
+        })
+    except Exception as e:
+        return await error_response(e)
+
+
+@app.route('/api/platforms', methods=['GET'])
+async def get_platforms():
+    """获取所有平台列表"""
+    try:
+        def collect_platforms():
+            return list(set([item.get('platform', '未知') for item in storage.read_all()]))
+
+        platforms = await run_sync(collect_platforms)()
+
+        return await json_response({
+            'success': True,
+            'data': platforms
+        })
+    except Exception as e:
+        return await error_response(e)
+
+
+@app.route('/api/trending', methods=['GET'])
+async def get_trending():
+    """
+    获取趋势榜单（按时间衰减热度排序）
+    支持查询参数：
+    - platform: 平台筛选（可选）
+    - limit: 返回条数，默认20
+    """
+    try:
+        platform = request.args.get('platform')
+        limit = request.args.get('limit', 20, type=int)
+        data = trending.get_trending(limit=limit, platform=platform)
+
+        return await json_response({
+            'success': True,
+            'data': data,
+            'count': len(data)
+        })
+    except Exception as e:
+        return await error_response(e)
+
+
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    """健康检查接口"""
+    return await json_response({
+        'success': True,
+        'message': 'API服务正常运行',
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("新媒体营销与热榜系统 异步API 服务启动")
+    print("API地址: http://localhost:5000")
+    print("=" * 50)
+    app.run(host='0.0.0.0', port=5000)
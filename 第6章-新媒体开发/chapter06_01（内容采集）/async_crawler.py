@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+新媒体营销与热榜系统 - 异步数据采集模块
+基于httpx异步客户端采集各平台热榜，解析与去重逻辑复用ContentCrawler
+（解析、趋势观察者和去重是同步代码，在线程池中执行，不阻塞事件循环）
+"""
+
+import asyncio
+import random
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from crawler import ContentCrawler, WEIBO_HOT_URL, ZHIHU_HOT_URL
+
+
+class AsyncContentCrawler(ContentCrawler):
+    """异步多平台内容爬虫类"""
+
+    def __init__(self, storage=None, timeout: float = 10.0):
+        super().__init__(storage)
+        self.timeout = timeout
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str,
+                     referer: Optional[str] = None) -> Optional[httpx.Response]:
+        """
+        异步请求页面，等待期间不阻塞事件循环
+        :param client: httpx异步客户端
+        :param url: 请求地址
+        :param referer: Referer请求头（可选）
+        :return: 响应对象，状态码非200时返回None
+        """
+        headers = self.get_random_headers()
+        if referer:
+            headers['Referer'] = referer
+
+        # 反爬策略：添加延时（异步等待，不占用线程）
+        await asyncio.sleep(random.uniform(1, 3))
+
+        response = await client.get(url, headers=headers)
+        if response.status_code != 200:
+            print(f"请求失败 {url}: HTTP {response.status_code}")
+            return None
+        return response
+
+    async def _run_in_thread(self, func: Callable, *args):
+        """
+        在线程池中执行同步代码：HTML解析、趋势观察者和去重（首次去重时还要等待已有哈希加载完成）
+        都可能耗时较长，直接在事件循环中执行会阻塞所有正在处理的请求
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    async def crawl_weibo_hot_async(self, client: httpx.AsyncClient) -> List[Dict]:
+        """异步爬取微博热搜"""
+        try:
+            response = await self._fetch(client, WEIBO_HOT_URL)
+            if response is not None:
+                response.encoding = 'utf-8'
+                return await self._run_in_thread(self.parse_weibo_hot, response.text)
+        except Exception as e:
+            print(f"爬取微博热搜失败: {e}")
+        return []
+
+    async def crawl_zhihu_hot_async(self, client: httpx.AsyncClient) -> List[Dict]:
+        """异步爬取知乎热榜"""
+        try:
+            response = await self._fetch(client, ZHIHU_HOT_URL, referer='https://www.zhihu.com/')
+            if response is not None:
+                return await self._run_in_thread(self.parse_zhihu_hot, response.json())
+        except Exception as e:
+            print(f"爬取知乎热榜失败: {e}")
+        return []
+
+    async def crawl_douyin_hot_async(self, client: httpx.AsyncClient) -> List[Dict]:
+        """异步爬取抖音热榜（模板与同步版本一致，使用模拟数据）"""
+        return await self._run_in_thread(self.crawl_douyin_hot)
+
+    def get_async_platform_handlers(self) -> Dict[str, Callable]:
+        """平台名称 -> 异步采集函数"""
+        return {
+            '微博': self.crawl_weibo_hot_async,
+            '知乎': self.crawl_zhihu_hot_async,
+            '抖音': self.crawl_douyin_hot_async,
+        }
+
+    async def crawl_platforms_async(self, platforms: Optional[List[str]] = None) -> AsyncIterator[Tuple[str, List[Dict]]]:
+        """
+        并发采集多个平台，按完成先后逐个产出 (平台名称, 新内容列表)，调用方可以边采集边保存
+        :param platforms: 平台名称列表，为空表示全部
+        """
+        handlers = self.get_async_platform_handlers()
+        platforms = [platform for platform in (platforms or handlers) if platform in handlers]
+
+        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
+            async def crawl(platform):
+                return platform, await handlers[platform](client)
+
+            # 各平台请求并发进行，先完成的平台先返回，不必等待最慢的平台
+            for finished in asyncio.as_completed([crawl(platform) for platform in platforms]):
+                yield await finished
+
+    async def crawl_platform_async(self, platform: Optional[str] = None) -> List[Dict]:
+        """
+        异步采集指定平台，未指定时并发采集所有平台
+        :param platform: 平台名称（微博/知乎/抖音），为空表示全部
+        :return: 新内容列表（已去重）
+        """
+        platforms = [platform] if platform in self.get_async_platform_handlers() else None
+        all_results = []
+        async for _, results in self.crawl_platforms_async(platforms):
+            all_results.extend(results)
+        print(f"采集完成，共获取 {len(all_results)} 条新内容（已去重）")
+        return all_results
+
+
+if __name__ == "__main__":
+    crawler = AsyncContentCrawler()
+    results = asyncio.run(crawler.crawl_platform_async())
+    print(f"采集到 {len(results)} 条数据")
@@ -9,14 +9,25 @@ from bs4 import BeautifulSoup
 import json
 import time
 import hashlib
+import threading
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Callable
 import random
 
+# 各平台热榜地址
+WEIBO_HOT_URL = "https://s.weibo.com/top/summary"
+ZHIHU_HOT_URL = "https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total"
+
+
 class ContentCrawler:
     """多平台内容爬虫类"""
     
-    def __init__(self):
+    def __init__(self, storage=None):
+        """
+        :param storage: 存储实例（可选），提供时从存储中加载已有内容哈希
+        """
+        self.storage = storage
+        
         # 反爬策略：设置User-Agent池
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -25,9 +36,15 @@ class ContentCrawler:
             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         ]
         
-        # 已采集内容的哈希集合，用于去重
+        # 已采集内容的哈希集合，用于去重；已有内容的哈希在首次去重时才加载，创建爬虫不扫描存储
         self.content_hashes = set()
-        self.load_existing_hashes()
+        self._hashes_loaded = False
+        self._hashes_lock = threading.Lock()
+        # 异步采集时各平台的解析和去重在线程池中并发执行，判断重复与记入哈希须一起完成
+        self._accept_lock = threading.Lock()
+        
+        # 采集观察者：每条解析出的内容（包括重复内容）都会通知，用于热度趋势计算
+        self.observers = []
     
     def get_random_headers(self) -> Dict:
         """获取随机请求头（反爬策略）"""
@@ -40,8 +57,21 @@ class ContentCrawler:
             'Upgrade-Insecure-Requests': '1'
         }
     
+    def ensure_hashes_loaded(self):
+        """首次去重前加载已有内容哈希（只加载一次，可以在后台线程中提前调用）"""
+        if self._hashes_loaded:
+            return
+        with self._hashes_lock:
+            if not self._hashes_loaded:
+                self.load_existing_hashes()
+                self._hashes_loaded = True
+    
     def load_existing_hashes(self):
         """加载已存在的内容哈希用于去重"""
+        if self.storage is not None:
+            self.content_hashes.update(self.storage.get_content_hashes())
+            return
+        
         try:
             with open('data.json', 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -58,139 +88,236 @@ class ContentCrawler:
     
     def is_duplicate(self, content_hash: str) -> bool:
         """检查内容是否重复"""
+        self.ensure_hashes_loaded()
         return content_hash in self.content_hashes
     
-    def crawl_weibo_hot(self) -> List[Dict]:
+    def add_observer(self, callback):
         """
-        爬取微博热搜（示例模板）
-        注意：实际使用需要根据目标网站的robots.txt和服务条款调整
+        注册采集观察者
+        :param callback: 回调函数，参数为单条内容字典
+        """
+        self.observers.append(callback)
+    
+    def notify_observers(self, content_data: Dict):
+        """通知观察者本次采集到的内容（去重之前调用，保证每轮排名都被记录）"""
+        for callback in self.observers:
+            try:
+                callback(content_data)
+            except Exception as e:
+                print(f"采集观察者处理失败: {e}")
+    
+    def accept(self, content_data: Dict) -> bool:
+        """
+        去重检查：通知观察者后判断内容是否为新内容，新内容记入哈希集合
+        :param content_data: 清洗后的内容字典
+        :return: 是否为新内容
+        """
+        self.notify_observers(content_data)
+        
+        with self._accept_lock:
+            if self.is_duplicate(content_data['content_hash']):
+                return False
+            self.content_hashes.add(content_data['content_hash'])
+        return True
+    
+    def deduplicate(self, items: List[Dict]) -> List[Dict]:
+        """批量去重，返回新内容列表"""
+        return [item for item in items if self.accept(item)]
+    
+    # ---------- 微博 ----------
+    
+    def fetch_weibo_hot(self) -> Optional[str]:
+        """请求微博热搜页面，返回HTML"""
+        headers = self.get_random_headers()
+        
+        # 反爬策略：添加延时
+        time.sleep(random.uniform(1, 3))
+        
+        response = requests.get(WEIBO_HOT_URL, headers=headers, timeout=10)
+        response.encoding = 'utf-8'
+        
+        if response.status_code == 200:
+            return response.text
+        return None
+    
+    def extract_weibo_hot(self, html: str) -> List[Dict]:
+        """
+        解析微博热搜页面，提取原始条目
+        :param html: 热搜页面HTML
+        :return: 原始条目列表（title、link、rank）
+        """
+        entries = []
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # 示例：解析热搜列表（需根据实际HTML结构调整）
+        hot_items = soup.find_all('td', class_='td-02')[:20]
+        
+        for idx, item in enumerate(hot_items):
+            try:
+                entries.append({
+                    'title': item.find('a').text.strip(),
+                    'link': item.find('a')['href'],
+                    'rank': idx + 1
+                })
+            except Exception as e:
+                print(f"解析单条数据出错: {e}")
+                continue
+        
+        return entries
+    
+    def clean_weibo_item(self, entry: Dict) -> Dict:
+        """数据清洗：提取微博热搜关键信息"""
+        link = entry['link']
+        return {
+            'platform': '微博',
+            'title': entry['title'],
+            'link': f"https://s.weibo.com{link}" if link.startswith('/') else link,
+            'rank': entry['rank'],
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'category': '热搜',
+            'content_hash': self.generate_content_hash(entry['title'], '')
+        }
+    
+    def parse_weibo_hot(self, html: str) -> List[Dict]:
+        """
+        解析微博热搜页面，完成数据清洗与去重
+        :param html: 热搜页面HTML
+        :return: 新内容列表
+        """
+        return self.deduplicate([self.clean_weibo_item(entry) for entry in self.extract_weibo_hot(html)])
+    
+    # ---------- 知乎 ----------
+    
+    def fetch_zhihu_hot(self) -> Optional[Dict]:
+        """请求知乎热榜接口，返回JSON"""
+        headers = self.get_random_headers()
+        headers['Referer'] = 'https://www.zhihu.com/'
+        
+        # 反爬策略：添加延时
+        time.sleep(random.uniform(1, 3))
+        
+        response = requests.get(ZHIHU_HOT_URL, headers=headers, timeout=10)
+        
+        if response.status_code == 200:
+            return response.json()
+        return None
+    
+    def extract_zhihu_hot(self, data: Dict) -> List[Dict]:
         """
+        解析知乎热榜接口返回的JSON，提取原始条目
+        :param data: 接口返回的JSON数据
+        :return: 原始条目列表（title、excerpt、id、rank、detail_text）
+        """
+        entries = []
+        for idx, item in enumerate(data.get('data', [])[:20]):
+            try:
+                target = item.get('target', {})
+                entries.append({
+                    'title': target.get('title', ''),
+                    'excerpt': target.get('excerpt', ''),
+                    'id': target.get('id', ''),
+                    'rank': idx + 1,
+                    'detail_text': item.get('detail_text', '')
+                })
+            except Exception as e:
+                print(f"解析单条数据出错: {e}")
+                continue
+        
+        return entries
+    
+    def clean_zhihu_item(self, entry: Dict) -> Dict:
+        """数据清洗：提取知乎热榜关键信息"""
+        return {
+            'platform': '知乎',
+            'title': entry['title'],
+            'excerpt': entry['excerpt'][:100],  # 数据清洗：截取摘要
+            'link': f"https://www.zhihu.com/question/{entry['id']}",
+            'rank': entry['rank'],
+            'hot_score': entry['detail_text'],
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'category': '热榜',
+            'content_hash': self.generate_content_hash(entry['title'], entry['excerpt'])
+        }
+    
+    def parse_zhihu_hot(self, data: Dict) -> List[Dict]:
+        """
+        解析知乎热榜接口返回的JSON，完成数据清洗与去重
+        :param data: 接口返回的JSON数据
+        :return: 新内容列表
+        """
+        return self.deduplicate([self.clean_zhihu_item(entry) for entry in self.extract_zhihu_hot(data)])
+    
+    # ---------- 抖音 ----------
+    
+    def fetch_douyin_hot(self) -> List[Dict]:
+        """
+        获取抖音热榜（示例模板）
+        注意：抖音有较强的反爬机制，实际使用可能需要更复杂的策略
+        """
+        # 这里提供模板，实际需要分析抖音的API接口
+        print("抖音热榜采集需要配置具体API接口")
+        
+        # 示例模拟数据
+        return [{'title': f'抖音热门话题 #{i+1}', 'rank': i + 1} for i in range(5)]
+    
+    def extract_douyin_hot(self, data: List[Dict]) -> List[Dict]:
+        """模拟数据已是条目列表，直接返回"""
+        return data
+    
+    def clean_douyin_item(self, entry: Dict) -> Dict:
+        """数据清洗：提取抖音热榜关键信息"""
+        return {
+            'platform': '抖音',
+            'title': entry['title'],
+            'link': f"https://www.douyin.com/hot/{entry['rank']}",
+            'rank': entry['rank'],
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'category': '热榜',
+            'content_hash': self.generate_content_hash(entry['title'], '')
+        }
+    
+    def get_platform_handlers(self) -> Dict[str, Tuple[Callable, Callable, Callable]]:
+        """各平台的 (请求, 解析, 清洗) 处理函数，供流水线按阶段调用"""
+        return {
+            '微博': (self.fetch_weibo_hot, self.extract_weibo_hot, self.clean_weibo_item),
+            '知乎': (self.fetch_zhihu_hot, self.extract_zhihu_hot, self.clean_zhihu_item),
+            '抖音': (self.fetch_douyin_hot, self.extract_douyin_hot, self.clean_douyin_item),
+        }
+    
+    def crawl_platform(self, platform: str) -> List[Dict]:
+        """
+        依次完成请求、解析、清洗、去重，返回指定平台的新内容
+        :param platform: 平台名称
+        """
+        fetch, extract, clean = self.get_platform_handlers()[platform]
         results = []
         try:
-            url = "https://s.weibo.com/top/summary"
-            headers = self.get_random_headers()
-            
-            # 反爬策略：添加延时
-            time.sleep(random.uniform(1, 3))
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.encoding = 'utf-8'
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 示例：解析热搜列表（需根据实际HTML结构调整）
-                hot_items = soup.find_all('td', class_='td-02')[:20]
-                
-                for idx, item in enumerate(hot_items):
-                    try:
-                        title = item.find('a').text.strip()
-                        link = item.find('a')['href']
-                        
-                        # 数据清洗：提取关键信息
-                        content_data = {
-                            'platform': '微博',
-                            'title': title,
-                            'link': f"https://s.weibo.com{link}" if link.startswith('/') else link,
-                            'rank': idx + 1,
-                            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                            'category': '热搜',
-                            'content_hash': self.generate_content_hash(title, '')
-                        }
-                        
-                        # 去重检查
-                        if not self.is_duplicate(content_data['content_hash']):
-                            results.append(content_data)
-                            self.content_hashes.add(content_data['content_hash'])
-                    except Exception as e:
-                        print(f"解析单条数据出错: {e}")
-                        continue
-                        
+            raw = fetch()
+            if raw is not None:
+                results = self.deduplicate([clean(entry) for entry in extract(raw)])
         except Exception as e:
-            print(f"爬取微博热搜失败: {e}")
+            print(f"爬取{platform}热榜失败: {e}")
         
         return results
     
+    def crawl_weibo_hot(self) -> List[Dict]:
+        """
+        爬取微博热搜（示例模板）
+        注意：实际使用需要根据目标网站的robots.txt和服务条款调整
+        """
+        return self.crawl_platform('微博')
+    
     def crawl_zhihu_hot(self) -> List[Dict]:
         """
         爬取知乎热榜（示例模板）
         """
-        results = []
-        try:
-            url = "https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total"
-            headers = self.get_random_headers()
-            headers['Referer'] = 'https://www.zhihu.com/'
-            
-            # 反爬策略：添加延时
-            time.sleep(random.uniform(1, 3))
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                for idx, item in enumerate(data.get('data', [])[:20]):
-                    try:
-                        target = item.get('target', {})
-                        title = target.get('title', '')
-                        excerpt = target.get('excerpt', '')
-                        
-                        content_data = {
-                            'platform': '知乎',
-                            'title': title,
-                            'excerpt': excerpt[:100],  # 数据清洗：截取摘要
-                            'link': f"https://www.zhihu.com/question/{target.get('id', '')}",
-                            'rank': idx + 1,
-                            'hot_score': item.get('detail_text', ''),
-                            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                            'category': '热榜',
-                            'content_hash': self.generate_content_hash(title, excerpt)
-                        }
-                        
-                        # 去重检查
-                        if not self.is_duplicate(content_data['content_hash']):
-                            results.append(content_data)
-                            self.content_hashes.add(content_data['content_hash'])
-                    except Exception as e:
-                        print(f"解析单条数据出错: {e}")
-                        continue
-                        
-        except Exception as e:
-            print(f"爬取知乎热榜失败: {e}")
-        
-        return results
+        return self.crawl_platform('知乎')
     
     def crawl_douyin_hot(self) -> List[Dict]:
         """
         爬取抖音热榜（示例模板）
-        注意：抖音有较强的反爬机制，实际使用可能需要更复杂的策略
         """
-        results = []
-        # 模拟数据示例（实际需要根据API或页面结构实现）
-        try:
-            # 这里提供模板，实际需要分析抖音的API接口
-            print("抖音热榜采集需要配置具体API接口")
-            
-            # 示例模拟数据
-            for i in range(5):
-                content_data = {
-                    'platform': '抖音',
-                    'title': f'抖音热门话题 #{i+1}',
-                    'link': f'https://www.douyin.com/hot/{i+1}',
-                    'rank': i + 1,
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'category': '热榜',
-                    'content_hash': self.generate_content_hash(f'抖音热门话题 #{i+1}', '')
-                }
-                
-                if not self.is_duplicate(content_data['content_hash']):
-                    results.append(content_data)
-                    self.content_hashes.add(content_data['content_hash'])
-                    
-        except Exception as e:
-            print(f"爬取抖音热榜失败: {e}")
-        
-        return results
+        return self.crawl_platform('抖音')
     
     def crawl_all_platforms(self) -> List[Dict]:
         """
@@ -6,7 +6,7 @@
 
 import json
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 from datetime import datetime
 
 
@@ -231,12 +231,36 @@ class DataStorage:
         
         return stats
     
+    def get_content_hashes(self) -> Set[str]:
+        """获取所有已存储内容的哈希，用于采集去重"""
+        return {item['content_hash'] for item in self.data if 'content_hash' in item}
+    
     def _generate_id(self) -> str:
         """生成唯一ID"""
         import uuid
         return str(uuid.uuid4())
 
 
+def create_storage():
+    """
+    根据环境变量创建存储实例
+    - STORAGE_BACKEND=json（默认）：JSON文件存储，仅适合单进程运行
+    - STORAGE_BACKEND=jsonl：JSON Lines延迟加载存储，启动时只做内存映射
+    - STORAGE_BACKEND=sqlite：SQLite共享存储，支持多个工作进程同时读写
+    - STORAGE_PATH：数据文件路径（可选）
+    """
+    backend = os.environ.get('STORAGE_BACKEND', 'json').lower()
+    path = os.environ.get('STORAGE_PATH')
+    
+    if backend == 'sqlite':
+        from sqlite_storage import SQLiteStorage
+        return SQLiteStorage(path or 'data.db')
+    if backend == 'jsonl':
+        from lazy_storage import LazyDataStorage
+        return LazyDataStorage(path or 'data.jsonl')
+    return DataStorage(path or 'data.json')
+
+
 # 使用示例
 if __name__ == "__main__":
     # 初始化存储
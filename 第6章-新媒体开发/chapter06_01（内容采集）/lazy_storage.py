@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+新媒体营销与热榜系统 - 延迟加载存储模块
+数据以JSON Lines格式（每行一条记录）保存，启动时只做内存映射，不解析文件：
+- 首次访问时扫描换行符建立行偏移索引
+- 记录在被访问时才解码，只有访问过的记录占用堆内存
+- 保存时未访问过的记录直接复制原始字节；只有新增记录时追加写入文件末尾
+
+用法：
+    python lazy_storage.py convert data.json data.jsonl   # 转换已有数据
+    STORAGE_BACKEND=jsonl python api.py                   # 使用延迟加载存储
+"""
+
+import json
+import mmap
+import os
+import re
+import sys
+import threading
+import weakref
+from array import array
+from collections.abc import MutableSequence
+from typing import Dict, List, Iterator, Set
+
+from data_storage import DataStorage
+
+_HASH_PATTERN = re.compile(rb'"content_hash":\s*"([^"\\]*)"')
+
+
+class _MappedFile:
+    """
+    数据文件的内存映射，所有读取都在锁内切片
+    Windows 不允许替换仍被映射的文件，写文件前先关闭映射、写完后重新映射，锁保证这期间没有线程读取
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.mm = None
+        self.open()
+
+    def open(self):
+        self.mm = None
+        if os.path.exists(self.filename) and os.path.getsize(self.filename) > 0:
+            # 映射持有自己的文件句柄，打开后即可关闭文件
+            with open(self.filename, 'rb') as f:
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+
+class _Mapping:
+    """
+    数据文件的行偏移索引和已解码记录
+    整体重写后换用新的索引对象，正在遍历旧索引的线程继续使用旧对象：
+    重写时旧索引的偏移改为指向新文件中的同一条记录，已被删除的记录保留原始字节
+    """
+
+    def __init__(self, file: _MappedFile, starts=None, ends=None):
+        self.file = file
+        # 每条记录在文件中的起止偏移，首次访问时建立
+        self.starts = starts
+        self.ends = ends
+        # 已解码或已修改的记录：行号 -> 字典
+        self.cache: Dict[int, Dict] = {}
+        # 重写时已从文件中删除的记录：行号 -> 原始字节
+        self.removed: Dict[int, bytes] = {}
+
+    def ensure_index(self):
+        """扫描换行符建立行偏移索引（跳过空行），调用方须持有列表的锁"""
+        if self.starts is not None:
+            return
+        starts = array('Q')
+        ends = array('Q')
+        if self.file.mm is not None:
+            mm = self.file.mm
+            size = len(mm)
+            position = 0
+            while position < size:
+                end = mm.find(b'\n', position)
+                if end == -1:
+                    end = size
+                if mm[position:end].strip():
+                    starts.append(position)
+                    ends.append(end)
+                position = end + 1
+        self.starts, self.ends = starts, ends
+
+    def raw(self, line: int) -> bytes:
+        with self.file.lock:
+            removed = self.removed.get(line)
+            if removed is not None:
+                return removed
+            return self.file.mm[self.starts[line]:self.ends[line]].strip()
+
+    def decode(self, line: int, cache: bool = True) -> Dict:
+        item = self.cache.get(line)
+        if item is None:
+            item = json.loads(self.raw(line))
+            if cache:
+                self.cache[line] = item
+        return item
+
+    def relocated(self, moved: Dict[int, tuple]):
+        """
+        文件重写前调用（持有文件锁）：按 原起始偏移 -> 新起止偏移 计算指向新文件的索引，
+        不在新文件中的记录保留原始字节；返回 (starts, ends, removed)，替换文件成功后再换上
+        """
+        starts = array('Q', self.starts)
+        ends = array('Q', self.ends)
+        removed = dict(self.removed)
+        mm = self.file.mm
+        for line in range(len(starts)):
+            if line in removed:
+                continue
+            target = moved.get(starts[line])
+            if target is None:
+                removed[line] = mm[starts[line]:ends[line]].strip()
+            else:
+                starts[line], ends[line] = target
+        return starts, ends, removed
+
+
+class LazyRecordList(MutableSequence):
+    """
+    基于内存映射的延迟解码记录列表
+    Web 请求、后台采集和趋势预热会在不同线程中同时读写：修改列表和写文件都在锁内进行，
+    读取时在锁内取得当前索引和记录顺序的快照，解码在锁外进行，写入换用新索引不影响正在进行的读取
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._lock = threading.RLock()
+        self._file = _MappedFile(filename)
+        self._mapping = _Mapping(self._file)
+        # 仍被读取线程引用的索引，重写文件时一并更新偏移
+        self._mappings = weakref.WeakSet([self._mapping])
+        # 插入/删除后改为显式顺序表，元素为行号(int)或新记录(dict)
+        self._order = None
+        # 追加的新记录（尚未写入文件）
+        self._tail: List[Dict] = []
+        # 是否有修改或删除（需要整体重写文件）
+        self.dirty = False
+
+    def close(self):
+        """关闭内存映射（之后不能再读取文件中的记录）"""
+        with self._lock, self._file.lock:
+            self._file.close()
+
+    def _file_count(self) -> int:
+        self._mapping.ensure_index()
+        return len(self._mapping.starts)
+
+    def _materialize(self):
+        """切换为显式顺序表，以支持在任意位置插入和删除"""
+        if self._order is None:
+            self._order = list(range(self._file_count())) + self._tail
+            self._tail = []
+        self.dirty = True
+
+    def _resolve(self, index: int):
+        """返回 (行号, None) 或 (None, 新记录)，调用方须持有锁"""
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('list index out of range')
+
+        if self._order is not None:
+            slot = self._order[index]
+            return (slot, None) if isinstance(slot, int) else (None, slot)
+
+        count = self._file_count()
+        if index < count:
+            return index, None
+        return None, self._tail[index - count]
+
+    def _slots(self) -> List:
+        """当前顺序的快照：元素为行号或新记录，调用方须持有锁"""
+        if self._order is not None:
+            return list(self._order)
+        return list(range(self._file_count())) + self._tail
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._order is not None:
+                return len(self._order)
+            return self._file_count() + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            with self._lock:
+                mapping = self._mapping
+                slots = self._slots()[index]
+            return [mapping.decode(slot) if isinstance(slot, int) else slot for slot in slots]
+        with self._lock:
+            mapping = self._mapping
+            line, item = self._resolve(index)
+        return mapping.decode(line) if item is None else item
+
+    def __setitem__(self, index, value):
+        with self._lock:
+            if isinstance(index, slice):
+                self._materialize()
+                self._order[index] = value
+                return
+            if index < 0:
+                index += len(self)
+            line, _ = self._resolve(index)
+            if line is not None:
+                self._mapping.cache[line] = value
+                self.dirty = True
+            elif self._order is not None:
+                self._order[index] = value
+            else:
+                self._tail[index - self._file_count()] = value
+
+    def __delitem__(self, index):
+        with self._lock:
+            self._materialize()
+            del self._order[index]
+
+    def insert(self, index, value):
+        with self._lock:
+            if self._order is None and index >= len(self):
+                self._tail.append(value)
+                return
+            self._materialize()
+            self._order.insert(index, value)
+
+    def __iter__(self) -> Iterator[Dict]:
+        """顺序遍历，未访问过的记录解码后不放入缓存，遍历全部数据不会常驻内存"""
+        with self._lock:
+            mapping = self._mapping
+            slots = self._slots()
+        for slot in slots:
+            yield mapping.decode(slot, cache=False) if isinstance(slot, int) else slot
+
+    def scan_content_hashes(self) -> Set[str]:
+        """直接在原始字节上提取内容哈希，无需解码记录"""
+        with self._lock:
+            if self.dirty:
+                return {item['content_hash'] for item in self if 'content_hash' in item}
+            tail = list(self._tail)
+
+        hashes = set()
+        with self._file.lock:
+            if self._file.mm is not None:
+                hashes.update(match.group(1).decode('utf-8') for match in _HASH_PATTERN.finditer(self._file.mm))
+        hashes.update(item['content_hash'] for item in tail if 'content_hash' in item)
+        return hashes
+
+    def append_tail_to_file(self):
+        """仅有新增记录时，把新记录追加到文件末尾并扩展索引（已有记录的偏移和行号不变）"""
+        with self._lock:
+            mapping = self._mapping
+            count = self._file_count()
+            with self._file.lock:
+                # 原文件末尾缺少换行符时先补齐，避免新记录接在最后一行后面
+                needs_newline = self._file.mm is not None and self._file.mm[-1:] != b'\n'
+                self._file.close()
+                try:
+                    with open(self.filename, 'ab') as f:
+                        if needs_newline:
+                            f.write(b'\n')
+                        position = f.tell()
+                        for offset, item in enumerate(self._tail):
+                            line = json.dumps(item, ensure_ascii=False).encode('utf-8')
+                            f.write(line + b'\n')
+                            mapping.starts.append(position)
+                            mapping.ends.append(position + len(line))
+                            mapping.cache[count + offset] = item
+                            position += len(line) + 1
+                finally:
+                    self._file.open()
+            self._tail = []
+
+    def rewrite(self):
+        """写入临时文件后整体替换数据文件，换用新文件的索引"""
+        with self._lock:
+            mapping = self._mapping
+            temp_name = self.filename + '.tmp'
+            starts = array('Q')
+            ends = array('Q')
+            # 文件中原有记录的新位置：原起始偏移 -> (新起始偏移, 新结束偏移)
+            moved = {}
+            with open(temp_name, 'wb') as f:
+                position = 0
+                for slot in self._slots():
+                    if isinstance(slot, int) and slot not in mapping.cache:
+                        # 未解码的记录直接复制原始字节
+                        line = mapping.raw(slot)
+                    else:
+                        item = mapping.cache[slot] if isinstance(slot, int) else slot
+                        line = json.dumps(item, ensure_ascii=False).encode('utf-8')
+                    f.write(line + b'\n')
+                    starts.append(position)
+                    ends.append(position + len(line))
+                    if isinstance(slot, int):
+                        moved[mapping.starts[slot]] = (position, position + len(line))
+                    position += len(line) + 1
+            with self._file.lock:
+                relocated = [(old, old.relocated(moved)) for old in list(self._mappings) if old.starts is not None]
+                self._file.close()
+                try:
+                    os.replace(temp_name, self.filename)
+                finally:
+                    self._file.open()
+                for old, index in relocated:
+                    old.starts, old.ends, old.removed = index
+            self._mapping = _Mapping(self._file, starts, ends)
+            self._mappings.add(self._mapping)
+            self._order = None
+            self._tail = []
+            self.dirty = False
+
+    def flush(self):
+        """保存修改：仅新增时追加写入，有修改或删除时整体重写"""
+        with self._lock:
+            if self.dirty:
+                self.rewrite()
+            elif self._tail:
+                self.append_tail_to_file()
+
+
+class LazyDataStorage(DataStorage):
+    """JSON Lines延迟加载存储管理类"""
+
+    def __init__(self, filename: str = "data.jsonl"):
+        super().__init__(filename)
+
+    def load_data(self):
+        """内存映射数据文件，不解析内容，耗时与文件大小无关"""
+        try:
+            self.data = LazyRecordList(self.filename)
+            print(f"已映射数据文件 {self.filename}（延迟加载）")
+        except Exception as e:
+            print(f"加载数据失败: {e}")
+            self.data = []
+
+    def save_data(self):
+        """保存数据：仅新增时追加写入，否则写入临时文件后整体替换"""
+        try:
+            if isinstance(self.data, LazyRecordList):
+                self.data.flush()
+            else:
+                temp_name = self.filename + '.tmp'
+                with open(temp_name, 'wb') as f:
+                    for item in self.data:
+                        f.write(json.dumps(item, ensure_ascii=False).encode('utf-8') + b'\n')
+                os.replace(temp_name, self.filename)
+                self.data = LazyRecordList(self.filename)
+            print(f"成功保存 {len(self.data)} 条数据")
+            return True
+        except Exception as e:
+            print(f"保存数据失败: {e}")
+            return False
+
+    def read_all(self) -> List[Dict]:
+        """
+        查：读取所有数据
+        :return: 数据列表
+        """
+        return list(self.data)
+
+    def get_content_hashes(self) -> Set[str]:
+        """获取所有已存储内容的哈希，用于采集去重"""
+        if isinstance(self.data, LazyRecordList):
+            return self.data.scan_content_hashes()
+        return super().get_content_hashes()
+
+
+def convert_to_jsonl(source: str, target: str) -> int:
+    """
+    将JSON数组格式的数据文件转换为JSON Lines格式
+    :param source: 原JSON文件
+    :param target: 目标JSONL文件
+    :return: 转换的记录数
+    """
+    with open(source, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with open(target, 'w', encoding='utf-8') as f:
+        for item in data:
+            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+    return len(data)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == 'convert':
+        count = convert_to_jsonl(sys.argv[2], sys.argv[3])
+        print(f"已转换 {count} 条数据: {sys.argv[2]} -> {sys.argv[3]}")
+    else:
+        print("用法: python lazy_storage.py convert data.json data.jsonl")
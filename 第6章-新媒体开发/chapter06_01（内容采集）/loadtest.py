@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+新媒体营销与热榜系统 - API压测脚本
+模拟大量看板并发连接，对比线程版(api.py)与异步版(async_api.py)的吞吐量与延迟
+
+用法示例：
+    # 终端1：线程版
+    python api.py
+    # 终端2：异步版
+    hypercorn async_api:app --bind 0.0.0.0:5001
+    # 终端3：对比压测
+    python loadtest.py http://localhost:5000 http://localhost:5001 -c 1000 -n 20000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数（values需已排序）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_load(base_url: str, path: str, connections: int, total: int,
+                   timeout: float) -> Dict:
+    """
+    对单个服务执行压测
+    :param base_url: 服务地址，如 http://localhost:5000
+    :param path: 请求路径
+    :param connections: 并发连接数
+    :param total: 请求总数
+    :param timeout: 单个请求超时时间（秒）
+    :return: 压测结果字典
+    """
+    latencies = []
+    errors = 0
+    remaining = total
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except Exception:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(connections)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'url': base_url + path,
+        'connections': connections,
+        'requests': total,
+        'succeeded': len(latencies),
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p95': round(percentile(latencies, 95) * 1000, 2),
+            'p99': round(percentile(latencies, 99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else 0,
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='热榜API并发压测')
+    parser.add_argument('urls', nargs='+', help='待压测的服务地址，可传入多个进行对比')
+    parser.add_argument('-p', '--path', default='/api/data', help='请求路径（默认 /api/data）')
+    parser.add_argument('-c', '--connections', type=int, default=200, help='并发连接数')
+    parser.add_argument('-n', '--requests', type=int, default=5000, help='每个服务的请求总数')
+    parser.add_argument('-t', '--timeout', type=float, default=30.0, help='请求超时时间（秒）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    results = []
+    for url in args.urls:
+        print(f"压测 {url}{args.path} ：{args.connections} 并发，{args.requests} 请求 ...")
+        results.append(asyncio.run(
+            run_load(url.rstrip('/'), args.path, args.connections, args.requests, args.timeout)
+        ))
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    print("=" * 78)
+    print(f"{'服务':<32}{'RPS':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'失败':>6}")
+    for result in results:
+        latency = result['latency_ms']
+        print(f"{result['url']:<32}{result['requests_per_second']:>10}"
+              f"{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}{result['errors']:>6}")
+    print("=" * 78)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+新媒体营销与热榜系统 - 流式采集流水线
+把采集拆分为 请求 → 解析 → 清洗 → 去重 → 存储 五个阶段：
+- 每个阶段运行在独立线程中，阶段之间通过有界队列连接（背压）
+- 内容一经产出即写入存储，不必等待所有平台采集完成
+- 每个阶段记录输入/输出/错误数量与处理速度
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+# 队列结束标记
+_DONE = object()
+
+
+class Stage:
+    """流水线阶段：从输入队列取数据，处理后把结果放入输出队列"""
+
+    def __init__(self, name: str, handler: Callable, workers: int = 1, buffer_size: int = 100):
+        """
+        :param name: 阶段名称
+        :param handler: 处理函数，接收一个输入，返回可迭代的输出（可以为空）
+        :param workers: 工作线程数
+        :param buffer_size: 输入队列容量，队列满时上游阻塞等待
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.input = queue.Queue(maxsize=buffer_size)
+        self.output: Optional[queue.Queue] = None
+
+        self.received = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._running_workers = 0
+
+    def start(self):
+        self.started_at = time.time()
+        self._running_workers = self.workers
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _emit(self, item):
+        if self.output is not None:
+            self.output.put(item)
+
+    def _run(self):
+        while True:
+            item = self.input.get()
+            if item is _DONE:
+                # 把结束标记留给同阶段的其他线程，最后一个线程负责通知下游
+                self.input.put(_DONE)
+                break
+
+            started = time.perf_counter()
+            try:
+                results = self.handler(item) or ()
+                count = 0
+                for result in results:
+                    self._emit(result)
+                    count += 1
+                with self._lock:
+                    self.received += 1
+                    self.emitted += count
+            except Exception as e:
+                print(f"流水线阶段 {self.name} 处理失败: {e}")
+                with self._lock:
+                    self.received += 1
+                    self.errors += 1
+            finally:
+                with self._lock:
+                    self.busy_seconds += time.perf_counter() - started
+
+        with self._lock:
+            self._running_workers -= 1
+            last = self._running_workers == 0
+        if last:
+            self.finished_at = time.time()
+            self._emit(_DONE)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self) -> Dict:
+        """阶段统计信息"""
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0
+        return {
+            'stage': self.name,
+            'received': self.received,
+            'emitted': self.emitted,
+            'errors': self.errors,
+            'queued': 0 if self.finished_at else self.input.qsize(),
+            'busy_seconds': round(self.busy_seconds, 3),
+            'items_per_second': round(self.emitted / elapsed, 2) if elapsed else 0,
+            'running': self.started_at is not None and self.finished_at is None,
+        }
+
+
+class CrawlPipeline:
+    """采集流水线：请求 → 解析 → 清洗 → 去重 → 存储"""
+
+    def __init__(self, crawler, storage, buffer_size: int = 100, store_batch_size: int = 20):
+        """
+        :param crawler: ContentCrawler 实例
+        :param storage: 存储实例
+        :param buffer_size: 阶段间队列容量
+        :param store_batch_size: 存储阶段每次写入的最大条数
+        """
+        self.crawler = crawler
+        self.storage = storage
+        self.store_batch_size = store_batch_size
+        self.handlers = crawler.get_platform_handlers()
+
+        self.stages = [
+            # 各平台请求互不依赖，并发执行
+            Stage('fetch', self._fetch, workers=len(self.handlers), buffer_size=buffer_size),
+            Stage('parse', self._parse, buffer_size=buffer_size),
+            Stage('clean', self._clean, buffer_size=buffer_size),
+            # 去重与存储各用单线程，保证哈希集合与存储写入的顺序一致
+            Stage('dedup', self._dedup, buffer_size=buffer_size),
+            Stage('store', self._store, buffer_size=buffer_size),
+        ]
+        for upstream, downstream in zip(self.stages, self.stages[1:]):
+            upstream.output = downstream.input
+
+        self.stored = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def _fetch(self, platform: str) -> Iterable:
+        fetch, _, _ = self.handlers[platform]
+        print(f"开始采集{platform}热榜...")
+        raw = fetch()
+        return [] if raw is None else [(platform, raw)]
+
+    def _parse(self, fetched) -> Iterable:
+        platform, raw = fetched
+        _, extract, _ = self.handlers[platform]
+        return ((platform, entry) for entry in extract(raw))
+
+    def _clean(self, parsed) -> Iterable:
+        platform, entry = parsed
+        _, _, clean = self.handlers[platform]
+        return [clean(entry)]
+
+    def _dedup(self, item: Dict) -> Iterable:
+        return [item] if self.crawler.accept(item) else []
+
+    def _store(self, item: Dict) -> Iterable:
+        # 把队列中已经就绪的内容合并为一批写入，减少存储整体保存的次数
+        batch = [item]
+        store_input = self.stages[-1].input
+        while len(batch) < self.store_batch_size:
+            try:
+                next_item = store_input.get_nowait()
+            except queue.Empty:
+                break
+            if next_item is _DONE:
+                store_input.put(_DONE)
+                break
+            batch.append(next_item)
+
+        stage = self.stages[-1]
+        # 合并进来的条目计入本阶段的输入数量（触发本次调用的一条由 Stage 计入），写入失败也照样计入
+        with stage._lock:
+            stage.received += len(batch) - 1
+
+        # INSERT OR IGNORE 可能跳过批次中间的任意条目，只能拿到成功数量，
+        # 存储是最后一个阶段，没有下游，直接把成功数量记为本阶段的输出
+        saved = self.storage.create_batch(batch)
+        self.stored += saved
+        with stage._lock:
+            stage.emitted += saved
+        return ()
+
+    def run(self, platforms: Optional[List[str]] = None) -> int:
+        """
+        执行采集并等待完成
+        :param platforms: 需要采集的平台列表，为空表示所有平台
+        :return: 存储的新内容数量
+        """
+        platforms = platforms or list(self.handlers)
+        self.started_at = time.time()
+        for stage in self.stages:
+            stage.start()
+
+        for platform in platforms:
+            self.stages[0].input.put(platform)
+        self.stages[0].input.put(_DONE)
+
+        for stage in self.stages:
+            stage.join()
+        self.finished_at = time.time()
+
+        print(f"采集完成，共存储 {self.stored} 条新内容（已去重）")
+        return self.stored
+
+    def stats(self) -> Dict:
+        """流水线整体及各阶段统计信息"""
+        end = self.finished_at or time.time()
+        return {
+            'running': self.started_at is not None and self.finished_at is None,
+            'stored': self.stored,
+            'elapsed_seconds': round(end - self.started_at, 3) if self.started_at else 0,
+            'stages': [stage.stats() for stage in self.stages],
+        }
+
+
+if __name__ == "__main__":
+    from crawler import ContentCrawler
+    from data_storage import create_storage
+
+    storage = create_storage()
+    pipeline = CrawlPipeline(ContentCrawler(storage), storage)
+    pipeline.run()
+    for stage_stats in pipeline.stats()['stages']:
+        print(stage_stats)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+新媒体营销与热榜系统 - SQLite共享存储模块
+接口与DataStorage一致，数据保存在WAL模式的SQLite数据库中，
+多个API工作进程可以同时读写同一份数据：
+- 读操作互不阻塞，可随进程数横向扩展
+- 写操作由SQLite文件锁串行化，不会互相覆盖
+- 内容哈希建立唯一索引，跨进程采集也能去重
+"""
+
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import List, Dict, Optional, Set
+
+
+class SQLiteStorage:
+    """SQLite数据存储管理类（多进程安全）"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS items (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            platform TEXT,
+            category TEXT,
+            title TEXT,
+            excerpt TEXT,
+            content_hash TEXT UNIQUE,
+            timestamp TEXT,
+            created_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_items_platform ON items(platform);
+    """
+
+    def __init__(self, filename: str = "data.db", busy_timeout: int = 10000):
+        """
+        :param filename: 数据库文件路径
+        :param busy_timeout: 写锁等待超时时间（毫秒）
+        """
+        self.filename = filename
+        self.busy_timeout = busy_timeout
+        # 每个线程使用独立连接，sqlite3连接不能跨线程共享
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+        print(f"使用SQLite共享存储: {self.filename}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.filename, timeout=self.busy_timeout / 1000)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+            self._local.conn = conn
+        return conn
+
+    def _prepare(self, item: Dict) -> Dict:
+        """补全ID和创建时间"""
+        if 'id' not in item:
+            item['id'] = str(uuid.uuid4())
+        if 'created_at' not in item:
+            item['created_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return item
+
+    def _row_values(self, item: Dict) -> tuple:
+        return (
+            item['id'],
+            item.get('platform'),
+            item.get('category'),
+            item.get('title'),
+            item.get('excerpt'),
+            item.get('content_hash'),
+            item.get('timestamp'),
+            item.get('created_at'),
+            json.dumps(item, ensure_ascii=False),
+        )
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        rows = self._connect().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def create(self, item: Dict) -> bool:
+        """
+        增：添加新数据
+        :param item: 要添加的数据字典
+        :return: 是否成功
+        """
+        try:
+            item = self._prepare(item)
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT INTO items (id, platform, category, title, excerpt, content_hash, '
+                    'timestamp, created_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    self._row_values(item)
+                )
+            print(f"成功添加数据，ID: {item['id']}")
+            return True
+        except Exception as e:
+            print(f"添加数据失败: {e}")
+            return False
+
+    def create_batch(self, items: List[Dict]) -> int:
+        """
+        批量添加数据（单个事务写入，已存在的内容哈希自动跳过）
+        :param items: 数据列表
+        :return: 成功添加的数量
+        """
+        success_count = 0
+        try:
+            with self._connect() as conn:
+                for item in items:
+                    cursor = conn.execute(
+                        'INSERT OR IGNORE INTO items (id, platform, category, title, excerpt, '
+                        'content_hash, timestamp, created_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        self._row_values(self._prepare(item))
+                    )
+                    success_count += cursor.rowcount
+        except Exception as e:
+            print(f"批量添加数据失败: {e}")
+            success_count = 0
+        print(f"批量添加完成，成功 {success_count}/{len(items)} 条")
+        return success_count
+
+    def read_all(self) -> List[Dict]:
+        """
+        查：读取所有数据
+        :return: 数据列表
+        """
+        return self._query('SELECT data FROM items ORDER BY seq')
+
+    def read_by_id(self, item_id: str) -> Optional[Dict]:
+        """
+        查：根据ID读取单条数据
+        :param item_id: 数据ID
+        :return: 数据字典或None
+        """
+        results = self._query('SELECT data FROM items WHERE id = ?', (item_id,))
+        return results[0] if results else None
+
+    def read_by_platform(self, platform: str) -> List[Dict]:
+        """
+        查：根据平台筛选数据
+        :param platform: 平台名称
+        :return: 符合条件的数据列表
+        """
+        return self._query('SELECT data FROM items WHERE platform = ? ORDER BY seq', (platform,))
+
+    def search_by_keyword(self, keyword: str) -> List[Dict]:
+        """
+        查：根据关键词搜索数据
+        :param keyword: 搜索关键词
+        :return: 包含关键词的数据列表
+        """
+        keyword_lower = keyword.lower()
+        return self._query(
+            "SELECT data FROM items WHERE instr(lower(coalesce(title, '')), ?) "
+            "OR instr(lower(coalesce(excerpt, '')), ?) OR instr(lower(coalesce(category, '')), ?) "
+            "ORDER BY seq",
+            (keyword_lower, keyword_lower, keyword_lower)
+        )
+
+    def update(self, item_id: str, updated_data: Dict) -> bool:
+        """
+        改：更新数据
+        :param item_id: 数据ID
+        :param updated_data: 更新的数据字典
+        :return: 是否成功
+        """
+        try:
+            with self._connect() as conn:
+                # 读取和更新在同一个写事务中完成，其间其他进程不能删除或修改这条数据
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute('SELECT created_at FROM items WHERE id = ?', (item_id,)).fetchone()
+                if row is None:
+                    print(f"未找到ID为 {item_id} 的数据")
+                    return False
+
+                # 保留原有ID和创建时间
+                updated_data['id'] = item_id
+                if row[0]:
+                    updated_data['created_at'] = row[0]
+
+                # 添加更新时间
+                updated_data['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+                values = self._row_values(updated_data)
+                conn.execute(
+                    'UPDATE items SET platform = ?, category = ?, title = ?, excerpt = ?, '
+                    'content_hash = ?, timestamp = ?, created_at = ?, data = ? WHERE id = ?',
+                    values[1:] + (item_id,)
+                )
+        except Exception as e:
+            # 例如内容哈希与其他数据重复（唯一索引冲突），事务已回滚
+            print(f"更新数据失败: {e}")
+            return False
+        print(f"成功更新数据，ID: {item_id}")
+        return True
+
+    def delete(self, item_id: str) -> bool:
+        """
+        删：删除数据
+        :param item_id: 数据ID
+        :return: 是否成功
+        """
+        with self._connect() as conn:
+            deleted = conn.execute('DELETE FROM items WHERE id = ?', (item_id,)).rowcount
+        if deleted:
+            print(f"成功删除数据，ID: {item_id}")
+            return True
+
+        print(f"未找到ID为 {item_id} 的数据")
+        return False
+
+    def delete_by_platform(self, platform: str) -> int:
+        """
+        删除指定平台的所有数据
+        :param platform: 平台名称
+        :return: 删除的数量
+        """
+        with self._connect() as conn:
+            deleted_count = conn.execute('DELETE FROM items WHERE platform = ?', (platform,)).rowcount
+        print(f"删除了 {deleted_count} 条 {platform} 平台的数据")
+        return deleted_count
+
+    def clear_all(self) -> bool:
+        """
+        清空所有数据
+        :return: 是否成功
+        """
+        with self._connect() as conn:
+            conn.execute('DELETE FROM items')
+        print("已清空所有数据")
+        return True
+
+    def get_statistics(self) -> Dict:
+        """
+        获取数据统计信息（在数据库中聚合，不加载全部数据）
+        :return: 统计信息字典
+        """
+        conn = self._connect()
+        stats = {
+            'total_count': conn.execute('SELECT COUNT(*) FROM items').fetchone()[0],
+            'platform_count': {},
+            'category_count': {},
+            'latest_update': None
+        }
+
+        for platform, count in conn.execute(
+                "SELECT coalesce(platform, '未知'), COUNT(*) FROM items GROUP BY 1"):
+            stats['platform_count'][platform] = count
+
+        for category, count in conn.execute(
+                "SELECT coalesce(category, '未分类'), COUNT(*) FROM items GROUP BY 1"):
+            stats['category_count'][category] = count
+
+        if stats['total_count']:
+            stats['latest_update'] = conn.execute(
+                "SELECT MAX(coalesce(timestamp, created_at, '')) FROM items"
+            ).fetchone()[0]
+
+        return stats
+
+    def get_content_hashes(self) -> Set[str]:
+        """获取所有已存储内容的哈希，用于采集去重"""
+        rows = self._connect().execute('SELECT content_hash FROM items WHERE content_hash IS NOT NULL')
+        return {row[0] for row in rows}
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+异步采集测试：解析、趋势观察者和去重在线程池中执行，不阻塞事件循环
+
+运行方式：
+    python -m unittest test_async_crawler
+"""
+
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from async_crawler import AsyncContentCrawler
+
+
+class FakeResponse:
+    text = '<table><tr><td class="td-02"><a href="/weibo?q=1">话题一</a></td></tr></table>'
+    encoding = None
+
+
+class AsyncCrawlerTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_parse_and_dedup_off_event_loop(self):
+        crawler = AsyncContentCrawler()
+        crawler.load_existing_hashes = lambda: time.sleep(0.3)
+        observed = []
+        crawler.add_observer(lambda item: (time.sleep(0.2), observed.append(item['title'])))
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        try:
+            with mock.patch.object(crawler, '_fetch', return_value=FakeResponse()):
+                results = await crawler.crawl_platform_async('微博')
+        finally:
+            ticker.cancel()
+        self.assertEqual([item['title'] for item in results], ['话题一'])
+        self.assertEqual(observed, ['话题一'])
+        # 同步代码共耗时约 0.5 秒，期间事件循环仍在调度其他任务
+        self.assertGreater(ticks, 20)
+
+    async def test_concurrent_platforms_dedup_once(self):
+        crawler = AsyncContentCrawler()
+        crawler.load_existing_hashes = lambda: None
+        items = [crawler.clean_douyin_item({'title': '同一话题', 'rank': 1}) for _ in range(20)]
+        accepted = await asyncio.gather(*(crawler._run_in_thread(crawler.accept, item) for item in items))
+        self.assertEqual(accepted.count(True), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
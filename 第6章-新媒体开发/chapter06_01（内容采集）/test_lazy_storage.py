@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+延迟加载存储测试：行偏移索引、追加、修改、删除，以及采集写入时并发读取
+
+运行方式：
+    python -m unittest test_lazy_storage
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from crawler import ContentCrawler
+from lazy_storage import LazyDataStorage, LazyRecordList
+
+
+def make_item(index: int) -> dict:
+    return {'id': f'id-{index}', 'title': f'标题{index}', 'platform': '微博', 'content_hash': f'hash-{index}'}
+
+
+class LazyStorageTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.filename = os.path.join(self.directory, 'data.jsonl')
+
+    def write_lines(self, lines):
+        with open(self.filename, 'wb') as f:
+            f.write(b'\n'.join(line.encode('utf-8') for line in lines))
+
+    def read_lines(self):
+        with open(self.filename, 'rb') as f:
+            return [line for line in f.read().split(b'\n') if line.strip()]
+
+    def test_offset_index(self):
+        # 空行被跳过，最后一行没有换行符也能读取
+        self.write_lines([json.dumps(make_item(0)), '', '  ', json.dumps(make_item(1)), json.dumps(make_item(2))])
+        records = LazyRecordList(self.filename)
+        self.addCleanup(records.close)
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[1]['id'], 'id-1')
+        self.assertEqual(records[-1]['id'], 'id-2')
+        self.assertEqual([item['id'] for item in records[0:3:2]], ['id-0', 'id-2'])
+        self.assertEqual([item['id'] for item in records], ['id-0', 'id-1', 'id-2'])
+        with self.assertRaises(IndexError):
+            records[3]
+
+    def test_empty_file(self):
+        storage = LazyDataStorage(self.filename)
+        self.assertEqual(storage.read_all(), [])
+        self.assertEqual(storage.get_content_hashes(), set())
+
+    def test_append_only_writes_new_records(self):
+        self.write_lines([json.dumps(make_item(0), ensure_ascii=False), json.dumps(make_item(1), ensure_ascii=False)])
+        storage = LazyDataStorage(self.filename)
+        original = self.read_lines()
+        storage.create_batch([make_item(2), make_item(3)])
+        self.assertFalse(storage.data.dirty)
+        lines = self.read_lines()
+        # 原有行原样保留，新记录追加在后面（原文件末尾缺少的换行符已补齐）
+        self.assertEqual(lines[:2], original)
+        self.assertEqual([json.loads(line)['id'] for line in lines[2:]], ['id-2', 'id-3'])
+        self.assertEqual([item['id'] for item in storage.read_all()], ['id-0', 'id-1', 'id-2', 'id-3'])
+        self.assertEqual(storage.get_content_hashes(), {f'hash-{i}' for i in range(4)})
+        reloaded = LazyDataStorage(self.filename)
+        self.assertEqual(reloaded.read_by_id('id-3')['title'], '标题3')
+
+    def test_update_rewrites_file(self):
+        self.write_lines([json.dumps(make_item(i), ensure_ascii=False) for i in range(3)])
+        original = self.read_lines()
+        storage = LazyDataStorage(self.filename)
+        self.assertTrue(storage.update('id-1', {'title': '新标题', 'platform': '知乎'}))
+        self.assertFalse(storage.data.dirty)
+        lines = self.read_lines()
+        # 未访问的记录按原始字节复制
+        self.assertEqual(lines[0], original[0])
+        self.assertEqual(lines[2], original[2])
+        reloaded = LazyDataStorage(self.filename)
+        self.assertEqual(reloaded.read_by_id('id-1')['title'], '新标题')
+        self.assertEqual(reloaded.read_by_platform('知乎')[0]['id'], 'id-1')
+        self.assertEqual(len(reloaded.read_all()), 3)
+
+    def test_delete_rewrites_file(self):
+        self.write_lines([json.dumps(make_item(i)) for i in range(3)])
+        storage = LazyDataStorage(self.filename)
+        storage.create(make_item(3))
+        self.assertTrue(storage.delete('id-0'))
+        self.assertFalse(storage.delete('id-0'))
+        self.assertEqual([item['id'] for item in storage.read_all()], ['id-1', 'id-2', 'id-3'])
+        self.assertEqual(storage.get_content_hashes(), {'hash-1', 'hash-2', 'hash-3'})
+        reloaded = LazyDataStorage(self.filename)
+        self.assertEqual([item['id'] for item in reloaded.read_all()], ['id-1', 'id-2', 'id-3'])
+
+    def test_rewrite_closes_mapping_first(self):
+        # Windows 不允许替换仍被映射的文件：模拟该限制，重写和追加前必须先关闭映射
+        self.write_lines([json.dumps(make_item(i)) for i in range(5)])
+        storage = LazyDataStorage(self.filename)
+        replace = os.replace
+
+        def windows_replace(source, target):
+            if storage.data._file.mm is not None:
+                raise PermissionError('目标文件仍被映射')
+            replace(source, target)
+
+        # 重写前已开始的遍历持有旧的记录顺序，其中包括随后被删除、修改的记录
+        reader = iter(storage.data)
+        self.assertEqual(next(reader)['id'], 'id-0')
+        with mock.patch('lazy_storage.os.replace', windows_replace):
+            self.assertTrue(storage.update('id-1', {'title': '新标题'}))
+            self.assertTrue(storage.delete('id-3'))
+            storage.create(make_item(5))
+        self.assertEqual([item['id'] for item in reader], ['id-1', 'id-2', 'id-3', 'id-4'])
+        self.assertEqual([item['id'] for item in storage.read_all()], ['id-0', 'id-1', 'id-2', 'id-4', 'id-5'])
+        reloaded = LazyDataStorage(self.filename)
+        self.assertEqual(reloaded.read_by_id('id-1')['title'], '新标题')
+        self.assertEqual(len(reloaded.read_all()), 5)
+
+    def test_failed_replace_keeps_data_readable(self):
+        self.write_lines([json.dumps(make_item(i)) for i in range(3)])
+        storage = LazyDataStorage(self.filename)
+        with mock.patch('lazy_storage.os.replace', side_effect=PermissionError):
+            storage.delete('id-0')
+            self.assertFalse(storage.save_data())
+        # 替换失败时文件和索引保持原样，修改仍在内存中，下次保存时写入
+        self.assertEqual([json.loads(line)['id'] for line in self.read_lines()], ['id-0', 'id-1', 'id-2'])
+        self.assertEqual([item['id'] for item in storage.read_all()], ['id-1', 'id-2'])
+        self.assertTrue(storage.save_data())
+        self.assertEqual([json.loads(line)['id'] for line in self.read_lines()], ['id-1', 'id-2'])
+
+    def test_reads_during_writes(self):
+        self.write_lines([json.dumps(make_item(i)) for i in range(200)])
+        storage = LazyDataStorage(self.filename)
+        errors = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                try:
+                    for item in storage.read_all():
+                        item['id']
+                    storage.get_content_hashes()
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        try:
+            # 追加写入和整体重写交替进行
+            for round_number in range(30):
+                storage.create_batch([make_item(1000 + round_number * 10 + i) for i in range(10)])
+                storage.update(f'id-{round_number}', {'title': f'修改{round_number}'})
+                storage.delete(f'id-{100 + round_number}')
+        finally:
+            done.set()
+            for thread in readers:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(storage.read_all()), 200 + 300 - 30)
+        self.assertEqual(len(LazyDataStorage(self.filename).read_all()), 470)
+
+    def test_crawler_loads_hashes_on_first_dedup(self):
+        self.write_lines([json.dumps(make_item(i)) for i in range(3)])
+        storage = LazyDataStorage(self.filename)
+        with mock.patch.object(storage, 'get_content_hashes', wraps=storage.get_content_hashes) as scan:
+            crawler = ContentCrawler(storage)
+            # 创建爬虫时不扫描存储
+            scan.assert_not_called()
+            self.assertFalse(crawler.accept(make_item(1)))
+            self.assertTrue(crawler.accept(make_item(5)))
+            self.assertFalse(crawler.accept(make_item(5)))
+            scan.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+采集流水线测试：存储阶段的批量计数
+
+运行方式：
+    python -m unittest test_pipeline
+"""
+
+import unittest
+
+from pipeline import CrawlPipeline
+
+
+class FakeCrawler:
+    """一个平台返回固定条目，不做去重"""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get_platform_handlers(self):
+        return {'测试': (lambda: self.entries, lambda raw: raw, lambda entry: entry)}
+
+    def accept(self, item):
+        return True
+
+
+class FakeStorage:
+    """标题在 skipped 中的条目视为已存在（INSERT OR IGNORE 跳过）"""
+
+    def __init__(self, skipped=(), fail=False):
+        self.skipped = set(skipped)
+        self.fail = fail
+
+    def create_batch(self, items):
+        if self.fail:
+            raise RuntimeError('写入失败')
+        return len([item for item in items if item['title'] not in self.skipped])
+
+
+class StoreStageTests(unittest.TestCase):
+
+    def run_pipeline(self, storage, count=5):
+        entries = [{'title': f'标题{index}'} for index in range(count)]
+        pipeline = CrawlPipeline(FakeCrawler(entries), storage)
+        store = pipeline.stages[-1]
+        handler = store.handler
+
+        def store_when_ready(item):
+            # 等去重阶段把所有条目放进队列，再开始合并
+            pipeline.stages[-2].join()
+            return handler(item)
+
+        store.handler = store_when_ready
+        pipeline.run()
+        return pipeline.stored, store.stats()
+
+    def test_skipped_items_in_middle_of_batch(self):
+        stored, stats = self.run_pipeline(FakeStorage(skipped={'标题1', '标题3'}))
+        self.assertEqual(stored, 3)
+        self.assertEqual((stats['received'], stats['emitted'], stats['errors']), (5, 3, 0))
+
+    def test_failed_batch_counts_merged_items(self):
+        stored, stats = self.run_pipeline(FakeStorage(fail=True))
+        self.assertEqual(stored, 0)
+        self.assertEqual((stats['received'], stats['emitted'], stats['errors']), (5, 0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite共享存储测试：更新时的唯一索引冲突
+
+运行方式：
+    python -m unittest test_sqlite_storage
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlite_storage import SQLiteStorage
+
+
+class SQLiteStorageTests(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.storage = SQLiteStorage(os.path.join(directory, 'data.db'))
+        for index in range(2):
+            self.storage.create({'id': f'id-{index}', 'title': f'标题{index}', 'content_hash': f'hash-{index}'})
+
+    def test_update(self):
+        self.assertTrue(self.storage.update('id-0', {'title': '新标题', 'content_hash': 'hash-new'}))
+        self.assertEqual(self.storage.read_by_id('id-0')['title'], '新标题')
+        self.assertFalse(self.storage.update('missing', {'title': '新标题'}))
+
+    def test_update_duplicate_hash(self):
+        # 内容哈希已属于其他数据：返回 False，原数据不变
+        self.assertFalse(self.storage.update('id-0', {'title': '新标题', 'content_hash': 'hash-1'}))
+        self.assertEqual(self.storage.read_by_id('id-0')['title'], '标题0')
+        self.assertTrue(self.storage.update('id-0', {'title': '新标题', 'content_hash': 'hash-0'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
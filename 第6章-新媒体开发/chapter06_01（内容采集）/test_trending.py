@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+趋势引擎测试：榜单条数限制
+
+运行方式：
+    python -m unittest test_trending
+"""
+
+import unittest
+
+from trending import TrendingEngine
+
+
+class TrendingLimitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = TrendingEngine(top_k=5)
+        self.engine.observe_many([
+            {'content_hash': f'hash-{index}', 'platform': '微博', 'rank': index + 1, 'title': f'标题{index}'}
+            for index in range(8)
+        ])
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.engine.get_trending(limit=3)), 3)
+        self.assertEqual(len(self.engine.get_trending(limit=50)), 5)
+        # 负数和 0 至少返回第一名，不会从末尾截取
+        for limit in (0, -1):
+            data = self.engine.get_trending(limit=limit)
+            self.assertEqual([item['content_hash'] for item in data], ['hash-0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+新媒体营销与热榜系统 - 热度趋势计算模块
+按内容哈希跨多轮采集跟踪排名与热度，计算排名变化速度和时间衰减热度，
+并通过增量维护的Top-K堆提供趋势榜单
+"""
+
+import heapq
+import math
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# 热榜每个平台最多采集的条数，用于把排名换算为权重
+TOP_N = 20
+
+# 中文数量单位
+_UNITS = {'万': 1e4, '亿': 1e8, 'w': 1e4, 'W': 1e4, 'k': 1e3, 'K': 1e3}
+_SCORE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*([万亿wWkK]?)')
+
+
+def parse_hot_score(value) -> float:
+    """
+    将热度值解析为数字
+    支持 "1234 万热度"、"1.2亿"、"3,456"、数字等格式，无法解析时返回0
+    :param value: 原始热度值
+    :return: 数值化热度
+    """
+    if value is None or value == '':
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    match = _SCORE_PATTERN.search(str(value).replace(',', ''))
+    if not match:
+        return 0.0
+    number, unit = match.groups()
+    return float(number) * _UNITS.get(unit, 1)
+
+
+def _log_add(a: float, b: float) -> float:
+    """计算 log(exp(a) + exp(b))，避免数值溢出"""
+    if a == -math.inf:
+        return b
+    high, low = (a, b) if a > b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+
+class TrendEntry:
+    """单条内容的趋势状态"""
+
+    __slots__ = ('content_hash', 'platform', 'title', 'link', 'rank', 'previous_rank',
+                 'hot_value', 'velocity', 'first_seen', 'last_seen', 'observations', 'key')
+
+    def __init__(self, content_hash: str):
+        self.content_hash = content_hash
+        self.platform = None
+        self.title = None
+        self.link = None
+        self.rank = None
+        self.previous_rank = None
+        self.hot_value = 0.0
+        self.velocity = 0.0
+        self.first_seen = None
+        self.last_seen = None
+        self.observations = 0
+        # 与时间无关的对数热度：log(Σ weight_i · e^(λ·t_i))
+        self.key = -math.inf
+
+
+class TopK:
+    """
+    增量维护的Top-K最小堆
+    每条内容的排序键只增不减，因此只需与堆顶比较即可决定是否入榜，
+    已在榜内容的键更新时压入新记录，旧记录在出堆时按失效处理（惰性删除）
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap = []
+        self._members: Dict[str, float] = {}
+
+    def update(self, content_hash: str, key: float):
+        if content_hash in self._members:
+            self._members[content_hash] = key
+            heapq.heappush(self._heap, (key, content_hash))
+            # 失效记录过多时重建堆
+            if len(self._heap) > 2 * self.k:
+                self._heap = [(v, h) for h, v in self._members.items()]
+                heapq.heapify(self._heap)
+            return
+
+        if len(self._members) < self.k:
+            self._members[content_hash] = key
+            heapq.heappush(self._heap, (key, content_hash))
+            return
+
+        self._discard_stale()
+        if key > self._heap[0][0]:
+            _, evicted = heapq.heapreplace(self._heap, (key, content_hash))
+            del self._members[evicted]
+            self._members[content_hash] = key
+            self._discard_stale()
+
+    def _discard_stale(self):
+        """弹出堆顶的失效记录，保证堆顶是当前榜单最小值"""
+        while self._heap and self._members.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def items(self) -> List[str]:
+        """按排序键从高到低返回榜内内容哈希"""
+        return [h for h, _ in sorted(self._members.items(), key=lambda kv: kv[1], reverse=True)]
+
+
+class TrendingEngine:
+    """热度趋势计算引擎"""
+
+    def __init__(self, half_life_hours: float = 6.0, top_k: int = 100):
+        """
+        :param half_life_hours: 热度半衰期（小时）
+        :param top_k: 趋势榜保留的条数
+        """
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)
+        self.top_k = top_k
+        self.entries: Dict[str, TrendEntry] = {}
+        # None 表示全平台榜单，其余键为平台名称
+        self.rankings: Dict[Optional[str], TopK] = {None: TopK(top_k)}
+        # 各平台出现过的最大热度值，用于把热度归一化到同一量级
+        self.max_hot_value: Dict[str, float] = {}
+        # 以引擎创建时间为基准，避免指数项过大
+        self.epoch = time.time()
+        self.lock = threading.Lock()
+
+    def _parse_time(self, item: Dict) -> float:
+        value = item.get('timestamp') or item.get('created_at')
+        if value:
+            try:
+                return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp()
+            except (TypeError, ValueError):
+                pass
+        return time.time()
+
+    def _weight(self, platform: str, rank, hot_value: float) -> float:
+        """
+        单次上榜的热度权重
+        排名权重在 (0, 1] 之间；平台提供热度值时，按平台内最大热度的对数比例最多再加倍
+        """
+        try:
+            rank_weight = max(TOP_N + 1 - int(rank), 1) / TOP_N
+        except (TypeError, ValueError):
+            rank_weight = 1 / TOP_N
+
+        if hot_value <= 0:
+            return rank_weight
+        max_hot = self.max_hot_value.get(platform, 0.0)
+        if hot_value > max_hot:
+            self.max_hot_value[platform] = max_hot = hot_value
+        return rank_weight * (1 + math.log1p(hot_value) / math.log1p(max_hot))
+
+    def observe(self, item: Dict):
+        """
+        记录一次上榜观测
+        :param item: 采集到的内容字典，需包含 content_hash
+        """
+        content_hash = item.get('content_hash')
+        if not content_hash:
+            return
+
+        observed_at = self._parse_time(item)
+        platform = item.get('platform', '未知')
+        rank = item.get('rank')
+        hot_value = parse_hot_score(item.get('hot_score'))
+
+        with self.lock:
+            entry = self.entries.get(content_hash)
+            if entry is None:
+                entry = self.entries[content_hash] = TrendEntry(content_hash)
+                entry.first_seen = observed_at
+
+            # 排名变化速度：每小时上升的名次，正数表示正在上升
+            if entry.rank is not None and rank is not None and observed_at > entry.last_seen:
+                hours = (observed_at - entry.last_seen) / 3600
+                entry.velocity = (entry.rank - rank) / hours
+                entry.previous_rank = entry.rank
+
+            entry.platform = platform
+            entry.title = item.get('title', entry.title)
+            entry.link = item.get('link', entry.link)
+            if entry.last_seen is None or observed_at >= entry.last_seen:
+                entry.rank = rank
+                entry.last_seen = observed_at
+            entry.hot_value = hot_value or entry.hot_value
+            entry.observations += 1
+
+            weight = self._weight(platform, rank, hot_value)
+            entry.key = _log_add(entry.key, math.log(weight) + self.decay_rate * (observed_at - self.epoch))
+
+            self.rankings[None].update(content_hash, entry.key)
+            if platform not in self.rankings:
+                self.rankings[platform] = TopK(self.top_k)
+            self.rankings[platform].update(content_hash, entry.key)
+
+    def observe_many(self, items: List[Dict]):
+        """批量记录观测，例如启动时从存储中恢复"""
+        for item in items:
+            self.observe(item)
+
+    def heat(self, entry: TrendEntry, now: Optional[float] = None) -> float:
+        """计算内容在当前时刻的衰减热度"""
+        now = time.time() if now is None else now
+        return math.exp(entry.key - self.decay_rate * (now - self.epoch))
+
+    def get_trending(self, limit: int = 20, platform: Optional[str] = None) -> List[Dict]:
+        """
+        获取趋势榜单
+        :param limit: 返回条数（限制在 1 到 top_k 之间）
+        :param platform: 平台筛选（可选）
+        :return: 按衰减热度从高到低排列的内容列表
+        """
+        # 负数切片会从末尾截取，超出 top_k 也拿不到更多数据
+        limit = min(max(limit, 1), self.top_k)
+        now = time.time()
+        with self.lock:
+            ranking = self.rankings.get(platform)
+            if ranking is None:
+                return []
+
+            results = []
+            for content_hash in ranking.items()[:limit]:
+                entry = self.entries[content_hash]
+                results.append({
+                    'content_hash': content_hash,
+                    'platform': entry.platform,
+                    'title': entry.title,
+                    'link': entry.link,
+                    'rank': entry.rank,
+                    'previous_rank': entry.previous_rank,
+                    'hot_value': entry.hot_value,
+                    'velocity': round(entry.velocity, 2),
+                    'heat': round(self.heat(entry, now), 4),
+                    'observations': entry.observations,
+                    'first_seen': datetime.fromtimestamp(entry.first_seen).strftime('%Y-%m-%d %H:%M:%S'),
+                    'last_seen': datetime.fromtimestamp(entry.last_seen).strftime('%Y-%m-%d %H:%M:%S'),
+                })
+            return results